@@ -0,0 +1,259 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Benchmark suite for the geometry and serialization hot paths of gears-dev:
+generate_spur_points(), generate_spur_flat(), generate_rack_points(), generate_spokes_path(),
+points_to_svgd(), stream_gear_outline() and the complete Gears.effect().
+
+Every case reports operations per second (best of N runs) and the peak
+memory allocated by one operation (tracemalloc, python 3 only).
+Results can be saved as a JSON baseline and compared against later:
+
+    python benchmarks/bench_gears.py -o before.json
+    ... change something ...
+    python benchmarks/bench_gears.py -c before.json -t 10
+
+The compare mode marks cases that got slower (or use more memory) by more
+than the threshold and exits with status 1 if there are any.
+
+Gears.effect() needs inkex; it is looked up in the inkscape extensions
+directory as in setup.py. Without it the effect cases are skipped.
+'''
+
+from __future__ import print_function
+import sys, os, time, json, platform, tempfile, optparse, importlib
+
+try:
+    import tracemalloc
+except ImportError:     # python 2
+    tracemalloc = None
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+sys.path.append('/usr/share/inkscape/extensions')   # inkex for Gears.effect()
+os.environ['GEARS_DEV_CACHE'] = '0'     # measure the computation, not the disk cache
+import gears_dev_core as g
+
+TEETH = (3, 8, 24, 100, 400, 1200)
+QUICK_TEETH = (8, 100, 1200)
+ACCURACY = (0, 6, 12, 20)       # the tiers of the dialog, 0 is automatic
+UNIT_FACTOR = 3.5433070866      # mm
+MODULE = 1.0
+
+EMPTY_SVG = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="210mm" height="297mm" viewBox="0 0 744.09 1052.36">
+<g id="layer1"/>
+</svg>
+'''
+
+
+def gear(teeth, accuracy=0, ring=False):
+    " the gear_calculations() and accuracy_settings() of a module 1 mm gear "
+    calc = g.gear_calculations(teeth, MODULE * g.pi * UNIT_FACTOR, 20.0, 0, ring, 0.)
+    return calc + g.accuracy_settings(teeth, accuracy)
+
+def spur_points(teeth, accuracy, ring):
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth,
+     accuracy_involute, accuracy_circular) = gear(teeth, accuracy, ring)
+    def op():
+        g.memo_clear()
+        return g.generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                      accuracy_involute, accuracy_circular)
+    return op
+
+def spur_flat(teeth, ring):
+    " the outline as a flat array('d'): compare its memory with spur_points "
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth,
+     accuracy_involute, accuracy_circular) = gear(teeth, 20, ring)
+    def op():
+        g.memo_clear()
+        return g.generate_spur_flat(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                    accuracy_involute, accuracy_circular, True)
+    return op
+
+def rack_points(teeth):
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth,
+     accuracy_involute, accuracy_circular) = gear(teeth)
+    pitch = MODULE * g.pi * UNIT_FACTOR
+    def op():
+        g.memo_clear()
+        return g.generate_rack_points(teeth, pitch, addendum, 20.0, 5 * UNIT_FACTOR, 5 * UNIT_FACTOR, 0, True)
+    return op
+
+def spokes_path(teeth):
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth,
+     accuracy_involute, accuracy_circular) = gear(teeth)
+    def op():
+        return g.generate_spokes_path(root_radius, 3 * UNIT_FACTOR, 6, 5 * UNIT_FACTOR, 4 * UNIT_FACTOR,
+                                      UNIT_FACTOR, 'mm')
+    return op
+
+def stream_outline(teeth, ring, out):
+    " the outline streamed to out one tooth at a time: the peak memory is about one tooth "
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth,
+     accuracy_involute, accuracy_circular) = gear(teeth, 20, ring)
+    def op():
+        g.memo_clear()
+        return g.stream_gear_outline(g.PathWriter(out=out), teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                     accuracy_involute, accuracy_circular)
+    return op
+
+def svgd(teeth, accuracy):
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth,
+     accuracy_involute, accuracy_circular) = gear(teeth, accuracy)
+    points = g.generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                    accuracy_involute, accuracy_circular)
+    def op():
+        return g.points_to_svgd(points)
+    return op
+
+def effect_class():
+    " the Gears class of gears-dev.py (a file name with '-'), or None without inkex "
+    try:
+        module = importlib.import_module('gears-dev')
+    except ImportError:
+        return None
+    return module.Gears
+
+def effect(Gears, svgfile, teeth, ring, rack):
+    args = ['--teeth=%d' % teeth, '--system=MM', '--dimension=%s' % MODULE, '--units=mm',
+            '--internal-ring=%s' % ring, '--draw-rack=%s' % rack, '--annotation=true', svgfile]
+    def op():
+        g.memo_clear()
+        e = Gears()
+        e.affect(args, output=False)
+        return e
+    return op
+
+
+def cases(teeth_list, Gears, svgfile, null):
+    " (name, op) of all benchmarks, null is a file opened on os.devnull "
+    for teeth in teeth_list:
+        for accuracy in ACCURACY:
+            for ring in (False, True):
+                yield ('spur_points/%d/acc%d/%s' % (teeth, accuracy, 'ring' if ring else 'spur'),
+                       spur_points(teeth, accuracy, ring))
+    for teeth in teeth_list:
+        yield ('spur_flat/%d/acc20/ring' % teeth, spur_flat(teeth, True))
+    for teeth in teeth_list:
+        yield ('rack_points/%d' % teeth, rack_points(teeth))
+    for teeth in teeth_list:
+        yield ('spokes_path/%d' % teeth, spokes_path(teeth))
+    for teeth in teeth_list:
+        for accuracy in ACCURACY:
+            yield ('points_to_svgd/%d/acc%d' % (teeth, accuracy), svgd(teeth, accuracy))
+    for teeth in teeth_list:
+        yield ('stream_outline/%d/ring' % teeth, stream_outline(teeth, True, null))
+    if Gears is None:
+        return
+    for teeth in teeth_list:
+        for (ring, rack, label) in ((False, False, 'spur'), (False, True, 'spur+rack'), (True, False, 'ring')):
+            yield ('effect/%d/%s' % (teeth, label), effect(Gears, svgfile, teeth, ring, rack))
+
+
+def ops_per_sec(op, repeat, min_time):
+    """ best of repeat runs, each run calls op() in a loop for at least min_time s """
+    best = 0.0
+    for i in range(repeat):
+        n = 0
+        start = time.time()
+        while True:
+            op()
+            n += 1
+            elapsed = time.time() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, n / elapsed)
+    return best
+
+def peak_memory(op):
+    " bytes allocated at the peak of one op() call, None without tracemalloc "
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        op()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'numpy': g.load_numpy().__version__ if g.load_numpy() is not None else None,
+            'gears_dev': g.__version__}
+
+def compare(results, baseline, threshold):
+    """ (name, what, old, new, change %) of all cases slower than the baseline
+        by more than threshold percent (or using more memory)
+    """
+    regressions = []
+    for (name, r) in sorted(results.items()):
+        b = baseline.get(name)
+        if b is None:
+            continue
+        if b['ops'] and r['ops'] < b['ops'] * (1 - threshold / 100.0):
+            regressions.append((name, 'ops/s', b['ops'], r['ops'], 100.0 * (r['ops'] / b['ops'] - 1)))
+        if b.get('peak') and r.get('peak') and r['peak'] > b['peak'] * (1 + threshold / 100.0):
+            regressions.append((name, 'peak', b['peak'], r['peak'], 100.0 * (float(r['peak']) / b['peak'] - 1)))
+    return regressions
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('-n', '--repeat', type='int', default=3, help='best of N runs (default %default)')
+    parser.add_option('-m', '--min-time', type='float', default=0.1,
+                      help='seconds per run, short operations are repeated (default %default)')
+    parser.add_option('-k', '--filter', default=None, help='only cases whose name contains this text')
+    parser.add_option('-Q', '--quick', action='store_true', default=False,
+                      help='tooth counts %s only' % (QUICK_TEETH,))
+    parser.add_option('-o', '--save', default=None, help='save the results as JSON baseline')
+    parser.add_option('-c', '--compare', default=None, help='compare with this JSON baseline')
+    parser.add_option('-t', '--threshold', type='float', default=10.0,
+                      help='regression threshold in percent (default %default)')
+    (opts, args) = parser.parse_args(argv)
+
+    Gears = effect_class()
+    if Gears is None:
+        print('inkex not found: Gears.effect() cases skipped', file=sys.stderr)
+    (fd, svgfile) = tempfile.mkstemp(suffix='.svg')
+    with os.fdopen(fd, 'w') as f:
+        f.write(EMPTY_SVG)
+    baseline = None
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    null = open(os.devnull, 'w')
+    print('%-34s %12s %12s %10s' % ('case', 'ops/s', 'peak KiB', 'change'))
+    try:
+        for (name, op) in cases(QUICK_TEETH if opts.quick else TEETH, Gears, svgfile, null):
+            if opts.filter and opts.filter not in name:
+                continue
+            op()    # warm up
+            r = {'ops': ops_per_sec(op, opts.repeat, opts.min_time), 'peak': peak_memory(op)}
+            results[name] = r
+            change = ''
+            if baseline and name in baseline and baseline[name]['ops']:
+                change = '%+.1f%%' % (100.0 * (r['ops'] / baseline[name]['ops'] - 1))
+            print('%-34s %12.1f %12s %10s' % (name, r['ops'], '-' if r['peak'] is None else '%.1f' % (r['peak'] / 1024.0),
+                                              change))
+            sys.stdout.flush()
+    finally:
+        null.close()
+        os.remove(svgfile)
+
+    if opts.save:
+        with open(opts.save, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=1, sort_keys=True)
+    if baseline is not None:
+        regressions = compare(results, baseline, opts.threshold)
+        for (name, what, old, new, change) in regressions:
+            print('REGRESSION %-34s %-6s %12.1f -> %12.1f (%+.1f%%)' % (name, what, old, new, change))
+        if regressions:
+            return 1
+        print('no regressions beyond %.1f%%' % opts.threshold)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Compare the classic path output of gears-dev with the compact mode
+(--compact: relative coordinates, trimmed numbers, tip/root arcs).
+
+Reports the size of the 'd' attribute and the time a consumer needs to
+tokenize it back into numbers.
+
+usage: python benchmarks/bench_path_size.py [-n repeat]
+'''
+
+from __future__ import print_function
+import sys, os, re, time, optparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import gears_dev_core as g
+
+PATH_TOKEN = re.compile(r'[MmLlAaZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+# (label, teeth, dimension [mm module], units, unit_factor [px per unit], ring)
+CASES = [
+    ('24 teeth, mm',     24, 1.0, 'mm', 3.5433070866, False),
+    ('120 teeth, mm',   120, 1.0, 'mm', 3.5433070866, False),
+    ('1200 teeth ring', 1200, 0.5, 'mm', 3.5433070866, True),
+    ('32 teeth, in',     32, 0.04, 'in', 90.0, False),
+]
+
+def parse_path(d):
+    " what a consumer has to do at least: split into commands and numbers "
+    return [t if t.isalpha() else float(t) for t in PATH_TOKEN.findall(d)]
+
+def best_of(repeat, func, *args):
+    best = None
+    for i in range(repeat):
+        t = time.time()
+        func(*args)
+        t = time.time() - t
+        if best is None or t < best:
+            best = t
+    return best
+
+def classic(teeth, calc, acc):
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth) = calc
+    points = g.generate_spur_array(teeth, base_radius, pitch_radius, outer_radius, root_radius, acc, max(3, int(acc/2) - 1), template=True)
+    return g.points_to_svgd(points)
+
+def compact(teeth, calc, acc, unit_factor):
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth) = calc
+    w = g.PathWriter(g.compact_precision(unit_factor), relative=True, compact=True)
+    g.write_spur_path(w, teeth, base_radius, pitch_radius, outer_radius, root_radius, acc)
+    return w.getvalue()
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--repeat', type='int', default=5, help='best of N runs')
+    parser.add_option('-a', '--accuracy', type='int', default=20, help='involute points per flank')
+    (opts, args) = parser.parse_args()
+
+    print('%-17s %-8s %10s %10s %10s %10s' % ('case', 'mode', 'bytes', 'ratio', 'gen ms', 'parse ms'))
+    for (label, teeth, dim, units, unit_factor, ring) in CASES:
+        calc = g.gear_calculations(teeth, dim * g.pi * unit_factor, 20.0, 0, ring, 0.)
+        ref = None
+        for mode in ('classic', 'compact'):
+            if mode == 'classic':
+                args = (teeth, calc, opts.accuracy)
+                func = classic
+            else:
+                args = (teeth, calc, opts.accuracy, unit_factor)
+                func = compact
+            d = func(*args)
+            gen = best_of(opts.repeat, func, *args)
+            parse = best_of(opts.repeat, parse_path, d)
+            if ref is None:
+                ref = len(d)
+            print('%-17s %-8s %10d %9.1f%% %10.2f %10.2f' % (label, mode, len(d), 100.0 * len(d) / ref,
+                                                           gen * 1000, parse * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Startup benchmark: inkscape runs a new python process for every apply and
+every live preview tick, so the cost of starting up is paid each time.
+
+Every case starts fresh interpreters and reports milliseconds (best and
+median of N runs):
+
+- import/core:       import gears_dev_core
+- first_point/core:  from before the import to the first point of a gear
+- process/core:      the whole process of first_point/core
+- process/effect:    gears-dev.py on an empty document (needs inkex, looked
+                     up in the inkscape extensions directory as in setup.py)
+- modules/effect:    not a time: whether numpy and gears_dev_mesh were
+                     imported by a plain effect run (they should not be)
+
+    python benchmarks/bench_startup.py -o before.json
+    ... change something ...
+    python benchmarks/bench_startup.py -c before.json -t 10
+
+The compare mode exits with status 1 if a case got slower than the
+baseline by more than the threshold (percent).
+'''
+
+from __future__ import print_function
+import sys, os, time, json, platform, subprocess, tempfile, optparse
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.abspath(os.path.join(here, '..'))
+EXTENSIONS = '/usr/share/inkscape/extensions'
+
+EMPTY_SVG = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="210mm" height="297mm" viewBox="0 0 744.09 1052.36">
+<g id="layer1"/>
+</svg>
+'''
+
+# runs in the child: import, then the first point of a 24 tooth gear
+FIRST_POINT = '''
+import sys, time
+t0 = time.time()
+sys.path.insert(0, %r)
+import gears_dev_core as g
+t1 = time.time()
+c = g.gear_calculations(24, 10.0, 20.0)
+(ai, ac) = g.accuracy_settings(24)
+p = next(g.iter_spur_points(24, c[1], c[0], c[4], c[5], ai, ac))
+t2 = time.time()
+sys.stdout.write('%%r %%r' %% (1000 * (t1 - t0), 1000 * (t2 - t0)))
+'''
+
+# runs in the child: the effect, then report the modules it imported
+EFFECT = '''
+import sys, importlib
+sys.path.insert(0, %r)
+sys.path.append(%r)
+sys.argv = ['gears-dev.py', '--teeth=24', %r]
+stdout = sys.stdout
+sys.stdout = open(%r, 'w')
+importlib.import_module('gears-dev').Gears().affect()
+stdout.write('%%d %%d' %% ('numpy' in sys.modules, 'gears_dev_mesh' in sys.modules))
+'''
+
+
+def child(code):
+    " (wall time in ms, stdout) of a new python process running code "
+    env = dict(os.environ)
+    env['GEARS_DEV_CACHE'] = '0'    # measure the computation, not the disk cache
+    start = time.time()
+    out = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return (1000 * (time.time() - start), out.decode('ascii'))
+
+def have_inkex():
+    code = 'import sys; sys.path.append(%r); import inkex' % EXTENSIONS
+    with open(os.devnull, 'w') as null:
+        return subprocess.call([sys.executable, '-c', code], stdout=null, stderr=null) == 0
+
+def measure(repeat, effect, svgfile):
+    " {case: [ms of each run]} and the modules of the effect run "
+    runs = {}
+    modules = None
+    for i in range(repeat):
+        (wall, out) = child(FIRST_POINT % root)
+        (imported, first) = [float(v) for v in out.split()]
+        runs.setdefault('import/core', []).append(imported)
+        runs.setdefault('first_point/core', []).append(first)
+        runs.setdefault('process/core', []).append(wall)
+        if effect:
+            (wall, out) = child(EFFECT % (root, EXTENSIONS, svgfile, os.devnull))
+            runs.setdefault('process/effect', []).append(wall)
+            modules = [int(v) for v in out.split()]
+    return (runs, modules)
+
+def median(values):
+    values = sorted(values)
+    n = len(values)
+    return values[n // 2] if n % 2 else 0.5 * (values[n // 2 - 1] + values[n // 2])
+
+def compare(results, baseline, threshold):
+    """ (name, old, new, change %) of all cases slower than the baseline
+        by more than threshold percent (best of the runs)
+    """
+    regressions = []
+    for (name, r) in sorted(results.items()):
+        b = baseline.get(name)
+        if b and r['best'] > b['best'] * (1 + threshold / 100.0):
+            regressions.append((name, b['best'], r['best'], 100.0 * (r['best'] / b['best'] - 1)))
+    return regressions
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('-n', '--repeat', type='int', default=10, help='processes per case (default %default)')
+    parser.add_option('-o', '--save', default=None, help='save the results as JSON baseline')
+    parser.add_option('-c', '--compare', default=None, help='compare with this JSON baseline')
+    parser.add_option('-t', '--threshold', type='float', default=10.0,
+                      help='regression threshold in percent (default %default)')
+    (opts, args) = parser.parse_args(argv)
+
+    effect = have_inkex()
+    if not effect:
+        print('inkex not found: process/effect skipped', file=sys.stderr)
+    (fd, svgfile) = tempfile.mkstemp(suffix='.svg')
+    with os.fdopen(fd, 'w') as f:
+        f.write(EMPTY_SVG)
+    try:
+        (runs, modules) = measure(max(1, opts.repeat), effect, svgfile)
+    finally:
+        os.remove(svgfile)
+    baseline = None
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    print('%-20s %10s %10s %10s' % ('case', 'best ms', 'median ms', 'change'))
+    for name in sorted(runs):
+        r = {'best': min(runs[name]), 'median': median(runs[name])}
+        results[name] = r
+        change = ''
+        if baseline and name in baseline and baseline[name]['best']:
+            change = '%+.1f%%' % (100.0 * (r['best'] / baseline[name]['best'] - 1))
+        print('%-20s %10.1f %10.1f %10s' % (name, r['best'], r['median'], change))
+    if modules is not None:
+        print('modules/effect       numpy %s, gears_dev_mesh %s' %
+              ('imported' if modules[0] else 'not imported', 'imported' if modules[1] else 'not imported'))
+
+    if opts.save:
+        with open(opts.save, 'w') as f:
+            json.dump({'environment': {'python': platform.python_version(), 'machine': platform.machine()},
+                       'results': results}, f, indent=1, sort_keys=True)
+    if baseline is not None:
+        regressions = compare(results, baseline, opts.threshold)
+        for (name, old, new, change) in regressions:
+            print('REGRESSION %-20s %10.1f -> %10.1f ms (%+.1f%%)' % (name, old, new, change))
+        if regressions:
+            return 1
+        print('no regressions beyond %.1f%%' % opts.threshold)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Check the gear math against published gear tables and time it.
+
+Every gear of actual-gear-measurements.txt (or of the given tables) is
+computed with calc_circular_pitch() and gear_calculations() through each
+tooth system (CP, DP and module, converted into each other), and the
+pitch and outer diameters are compared with the published ones:
+
+- pitch diameter: must match within the precision printed in the table.
+- outer diameter 'calc': the values of the original plugin, must match too.
+- outer diameter 'table': the vendor values. These vary (antibacklash
+  gears), deviations beyond --od-tolerance are reported as warnings.
+
+The exit status is 1 if anything but a vendor outer diameter is off.
+
+More tables: add a section format to SECTIONS for text tables like
+actual-gear-measurements.txt, or use a CSV file with the columns
+units, system, dimension, teeth, pitch_dia, od (od and pitch_dia may be empty).
+
+usage: python benchmarks/validate_measurements.py [-n repeat] [TABLE...]
+'''
+
+from __future__ import print_function
+import sys, os, csv, time, optparse
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+import gears_dev_core as g
+
+DEFAULT_TABLE = os.path.join(here, '..', 'actual-gear-measurements.txt')
+PRESSURE_ANGLE = 20.0
+MM_PER_INCH = 25.4
+
+# text table sections: 'Name:' line, then tab separated rows
+SECTIONS = {
+    'Inches': {'units': 'in', 'columns': ('CP', 'DP', 'teeth', 'pitch_dia', 'od_calc', 'od', 'diff')},
+    'Metric': {'units': 'mm', 'columns': ('module', 'teeth', 'pitch_dia', 'od')},
+}
+
+
+def number(text):
+    " (value, tolerance) of a table entry: half a unit of its last printed digit "
+    text = text.strip()
+    value = float(text)
+    decimals = len(text.split('.')[1]) if '.' in text else 0
+    return (value, 0.5 * 10 ** -decimals)
+
+def is_row(fields):
+    for f in fields:
+        if f.strip():
+            try:
+                float(f)
+            except ValueError:
+                return False
+    return any([f.strip() for f in fields])
+
+def record(source, line, units, system, dimension, teeth, fields):
+    " a gear of a table, fields are the published values as text "
+    r = {'source': source, 'line': line, 'units': units, 'system': system,
+         'dimension': dimension, 'teeth': int(teeth)}
+    for name in ('pitch_dia', 'od', 'od_calc'):
+        if fields.get(name, '').strip():
+            r[name] = number(fields[name])
+    return r
+
+def read_text_table(path):
+    " the gears of a table in the format of actual-gear-measurements.txt "
+    records = []
+    section = None
+    with open(path) as f:
+        for (lineno, line) in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            if line.strip().endswith(':') and line.strip()[:-1] in SECTIONS:
+                section = SECTIONS[line.strip()[:-1]]
+                continue
+            fields = line.split('\t')
+            if section is None or not is_row(fields):
+                continue
+            row = dict(zip(section['columns'], fields))
+            if row.get('CP', '').strip():
+                (system, dimension) = ('CP', float(row['CP']))
+            elif row.get('DP', '').strip():
+                (system, dimension) = ('DP', float(row['DP']))
+            else:
+                (system, dimension) = ('MM', float(row['module']))
+            records.append(record(path, lineno, section['units'], system, dimension, row['teeth'], row))
+    return records
+
+def read_csv_table(path):
+    " the gears of a CSV table: units, system, dimension, teeth, pitch_dia, od "
+    records = []
+    with open(path) as f:
+        for (lineno, row) in enumerate(csv.DictReader(f), 2):
+            records.append(record(path, lineno, row['units'].strip(), row['system'].strip().upper(),
+                                  float(row['dimension']), row['teeth'], row))
+    return records
+
+def read_table(path):
+    if path.lower().endswith('.csv'):
+        return read_csv_table(path)
+    return read_text_table(path)
+
+
+def equivalent_specs(r):
+    """ the gear r in all tooth systems: [(system, dimension, dialog units)]
+        - CP in the units of the table, DP per inch, module in mm
+    """
+    cp = g.calc_circular_pitch(r['dimension'], r['system'], g.unit_factor(r['units']))    # px
+    cp_in = cp / g.unit_factor('in')
+    cp_mm = cp / g.unit_factor('mm')
+    return [('CP', cp / g.unit_factor(r['units']), r['units']),
+            ('DP', g.pi / cp_in, 'in'),
+            ('MM', cp_mm / g.pi, 'mm')]
+
+def compute(r, system, dimension, units):
+    " (pitch diameter, outer diameter) in the units of the table "
+    uf = g.unit_factor(units)
+    pitch = g.calc_circular_pitch(dimension, system, uf)
+    (pitch_radius, base_radius, addendum, dedendum,
+     outer_radius, root_radius, tooth) = g.gear_calculations(r['teeth'], pitch, PRESSURE_ANGLE)
+    table_uf = g.unit_factor(r['units'])
+    return (2 * pitch_radius / table_uf, 2 * outer_radius / table_uf)
+
+def validate(records, od_tolerance):
+    """ compare all records in all tooth systems
+        - returns (rows, errors, warnings), rows are
+          (record, system, pitch_dia, od, [(column, deviation, status)])
+    """
+    rows = []
+    errors = warnings = 0
+    for r in records:
+        for (system, dimension, units) in equivalent_specs(r):
+            (pitch_dia, od) = compute(r, system, dimension, units)
+            checks = []
+            for (column, value) in (('pitch_dia', pitch_dia), ('od_calc', od), ('od', od)):
+                if column not in r:
+                    continue
+                (published, tolerance) = r[column]
+                deviation = value - published
+                status = 'ok'
+                if column == 'od':
+                    limit = od_tolerance * (MM_PER_INCH if r['units'] == 'mm' else 1.0)
+                    if abs(deviation) > max(tolerance, limit) + 1e-9:
+                        status = 'WARN'
+                        warnings += 1
+                elif abs(deviation) > tolerance + 1e-9:
+                    status = 'FAIL'
+                    errors += 1
+                checks.append((column, deviation, status))
+            rows.append((r, system, pitch_dia, od, checks))
+    return (rows, errors, warnings)
+
+def time_batch(records, repeat):
+    """ records per second of the complete computation (all systems),
+        best of repeat runs; cold: memo caches cleared, warm: not cleared
+    """
+    result = {}
+    for (label, clear) in (('cold', True), ('warm', False)):
+        best = None
+        for i in range(repeat):
+            start = time.time()
+            for r in records:
+                if clear:
+                    g.memo_clear()
+                for spec in equivalent_specs(r):
+                    compute(r, *spec)
+            t = time.time() - start
+            best = t if best is None else min(best, t)
+        result[label] = len(records) / best if best > 0 else 0
+    return result
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options] [TABLE...] (default: actual-gear-measurements.txt)')
+    parser.add_option('-n', '--repeat', type='int', default=20, help='timing: best of N runs (default %default)')
+    parser.add_option('-t', '--od-tolerance', type='float', default=0.001,
+                      help='allowed deviation of vendor outer diameters, in inch (default %default)')
+    parser.add_option('-q', '--quiet', action='store_true', default=False, help='only warnings, errors and summary')
+    (opts, args) = parser.parse_args(argv)
+
+    records = []
+    for path in args or [DEFAULT_TABLE]:
+        records.extend(read_table(path))
+    (rows, errors, warnings) = validate(records, opts.od_tolerance)
+
+    for (r, system, pitch_dia, od, checks) in rows:
+        bad = [c for c in checks if c[2] != 'ok']
+        if opts.quiet and not bad:
+            continue
+        text = ' '.join(['%s %+.5f %s' % c for c in checks])
+        print('%s:%d %s %g %3d teeth as %s: pitch dia %.4f, OD %.4f %s  %s' %
+              (os.path.basename(r['source']), r['line'], r['system'], r['dimension'], r['teeth'], system,
+               pitch_dia, od, r['units'], text))
+
+    speed = time_batch(records, max(1, opts.repeat))
+    print('%d gears (%d computations): %d errors, %d warnings; %.0f gears/s cold, %.0f gears/s warm' %
+          (len(records), len(rows), errors, warnings, speed['cold'], speed['warm']))
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -44,13 +44,21 @@ Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
       they take their units from the Unit input just like all the other measures.
 '''
 
+from __future__ import print_function
 import inkex, simplestyle
 from os import devnull # for debugging
-from math import pi, cos, sin, tan, radians, degrees, ceil, asin, acos, sqrt
-two_pi = 2 * pi
+from math import pi, radians, copysign
+import hashlib
 
+# The geometry lives in gears_dev_core.py (no inkex needed there).
+# Everything is re-exported here for users of the old single file module.
+from gears_dev_core import *
+import gears_dev_core
+from gears_dev_cache import GeometryCache, cached_gear_outline, cached_stage
+from gears_dev_profile import Profiler
+# gears_dev_mesh (and numpy) are imported when annotations need them:
+# inkscape starts this script anew for every preview.
 
-__version__ = '0.9'
 
 def uutounit(self,nn,uu):
   try:
@@ -58,310 +66,45 @@ def uutounit(self,nn,uu):
   except:
     return inkex.uutounit(nn,uu)	# inkscape 0.48
 
-def linspace(a,b,n):
-    """ return list of linear interp of a to b in n steps
-        - if a and b are ints - you'll get an int result.
-        - n must be an integer
-    """
-    return [a+x*(b-a)/(n-1) for x in range(0,n)]
-
-def involute_intersect_angle(Rb, R):
-    " "
-    Rb, R = float(Rb), float(R)
-    return (sqrt(R**2 - Rb**2) / (Rb)) - (acos(Rb / R))
-
-def point_on_circle(radius, angle):
-    " return xy coord of the point at distance radius from origin at angle "
-    x = radius * cos(angle)
-    y = radius * sin(angle)
-    return (x, y)
-    
-def points_to_bbox(p):
-    """ from a list of points (x,y pairs)
-        - return the lower-left xy and upper-right xy
-    """
-    llx = urx = p[0][0]
-    lly = ury = p[0][1]
-    for x in p[1:]:
-        if   x[0] < llx: llx = x[0]
-        elif x[0] > urx: urx = x[0]
-        if   x[1] < lly: lly = x[1]
-        elif x[1] > ury: ury = x[1]
-    return (llx, lly, urx, ury)
-
-def points_to_bbox_center(p):
-    """ from a list of points (x,y pairs)
-        - find midpoint of bounding box around all points
-        - return (x,y)
-    """
-    bbox = points_to_bbox(p)
-    return ((bbox[0]+bbox[2])/2.0, (bbox[1]+bbox[3])/2.0)
-                
-def points_to_svgd(p):
-    " convert list of points into a closed SVG path list"
-    f = p[0]
-    p = p[1:]
-    svgd = 'M%.4f,%.4f' % f
-    for x in p:
-        svgd += 'L%.4f,%.4f' % x
-    svgd += 'z'
-    return svgd
-
 def draw_SVG_circle(parent, r, cx, cy, name, style):
     " add an SVG circle entity to parent "
     circ_attribs = {'style': simplestyle.formatStyle(style),
                     'cx': str(cx), 'cy': str(cy), 
                     'r': str(r),
                     inkex.addNS('label','inkscape'):name}
-    circle = inkex.etree.SubElement(parent, inkex.addNS('circle','svg'), circ_attribs )
-
-
-### Undercut support functions
-def undercut_min_teeth(pitch_angle, k=1.0):
-    """ computes the minimum tooth count for a 
-        spur gear so that no undercut with the given pitch_angle (in deg) 
-        and an addendum = k * metric_module, where 0 < k < 1
-    Note:
-    The return value should be rounded upwards for perfect safety. E.g.
-    min_teeth = int(math.ceil(undercut_min_teeth(20.0)))    # 18, not 17
-    """
-    x = sin(radians(pitch_angle))
-    return 2*k /(x*x)
-
-def undercut_max_k(teeth, pitch_angle=20.0):
-    """ computes the maximum k value for a given teeth count and pitch_angle
-        so that no undercut occurs.
-    """
-    x = sin(radians(pitch_angle))
-    return 0.5 * teeth * x * x
-
-def undercut_min_angle(teeth, k=1.0):
-    """ computes the minimum pitch angle, to that the given teeth count (and
-        profile shift) cause no undercut.
-    """
-    return degrees(asin(min(0.856, sqrt(2.0*k/teeth))))    # max 59.9 deg
-
-
-def have_undercut(teeth, pitch_angle=20.0, k=1.0):
-    """ returns true if the specified number of teeth would
-        cause an undercut.
-    """
-    return (teeth < undercut_min_teeth(pitch_angle, k))
-
-
-## gather all basic gear calculations in one place
-def gear_calculations(num_teeth, circular_pitch, pressure_angle, clearance=0, ring_gear=False, profile_shift=0.):
-    """ Put base calcs for spur/ring gears in one place.
-        - negative profile shifting helps against undercut. 
-    """
-    diametral_pitch = pi / circular_pitch
-    pitch_diameter = num_teeth / diametral_pitch
-    pitch_radius = pitch_diameter / 2.0
-    addendum = 1 / diametral_pitch
-    #dedendum = 1.157 / diametral_pitch # auto calc clearance
-    dedendum = addendum
-    dedendum *= 1+profile_shift
-    addendum *= 1-profile_shift
-    if ring_gear:
-        addendum = addendum + clearance # our method
-    else:
-        dedendum = dedendum + clearance # our method
-    #
-    #
-    base_radius = pitch_diameter * cos(radians(pressure_angle)) / 2.0
-    outer_radius = pitch_radius + addendum
-    root_radius =  pitch_radius - dedendum
-    # Tooth thickness: Tooth width along pitch circle.
-    tooth_thickness  = ( pi * pitch_diameter ) / ( 2.0 * num_teeth )
-    # we don't use these
-    working_depth = 2 / diametral_pitch
-    whole_depth = 2.157 / diametral_pitch
-    #outside_diameter = (num_teeth + 2) / diametral_pitch
-    #
-    return (pitch_radius, base_radius,
-            addendum, dedendum, outer_radius, root_radius,
-            tooth_thickness
-            )
-
- 
-def generate_rack_points(tooth_count, pitch, addendum, pressure_angle,
-                       base_height, tab_length, clearance=0, draw_guides=False):
-        """ Return path (suitable for svg) of the Rack gear.
-            - rack gear uses straight sides
-                - involute on a circle of infinite radius is a simple linear ramp
-            - the meshing circle touches at y = 0, 
-            - the highest elevation of the teeth is at y = +addendum
-            - the lowest elevation of the teeth is at y = -addendum-clearance
-            - the base_height extends downwards from the lowest elevation.
-            - we generate this middle tooth exactly centered on the y=0 line.
-              (one extra tooth on the right hand side, if number of teeth is even)
-        """
-        spacing = 0.5 * pitch # rolling one pitch distance on the spur gear pitch_diameter.
-        # roughly center rack in drawing, exact position is so that it meshes
-        # nicely with the spur gear.
-        # -0.5*spacing has a gap in the center.
-        # +0.5*spacing has a tooth in the center.
-        fudge = +0.5 * spacing
-
-        tas  = tan(radians(pressure_angle)) * addendum
-        tasc = tan(radians(pressure_angle)) * (addendum+clearance)
-        base_top = addendum+clearance
-        base_bot = addendum+clearance+base_height
-
-        x_lhs = -pitch * int(0.5*tooth_count-.5) - spacing - tab_length - tasc + fudge
-        #inkex.debug("angle=%s spacing=%s"%(pressure_angle, spacing))
-        # Start with base tab on LHS
-        points = [] # make list of points
-        points.append((x_lhs, base_bot))
-        points.append((x_lhs, base_top))
-        x = x_lhs + tab_length+tasc
-
-        # An involute on a circle of infinite radius is a simple linear ramp.
-        # We need to add curve at bottom and use clearance.
-        for i in range(tooth_count):
-            # move along path, generating the next 'tooth'
-            # pitch line is at y=0. the left edge hits the pitch line at x
-            points.append((x-tasc, base_top))
-            points.append((x+tas, -addendum))
-            points.append((x+spacing-tas, -addendum))
-            points.append((x+spacing+tasc, base_top)) 
-            x += pitch
-        x -= spacing # remove last adjustment
-        # add base on RHS
-        x_rhs = x+tasc+tab_length
-        points.append((x_rhs, base_top))
-        points.append((x_rhs, base_bot))
-        # We don't close the path here. Caller does it.
-        # points.append((x_lhs, base_bot))
-
-        # Draw line representing the pitch circle of infinite diameter
-        guide_path = None
-        if draw_guides:
-            p = []
-            p.append( (x_lhs + 0.5 * tab_length, 0) )
-            p.append( (x_rhs - 0.5 * tab_length, 0) )
-            guide_path = points_to_svgd(p)
-        # return points ready for use in an SVG 'path'
-        return (points, guide_path)
-    
+    inkex.etree.SubElement(parent, inkex.addNS('circle','svg'), circ_attribs )
+
+def shared_key(d, style):
+    " content key of a gear path shared in <defs> "
+    return hashlib.sha1((style + '\n' + d).encode('utf-8')).hexdigest()[:16]
 
-def generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular):
-    """ given a set of core gear params
-        - generate the svg path for the gear
-    """
-    half_thick_angle = two_pi / (4.0 * teeth ) #?? = pi / (2.0 * teeth)
-    pitch_to_base_angle  = involute_intersect_angle( base_radius, pitch_radius )
-    pitch_to_outer_angle = involute_intersect_angle( base_radius, outer_radius ) - pitch_to_base_angle
-
-    start_involute_radius = max(base_radius, root_radius)
-    radii = linspace(start_involute_radius, outer_radius, accuracy_involute)
-    angles = [involute_intersect_angle(base_radius, r) for r in radii]
-
-    centers = [(x * two_pi / float( teeth) ) for x in range( teeth ) ]
-    points = []
-
-    for c in centers:
-        # Angles
-        pitch1 = c - half_thick_angle
-        base1  = pitch1 - pitch_to_base_angle
-        offsetangles1 = [ base1 + x for x in angles]
-        points1 = [ point_on_circle( radii[i], offsetangles1[i]) for i in range(0,len(radii)) ]
-
-        pitch2 = c + half_thick_angle
-        base2  = pitch2 + pitch_to_base_angle
-        offsetangles2 = [ base2 - x for x in angles] 
-        points2 = [ point_on_circle( radii[i], offsetangles2[i]) for i in range(0,len(radii)) ]
-
-        points_on_outer_radius = [ point_on_circle(outer_radius, x) for x in linspace(offsetangles1[-1], offsetangles2[-1], accuracy_circular) ]
-
-        if root_radius > base_radius:
-            pitch_to_root_angle = pitch_to_base_angle - involute_intersect_angle(base_radius, root_radius )
-            root1 = pitch1 - pitch_to_root_angle
-            root2 = pitch2 + pitch_to_root_angle
-            points_on_root = [point_on_circle (root_radius, x) for x in linspace(root2, root1+(two_pi/float(teeth)), accuracy_circular) ]
-            p_tmp = points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root[1:-1] # [::-1] reverses list; [1:-1] removes first and last element
-        else:
-            points_on_root = [point_on_circle (root_radius, x) for x in linspace(base2, base1+(two_pi/float(teeth)), accuracy_circular) ]
-            p_tmp = points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root # [::-1] reverses list
-
-        points.extend( p_tmp )
-    return (points)
-
-
-def generate_spokes_path(root_radius, spoke_width, spoke_count, mount_radius, mount_hole,
-                         unit_factor, unit_label):
-    """ given a set of constraints
-        - generate the svg path for the gear spokes
-        - lies between mount_radius (inner hole) and root_radius (bottom of the teeth)
-        - spoke width also defines the spacing at the root_radius
-        - mount_radius is adjusted so that spokes fit if there is room
-        - if no room (collision) then spokes not drawn
-    """
-    # Spokes
-    collision = False # assume we draw spokes
-    messages = []     # messages to send back about changes.
-    path = ''
-    r_outer = root_radius - spoke_width
-    # checks for collision with spokes
-    # check for mount hole collision with inner spokes
-    if mount_radius <= mount_hole/2:
-        adj_factor = (r_outer - mount_hole/2) / 5
-        if adj_factor < 0.1:
-            # not enough reasonable room
-            collision = True
-        else:
-            mount_radius = mount_hole/2 + adj_factor # small fix
-            messages.append("Mount support too small. Auto increased to %2.2f%s." % (mount_radius/unit_factor*2, unit_label))
-            
-    # then check to see if cross-over on spoke width
-    if spoke_width * spoke_count +0.5 >= two_pi * mount_radius:
-        adj_factor = 1.2 # wrong value. its probably one of the points distances calculated below
-        mount_radius += adj_factor
-        messages.append("Too many spokes. Increased Mount support by %2.3f%s" % (adj_factor/unit_factor, unit_label))
-    
-    # check for collision with outer rim
-    if r_outer <= mount_radius:
-        # not enough room to draw spokes so cancel
-        collision = True
-    if collision: # don't draw spokes if no room.
-        messages.append("Not enough room for Spokes. Decrease Spoke width.")
-    else: # draw spokes
-        for i in range(spoke_count):
-            points = []
-            start_a, end_a = i * two_pi / spoke_count, (i+1) * two_pi / spoke_count
-            # inner circle around mount
-            asin_factor = spoke_width/mount_radius/2
-            # check if need to clamp radius
-            asin_factor = max(-1.0, min(1.0, asin_factor)) # no longer needed - resized above
-            a = asin(asin_factor)
-            points += [ point_on_circle(mount_radius, start_a + a), point_on_circle(mount_radius, end_a - a)]
-            # is inner circle too small
-            asin_factor = spoke_width/r_outer/2
-            # check if need to clamp radius
-            asin_factor = max(-1.0, min(1.0, asin_factor)) # no longer needed - resized above
-            a = asin(asin_factor)
-            points += [point_on_circle(r_outer, end_a - a), point_on_circle(r_outer, start_a + a) ]
-
-            path += (
-                    "M %f,%f" % points[0] +
-                    "A  %f,%f %s %s %s %f,%f" % tuple((mount_radius, mount_radius, 0, 0 if spoke_count!=1 else 1, 1 ) + points[1]) +
-                    "L %f,%f" % points[2] +
-                    "A  %f,%f %s %s %s %f,%f" % tuple((r_outer, r_outer, 0, 0 if spoke_count!=1 else 1, 0 ) + points[3]) +
-                    "Z"
-                    )
-    return (path, messages)
 
 
 class Gears(inkex.Effect):
+    path_stroke = '#000000'  # might expose one day
+    path_fill   = 'none'     # no fill - just a line
+    path_stroke_width  = 0.6            # might expose one day
+    path_stroke_light  = path_stroke_width * 0.25   # guides are thinner
+
+    _tty = None
+    _shared = None      # see shared_paths()
+    cache = None        # GeometryCache of the stages, set by draw_gear()
+
+    @property
+    def tty(self):
+        """ an alternate way to get debug info: /dev/tty, opened on first use
+            (could use inkex.debug(string) instead...)
+        """
+        if self._tty is None:
+            try:
+                self._tty = open("/dev/tty", 'w')
+            except:
+                self._tty = open(devnull, 'w')  # '/dev/null' for POSIX, 'nul' for Windows.
+                # print >>self.tty, "gears-dev " + __version__
+        return self._tty
+
     def __init__(self):
         inkex.Effect.__init__(self)
-        # an alternate way to get debug info:
-        # could use inkex.debug(string) instead...
-        try:
-            self.tty = open("/dev/tty", 'w')
-        except:
-            self.tty = open(devnull, 'w')  # '/dev/null' for POSIX, 'nul' for Windows.
-            # print >>self.tty, "gears-dev " + __version__
         self.OptionParser.add_option("-t", "--teeth",
                                      action="store", type="int",
                                      dest="teeth", default=24,
@@ -473,6 +216,66 @@ class Gears(inkex.Effect):
                                      dest="base_tab", default=14,
                                      help="Length of tabs on ends of rack")
 
+        self.OptionParser.add_option("", "--max-deviation",
+                                     action="store", type="float",
+                                     dest="max_deviation", default=0.0,
+                                     help="Adaptive accuracy: largest distance of the path from the true tooth curve. 0: use --accuracy")
+
+        self.OptionParser.add_option("", "--compact",
+                                     action="store", type="inkbool",
+                                     dest="compact", default=False,
+                                     help="Compact path output: relative coordinates, true arcs, precision from units")
+
+        self.OptionParser.add_option("", "--gear-set",
+                                     action="store", type="string",
+                                     dest="gear_set", default="",
+                                     help="Several meshing gears, e.g. '24; 12@1:90; 36=2'. Empty: one gear of Number of teeth")
+
+        self.OptionParser.add_option("", "--animation",
+                                     action="store", type="string",
+                                     dest="animation", default="none",
+                                     help="Animate the gear set: none, smil (animateTransform) or frames")
+
+        self.OptionParser.add_option("", "--frames",
+                                     action="store", type="int",
+                                     dest="frames", default=36,
+                                     help="Number of frames for one turn of the first gear")
+
+        self.OptionParser.add_option("", "--duration",
+                                     action="store", type="float",
+                                     dest="duration", default=10.0,
+                                     help="Seconds for one turn of the first gear (smil)")
+
+        self.OptionParser.add_option("", "--shared-defs",
+                                     action="store", type="inkbool",
+                                     dest="shared_defs", default=False,
+                                     help="Store each distinct gear outline once in <defs>, draw <use> elements of it")
+
+        self.OptionParser.add_option("", "--collapse-duplicates",
+                                     action="store", type="inkbool",
+                                     dest="collapse_duplicates", default=False,
+                                     help="Only replace the repeated gear outlines of the document by <use> elements of shared <defs> paths")
+
+        self.OptionParser.add_option("", "--cache",
+                                     action="store", type="inkbool",
+                                     dest="cache", default=False,
+                                     help="Reuse gear outlines and stages computed before (on-disk cache in ~/.cache/inkscape-gears-dev)")
+
+        self.OptionParser.add_option("", "--clear-cache",
+                                     action="store", type="inkbool",
+                                     dest="clear_cache", default=False,
+                                     help="Empty the geometry cache before drawing")
+
+        self.OptionParser.add_option("", "--profile",
+                                     action="store", type="string",
+                                     dest="profile", default="",
+                                     help="Write per stage timings as JSON to stderr or this file. Empty: $GEARS_DEV_PROFILE")
+
+        self.OptionParser.add_option("", "--profile-hook",
+                                     action="store", type="string",
+                                     dest="profile_hook", default="none",
+                                     help="Add a cprofile or tracemalloc report to the timings: none, cprofile, tracemalloc")
+
         self.OptionParser.add_option("", "--undercut-alert",
                                      action="store", type="inkbool", 
                                      dest="undercut_alert", default=False,
@@ -511,35 +314,413 @@ class Gears(inkex.Effect):
         """ We use math based on circular pitch.
             Expressed in inkscape units which is 90dpi 'pixel' units.
         """
-        dimension = self.options.dimension
         # print >> self.tty, "unit_factor=%s, doc_units=%s, dialog_units=%s (%s), system=%s" % (unit_factor, doc_units, dialog_units, self.options.units, self.options.system)
-        if   self.options.system == 'CP': # circular pitch
-            circular_pitch = dimension
-        elif self.options.system == 'DP': # diametral pitch 
-            circular_pitch = pi / dimension
-        elif self.options.system == 'MM': # module (metric)
-            circular_pitch = dimension * pi
-        else:
-            inkex.debug("unknown system '%s', try CP, DP, MM" % self.options.system)
-        # circular_pitch defines the size in inches.
-        # We divide the internal inch factor (px = 90dpi), to remove the inch 
-        # unit.
         # The internal inkscape unit is always px, 
         # it is independent of the doc_units!
-        return circular_pitch * unit_factor
+        try:
+            return gears_dev_core.calc_circular_pitch(self.options.dimension, self.options.system, unit_factor)
+        except ValueError as e:
+            inkex.debug(str(e))
+            raise
 
 
 
+    def gear_path(self, cache, teeth, ring, pitch, unit_factor, accuracy_involute, accuracy_circular, max_deviation):
+        """ path data of one gear: the outline, spokes and mount hole, or the ring.
+            - returns (path data, bounding box, messages)
+            - cached with all its inputs: editing only the guides, rack or
+              annotations reuses the path, editing the spokes the outline.
+        """
+        spoke_width = self.options.spoke_width * unit_factor
+        mount_hole = self.options.mount_hole * unit_factor
+        mount_radius = self.options.mount_diameter * 0.5 * unit_factor
+        spec = (teeth, pitch, self.options.angle, self.options.clearance * unit_factor, ring, self.options.profile_shift*0.01)
+        accuracy = (accuracy_involute, accuracy_circular, max_deviation)
+        precision = compact_precision(unit_factor) if self.options.compact else None
+        profiler = self.profiler
+
+        def compute():
+            with profiler.stage('gear_calculations'):
+                gear = GearGeometry(*spec)
+            # one writer collects the outline, spokes and holes
+            if self.options.compact:
+                path = PathWriter(precision, relative=True, compact=True)
+            else:
+                path = PathWriter()
+            with profiler.stage('outline'):
+                gear.outline = cached_gear_outline(cache, path, spec, accuracy, arcs=self.options.compact)
+            if profiler.enabled:
+                outline_bytes = len(path.getvalue())
+                profiler.add('outline', points=gear.point_count(), bytes=outline_bytes)
+            messages = []
+            with profiler.stage('spokes'):
+                # the classic output keeps the '%f' format of the spokes and holes
+                holes = path if self.options.compact else ClassicPathWriter()
+                # Spokes (add to current path)
+                if not ring:  # only draw internals if spur gear
+                    spokes_path, messages = generate_spokes_path(gear.root_radius, spoke_width, self.options.spoke_count,
+                                                                 mount_radius, mount_hole,
+                                                                 unit_factor, self.options.units, holes)
+                    # Draw mount hole
+                    holes.circle(mount_hole / 2)
+                else:
+                    # its a ring gear
+                    # which only has an outer ring where width = spoke width
+                    holes.circle(gear.outer_radius + spoke_width)
+                if holes is not path:
+                    path.raw(holes.getvalue())
+                d = path.getvalue()
+            if profiler.enabled:
+                profiler.add('spokes', bytes=len(d) - outline_bytes)
+            # bounding box from the gear parameters, the points only for very few teeth
+            if ring:
+                bbox = circle_bbox(gear.outer_radius + spoke_width)
+            elif gear.outline is None:     # true arcs, no points
+                bbox = spur_outline_bbox(gear.teeth, gear.base_radius, gear.pitch_radius, gear.outer_radius,
+                                         gear.root_radius, *accuracy)
+            else:
+                bbox = gear.bbox()
+            return (d, bbox, messages)
+
+        inputs = (spec, accuracy, self.options.spoke_count, spoke_width, mount_radius, mount_hole,
+                  precision, unit_factor, self.options.units)
+        with profiler.stage('gear_path'):
+            return cached_stage(cache, 'gear_path', inputs, compute)
+
+    def draw_guides(self, node, pitch, pitch_radius):
+        " center cross and pitch circle (for mating) under node, if selected "
+        style = { 'stroke': self.path_stroke, 'fill': self.path_fill, 'stroke-width': self.path_stroke_light }
+        if self.options.centercross:
+            if self.options.compact:
+                cs = pitch / 3 # centercross length
+                d = PathWriter(compact=True)  # 'M-10,0,10,0M0-10,0,10'
+                d = d.move_to(-cs, 0).line_to(cs, 0).move_to(0, -cs).line_to(0, cs).getvalue()
+            else:
+                cs = str(pitch / 3) # centercross length
+                d = 'M-'+cs+',0L'+cs+',0M0,-'+cs+'L0,'+cs  # 'M-10,0L10,0M0,-10L0,10'
+            center_attribs = { inkex.addNS('label','inkscape'): 'Center cross',
+                               'style': simplestyle.formatStyle(style), 'd': d }
+            inkex.etree.SubElement(node, inkex.addNS('path','svg'), center_attribs )
+        if self.options.pitchcircle:
+            draw_SVG_circle(node, pitch_radius, 0, 0, 'Pitch circle', style)
+
+    def rack_path(self, pitch, addendum, unit_factor):
+        " (path data, guide path data or None) of the rack, cached "
+        rack = (self.options.teeth_length, pitch, addendum, self.options.angle,
+                self.options.base_height * unit_factor, self.options.base_tab * unit_factor,
+                self.options.clearance * unit_factor, self.options.pitchcircle)
+        precision = compact_precision(unit_factor) if self.options.compact else None
+
+        def compute():
+            (points, guide_path) = generate_rack_points(*rack)
+            if precision is not None:
+                path = PathWriter(precision, relative=True, compact=True)
+                path = path.polygon(points).getvalue()
+            else:
+                path = points_to_svgd(points)
+            return (path, guide_path)
+
+        return cached_stage(self.cache, 'rack_path', (rack, precision), compute)
+
+    def draw_rack(self, node, teeth, rotation, pitch, pitch_radius, addendum, unit_factor, x=0, y=0):
+        """ the rack below the gear at (x, y), meshing with it when it is rotated by rotation (deg)
+            - returns the group of the rack
+        """
+        tooth_count = self.options.teeth_length
+        with self.profiler.stage('rack'):
+            (path, guide_path) = self.rack_path(pitch, addendum, unit_factor)
+        self.profiler.add('rack', bytes=len(path))
+        # position below Gear, so that it meshes nicely
+        # xoff = 0          ## if teeth % 4 == 2.
+        # xoff = -0.5*pitch     ## if teeth % 4 == 0.
+        # xoff = -0.75*pitch    ## if teeth % 4 == 3.
+        # xoff = -0.25*pitch    ## if teeth % 4 == 1.
+        xoff = rack_offset(teeth, rotation) * pitch
+        t = 'translate(' + str( x + xoff ) + ',' + str( y + pitch_radius ) + ')'
+        g_attribs = { inkex.addNS('label', 'inkscape'): 'RackGear' + str(tooth_count),
+                      'transform': t }
+        rack = inkex.etree.SubElement(node, 'g', g_attribs)
+
+        # Create SVG Path for gear
+        style = {'stroke': self.path_stroke, 'fill': 'none', 'stroke-width': self.path_stroke_width }
+        self.gear_outline(rack, path, style, 'RackGear' + str(tooth_count))
+        if guide_path is not None:
+            style2 = { 'stroke': self.path_stroke, 'fill': 'none', 'stroke-width': self.path_stroke_light }
+            gear_attribs2 = { 'style': simplestyle.formatStyle(style2), 'd': guide_path }
+            inkex.etree.SubElement(rack, inkex.addNS('path', 'svg'), gear_attribs2)
+        return rack
+
+    def defs(self):
+        " the <defs> of the document, created if missing "
+        root = self.document.getroot()
+        defs = root.find(inkex.addNS('defs', 'svg'))
+        if defs is None:
+            defs = inkex.etree.SubElement(root, inkex.addNS('defs', 'svg'))
+        return defs
+
+    def shared_paths(self):
+        """ {content key: id} of the shared gear paths in <defs>, read once
+            - the paths are found by a hash of their content (gear-key), so equal
+              gears share one path, also with the gears of earlier runs
+        """
+        if self._shared is None:
+            self._shared = {}
+            for p in self.defs().iterchildren(inkex.addNS('path','svg')):
+                if p.get('gear-key') is not None and p.get('id'):
+                    self._shared.setdefault(shared_key(p.get('d', ''), p.get('style', '')), p.get('id'))
+        return self._shared
+
+    def shared_path(self, d, style, name):
+        " id of the <defs> path with path data d and style (text), added if missing "
+        shared = self.shared_paths()
+        key = shared_key(d, style)
+        if key not in shared:
+            shared[key] = self.uniqueId(name)
+            inkex.etree.SubElement(self.defs(), inkex.addNS('path','svg'),
+                                   { 'id': shared[key], 'gear-key': key, 'style': style, 'd': d })
+        return shared[key]
+
+    def gear_outline(self, node, d, style, name):
+        """ the path of a gear (or rack) under node: inline, or with --shared-defs
+            a <use> of the one path in <defs> that all equal gears share
+        """
+        style = simplestyle.formatStyle(style)
+        if self.options.shared_defs:
+            return inkex.etree.SubElement(node, inkex.addNS('use','svg'),
+                                          { inkex.addNS('href', 'xlink'): '#' + self.shared_path(d, style, name) })
+        return inkex.etree.SubElement(node, inkex.addNS('path','svg'), { 'style': style, 'd': d })
+
+    def collapse_duplicates(self):
+        """ replace repeated gear and rack outlines of the document by <use>
+            elements of one shared <defs> path each, in one pass
+            - an outline is the first path (or use) of a group drawn by this
+              extension (a gear group has 'info', a rack group is labelled RackGear)
+            - repeated: the same path data and style, or already shared in <defs>
+            - returns (paths replaced, shared paths used)
+        """
+        label = inkex.addNS('label','inkscape')
+        use_tag = inkex.addNS('use','svg')
+        found = {}  # key: [(group name, path)]
+        for g in self.document.getroot().iter(inkex.addNS('g','svg'), 'g'):
+            if g.get('info') is None and not (g.get(label) or '').startswith('RackGear'):
+                continue
+            for p in g.iterchildren(inkex.addNS('path','svg'), 'path', use_tag):
+                if p.tag != use_tag:    # not shared yet
+                    found.setdefault(shared_key(p.get('d', ''), p.get('style', '')), []).append((g.get(label) or 'Gear', p))
+                break
+        shared = self.shared_paths()
+        replaced = 0
+        used = set()
+        for (key, paths) in found.items():
+            if len(paths) < 2 and key not in shared:
+                continue
+            (name, first) = paths[0]
+            ref = self.shared_path(first.get('d', ''), first.get('style', ''), name)
+            for (name, p) in paths:
+                attribs = { inkex.addNS('href', 'xlink'): '#' + ref }
+                if p.get('transform'):
+                    attribs['transform'] = p.get('transform')
+                use = inkex.etree.Element(use_tag, attribs)
+                p.getparent().replace(p, use)
+                replaced += 1
+            used.add(ref)
+        return (replaced, len(used))
+
+    def animate(self, node, kind, amount, duration):
+        """ SMIL animateTransform under node, added to its transform:
+            rotate by amount (deg) or translate by amount (px, along x)
+            in duration (s), repeated
+        """
+        if kind == 'rotate':
+            (start, end) = ('0', '%.6f' % amount)
+        else:
+            (start, end) = ('0,0', '%.6f,0' % amount)
+        inkex.etree.SubElement(node, inkex.addNS('animateTransform', 'svg'),
+                               { 'attributeName': 'transform', 'attributeType': 'XML', 'type': kind,
+                                 'from': start, 'to': end, 'dur': '%.6fs' % duration,
+                                 'repeatCount': 'indefinite', 'additive': 'sum' })
+
+    def draw_frames(self, node, gears, speeds, paths, pitch, unit_factor):
+        """ --frames groups (frames) of one turn of the first gear under node
+            - the gear (and rack) paths are in <defs> once (shared_path()), the
+              frames only have <use> elements with the transforms of that frame.
+            - all frames but the first one are hidden
+        """
+        style = { 'stroke': self.path_stroke, 'fill': self.path_fill, 'stroke-width': self.path_stroke_width }
+        ids = {}
+        for key in sorted(paths):
+            ids[key] = self.shared_path(paths[key], simplestyle.formatStyle(style),
+                                        '%s%d' % ('RingGear' if key[1] else 'Gear', key[0]))
+        first = gears[0]
+        rack_id = None
+        if self.options.drawrack and not first['ring']:
+            (path, guide_path) = self.rack_path(pitch, first['calc'][2], unit_factor)
+            style['fill'] = 'none'
+            rack_id = self.shared_path(path, simplestyle.formatStyle(style), 'RackGear%d' % self.options.teeth_length)
+        href = inkex.addNS('href', 'xlink')
+        count = max(1, self.options.frames)
+        for f in range(count):
+            turn = 360.0 * f / count     # of the first gear
+            attribs = { inkex.addNS('label','inkscape'): 'Frame %d' % (f + 1) }
+            if f:
+                attribs['style'] = 'display:none'
+            frame = inkex.etree.SubElement(node, 'g', attribs)
+            for (gear, speed) in zip(gears, speeds):
+                t = 'translate(%s,%s) rotate(%s)' % (format_number(gear['x']), format_number(gear['y']),
+                                                     format_number((gear['rotation'] + speed * turn) % 360))
+                inkex.etree.SubElement(frame, inkex.addNS('use','svg'),
+                                       { href: '#' + ids[(gear['teeth'], gear['ring'])], 'transform': t })
+            if rack_id is not None:
+                # the rack moves pitch_radius * angle, its teeth repeat after a pitch
+                x = rack_offset(first['teeth'], first['rotation']) * pitch - (first['calc'][0] * radians(turn)) % pitch
+                t = 'translate(%s,%s)' % (format_number(first['x'] + x), format_number(first['y'] + first['calc'][0]))
+                inkex.etree.SubElement(frame, inkex.addNS('use','svg'), { href: '#' + rack_id, 'transform': t })
+
+    def mesh_notes(self, kind, specs, unit_factor, name):
+        """ annotation lines of a mesh analysis, cached
+            - kind 'gear': specs are the two gears, 'rack': the gear and the rack
+            - gears_dev_mesh (and numpy) are only imported to compute them. With
+              the cache the analysis gets more time, one cut short by its time
+              budget is not stored.
+        """
+        def compute():
+            import gears_dev_mesh
+            budget = gears_dev_mesh.TIME_BUDGET
+            if self.cache is not None and self.cache.enabled:
+                budget *= 10    # paid once, later previews read the result
+            if kind == 'rack':
+                result = gears_dev_mesh.analyze_rack_mesh(*specs, time_budget=budget)
+            else:
+                result = gears_dev_mesh.analyze_mesh(*specs, time_budget=budget)
+            return {'complete': result['complete'],
+                    'notes': gears_dev_mesh.mesh_notes(result, unit_factor, self.options.units, name)}
+
+        inputs = (kind, specs, unit_factor, self.options.units, name)
+        return cached_stage(self.cache, 'mesh_notes', inputs, compute, keep=lambda r: r['complete'])['notes']
+
+    def rack_notes(self, spec, pitch, addendum, unit_factor):
+        " annotation lines of the mesh analysis of the gear spec with the rack "
+        rack = (self.options.teeth_length, pitch, addendum, self.options.angle,
+                self.options.base_height * unit_factor, self.options.base_tab * unit_factor,
+                self.options.clearance * unit_factor)
+        return self.mesh_notes('rack', (spec, rack), unit_factor, 'Rack')
+
+    def draw_gear_set(self, cache, pitch, unit_factor, max_deviation):
+        """ all gears of --gear-set in one group, meshing.
+            - see parse_gear_set() for the syntax, gear_set_layout() for the placement
+            - equal gears share their path data, it is computed once.
+            - the rack (if selected) meshes with the first gear.
+        """
+        angle = self.options.angle
+        clearance = self.options.clearance * unit_factor
+        shift = self.options.profile_shift*0.01
+        try:
+            gear_set = parse_gear_set(self.options.gear_set)
+            gears = gear_set_layout(gear_set, pitch, angle, clearance, shift)
+        except ValueError as e:
+            inkex.errormsg(str(e))
+            return
+        t = 'translate(' + str( self.view_center[0] ) + ',' + str( self.view_center[1] ) + ')'
+        top = inkex.etree.SubElement(self.current_layer, 'g',
+                                     { inkex.addNS('label','inkscape'): 'GearSet', 'transform': t })
+        style = { 'stroke': self.path_stroke, 'fill': self.path_fill, 'stroke-width': self.path_stroke_width }
+        paths = {}  # (teeth, ring): path data
+        warnings = []
+        for gear in gears:
+            teeth = gear['teeth']
+            key = (teeth, gear['ring'])
+            if key not in paths:
+                (accuracy_involute, accuracy_circular) = accuracy_settings(teeth, self.options.accuracy)
+                (paths[key], bbox, msg) = self.gear_path(cache, teeth, gear['ring'], pitch, unit_factor,
+                                                         accuracy_involute, accuracy_circular, max_deviation)
+                warnings.extend(msg)
+                msg = undercut_message(teeth, angle)
+                if msg is not None and not gear['ring']:
+                    warnings.append(msg.split("\n")[0])
+                    print(msg, file=self.tty)
+
+        first = gears[0]
+        speeds = gear_set_speeds(gear_set)
+        with self.profiler.stage('svg'):
+            if self.options.animation == 'frames':
+                self.draw_frames(top, gears, speeds, paths, pitch, unit_factor)
+            else:
+                smil = self.options.animation == 'smil'
+                duration = self.options.duration
+                for (i, (gear, speed)) in enumerate(zip(gears, speeds)):
+                    teeth = gear['teeth']
+                    t = 'translate(%s,%s) rotate(%s)' % (format_number(gear['x']), format_number(gear['y']),
+                                                         format_number(gear['rotation']))
+                    g_attribs = { inkex.addNS('label','inkscape'): '%s%d-%d' % ('RingGear' if gear['ring'] else 'Gear', teeth, i + 1),
+                                  'transform': t,
+                                  'info':'N:'+str(teeth)+'; Pitch:'+ str(pitch) + '; Pressure Angle: '+str(angle) }
+                    g = inkex.etree.SubElement(top, 'g', g_attribs)
+                    self.gear_outline(g, paths[(teeth, gear['ring'])], style,
+                                      '%s%d' % ('RingGear' if gear['ring'] else 'Gear', teeth))
+                    self.draw_guides(g, pitch, gear['calc'][0])
+                    if smil:
+                        # one pitch per loop, so each loop ends where it starts
+                        self.animate(g, 'rotate', copysign(360.0 / teeth, speed), duration / (teeth * abs(speed)))
+                if self.options.drawrack and not first['ring']:
+                    rack = self.draw_rack(top, first['teeth'], first['rotation'], pitch, first['calc'][0], first['calc'][2],
+                                          unit_factor, first['x'], first['y'])
+                    if smil:
+                        # turning the first gear by +angle moves the rack by -pitch_radius * angle
+                        self.animate(rack, 'translate', -pitch, duration * pitch / (2 * pi * first['calc'][0]))
+
+        if self.options.annotation:
+            with self.profiler.stage('annotations'):
+                notes = warnings + ['Gear %d: %d teeth%s at (%.3f, %.3f) %s, pitch diameter %.3f' %
+                                    (i + 1, gear['teeth'], ' (ring)' if gear['ring'] else '',
+                                     gear['x'] / unit_factor, gear['y'] / unit_factor, self.options.units,
+                                     gear['calc'][0] * 2 / unit_factor)
+                                    for (i, gear) in enumerate(gears)]
+                spec = lambda gear: (gear['teeth'], pitch, angle, clearance, gear['ring'], shift)
+                for (i, (entry, gear)) in enumerate(zip(gear_set, gears)):
+                    if entry[2] == 'mesh':
+                        parent = gears[entry[3]]
+                        notes.extend(self.mesh_notes('gear', (spec(parent), spec(gear)), unit_factor,
+                                                     'Mesh %d-%d' % (entry[3] + 1, i + 1)))
+                if self.options.drawrack and not first['ring']:
+                    notes.extend(self.rack_notes(spec(first), pitch, first['calc'][2], unit_factor))
+                text_height = 12
+                y = min([gear['y'] - gear['calc'][4] for gear in gears]) - (len(notes)+1) * text_height * 1.2
+                for note in notes:
+                    self.add_text(top, note, [first['x'], y], text_height)
+                    y += text_height * 1.2
+
     def effect(self):
+        """ draw the gear or gear set (or only collapse the duplicates of the document),
+            timed per stage if --profile or GEARS_DEV_PROFILE is set
+        """
+        try:
+            self.profiler = Profiler(self.options.profile, self.options.profile_hook)
+        except (ValueError, ImportError) as e:
+            inkex.errormsg(str(e))
+            self.profiler = Profiler('', 'none')
+        self.profiler.start()
+        try:
+            if self.options.collapse_duplicates:
+                with self.profiler.stage('collapse'):
+                    (replaced, shared) = self.collapse_duplicates()
+                inkex.errormsg('%d gear outlines replaced by <use> of %d shared paths in <defs>' % (replaced, shared))
+            else:
+                self.draw_gear()
+        finally:
+            try:
+                self.profiler.finish()
+            except IOError as e:
+                inkex.errormsg('cannot write the profile: %s' % e)
+
+    def draw_gear(self):
         """ Calculate Gear factors from inputs.
             - Make list of radii, angles, and centers for each tooth and 
               iterate through them
             - Turn on other visual features e.g. cross, rack, annotations, etc
         """
-        path_stroke = '#000000'  # might expose one day
-        path_fill   = 'none'     # no fill - just a line
-        path_stroke_width  = 0.6            # might expose one day
-        path_stroke_light  = path_stroke_width * 0.25   # guides are thinner
+        path_stroke = self.path_stroke
+        path_fill   = self.path_fill
+        path_stroke_width  = self.path_stroke_width
         #
         warnings = [] # list of extra messages to be shown in annotations
         # calculate unit factor for units defined in dialog. 
@@ -551,53 +732,42 @@ class Gears(inkex.Effect):
         # Clearance: Radial distance between top of tooth on one gear to 
         # bottom of gap on another.
         clearance = self.options.clearance * unit_factor
-        mount_hole = self.options.mount_hole * unit_factor
-        # for spokes
-        mount_radius = self.options.mount_diameter * 0.5 * unit_factor
-        spoke_count = self.options.spoke_count
+        # the holes, spokes and guide lines are drawn by gear_path() and draw_guides()
         spoke_width = self.options.spoke_width * unit_factor
-        holes_rounding = self.options.holes_rounding * unit_factor # unused
-        # visible guide lines
-        centercross = self.options.centercross # draw center or not (boolean)
-        pitchcircle = self.options.pitchcircle # draw pitch circle or not (boolean)
         # Accuracy of teeth curves
-        accuracy_involute = 20 # Number of points of the involute curve
-        accuracy_circular = 9  # Number of points on circular parts
-        if self.options.accuracy is not None:
-            if self.options.accuracy == 0:  
-                # automatic
-                if   teeth < 10: accuracy_involute = 20
-                elif teeth < 30: accuracy_involute = 12
-                else:            accuracy_involute = 6
-            else:
-                accuracy_involute = self.options.accuracy
-            accuracy_circular = max(3, int(accuracy_involute/2) - 1) # never less than three
+        (accuracy_involute, accuracy_circular) = accuracy_settings(teeth, self.options.accuracy)
+        # adaptive sampling replaces the accuracy tiers
+        max_deviation = None
+        if self.options.max_deviation > 0:
+            max_deviation = self.options.max_deviation * unit_factor
         # print >>self.tty, "accuracy_circular=%s accuracy_involute=%s" % (accuracy_circular, accuracy_involute)
         # Pitch (circular pitch): Length of the arc from one tooth to the next)
         # Pitch diameter: Diameter of pitch circle.
         pitch = self.calc_circular_pitch(unit_factor)
+        # the outlines come from the geometry cache if these gears were drawn before
+        cache = self.cache = GeometryCache(enabled=self.options.cache)
+        if self.options.clear_cache:
+            cache.clear()
+        if self.options.gear_set.strip():
+            return self.draw_gear_set(cache, pitch, unit_factor, max_deviation)
         # Replace section below with this call to get the combined gear_calculations() above
-        (pitch_radius, base_radius, addendum, dedendum,
-         outer_radius, root_radius, tooth) = gear_calculations(teeth, pitch, angle, clearance, self.options.internal_ring, self.options.profile_shift*0.01)
+        with self.profiler.stage('gear_calculations'):
+            gear = GearGeometry(teeth, pitch, angle, clearance, self.options.internal_ring, self.options.profile_shift*0.01)
 
         # Detect Undercut of teeth
 ##        undercut = int(ceil(undercut_min_teeth( angle )))
 ##        needs_undercut = teeth < undercut #? no longer needed ?
-        if have_undercut(teeth, angle, 1.0):
-            min_teeth = int(ceil(undercut_min_teeth(angle, 1.0)))
-            min_angle = undercut_min_angle(teeth, 1.0) + .1
-            max_k = undercut_max_k(teeth, angle)
-            msg = "Undercut Warning: This gear (%d teeth) will not work well.\nTry tooth count of %d or more,\nor a pressure angle of %.1f [deg] or more,\nor try a profile shift of %d %%.\nOr other decent combinations." % (teeth, min_teeth, min_angle, int(100.*max_k)-100.)
+        msg = undercut_message(teeth, angle)
+        if msg is not None:
             # alas annotation cannot handle the degree symbol. Also it ignore newlines.
             # so split and make a list
             warnings.extend(msg.split("\n"))
-	    if self.options.undercut_alert:
+            if self.options.undercut_alert:
                 inkex.debug(msg)
-	    else:
-                print >>self.tty, msg
+            else:
+                print(msg, file=self.tty)
 
         # All base calcs done. Start building gear
-        points = generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular)
         
 ##        half_thick_angle = two_pi / (4.0 * teeth ) #?? = pi / (2.0 * teeth)
 ##        pitch_to_base_angle  = involute_intersect_angle( base_radius, pitch_radius )
@@ -636,121 +806,65 @@ class Gears(inkex.Effect):
 ##
 ##            points.extend( p_tmp )
 
-        path = points_to_svgd( points )
-        bbox_center = points_to_bbox_center( points )
-
-        # Spokes (add to current path)
-        if not self.options.internal_ring:  # only draw internals if spur gear
-            spokes_path, msg = generate_spokes_path(root_radius, spoke_width, spoke_count, mount_radius, mount_hole,
-                                                    unit_factor, self.options.units)
-            warnings.extend(msg)
-            path += spokes_path
-
-            # Draw mount hole
-            # A : rx,ry  x-axis-rotation, large-arch-flag, sweepflag  x,y
-            r = mount_hole / 2
-            path += (
-                    "M %f,%f" % (0,r) +
-                    "A  %f,%f %s %s %s %f,%f" % (r,r, 0,0,0, 0,-r) +
-                    "A  %f,%f %s %s %s %f,%f" % (r,r, 0,0,0, 0,r) 
-                    )
-        else:
-            # its a ring gear
-            # which only has an outer ring where width = spoke width
-            r = outer_radius + spoke_width
-            path += (
-                    "M %f,%f" % (0,r) +
-                    "A  %f,%f %s %s %s %f,%f" % (r,r, 0,0,0, 0,-r) +
-                    "A  %f,%f %s %s %s %f,%f" % (r,r, 0,0,0, 0,r) 
-                    )
+        (path, bbox, msg) = self.gear_path(cache, teeth, self.options.internal_ring, pitch, unit_factor,
+                                           accuracy_involute, accuracy_circular, max_deviation)
+        warnings.extend(msg)
+        center = bbox_center(bbox)
         
         # Embed gear in group to make animation easier:
         #  Translate group, Rotate path.
-        t = 'translate(' + str( self.view_center[0] ) + ',' + str( self.view_center[1] ) + ')'
-        g_attribs = { inkex.addNS('label','inkscape'):'Gear' + str( teeth ),
-                      inkex.addNS('transform-center-x','inkscape'): str(-bbox_center[0]),
-                      inkex.addNS('transform-center-y','inkscape'): str(-bbox_center[1]),
-                      'transform':t,
-                      'info':'N:'+str(teeth)+'; Pitch:'+ str(pitch) + '; Pressure Angle: '+str(angle) }
-        # add the group to the current layer
-        g = inkex.etree.SubElement(self.current_layer, 'g', g_attribs )
-
-        # Create gear path under top level group
-        style = { 'stroke': path_stroke, 'fill': path_fill, 'stroke-width': path_stroke_width }
-        gear_attribs = { 'style': simplestyle.formatStyle(style), 'd': path }
-        gear = inkex.etree.SubElement(g, inkex.addNS('path','svg'), gear_attribs )
-
-        # Add center
-        if centercross:
-            style = { 'stroke': path_stroke, 'fill': path_fill, 'stroke-width': path_stroke_light }
-            cs = str(pitch / 3) # centercross length
-            d = 'M-'+cs+',0L'+cs+',0M0,-'+cs+'L0,'+cs  # 'M-10,0L10,0M0,-10L0,10'
-            center_attribs = { inkex.addNS('label','inkscape'): 'Center cross',
-                               'style': simplestyle.formatStyle(style), 'd': d }
-            center = inkex.etree.SubElement(g, inkex.addNS('path','svg'), center_attribs )
-
-        # Add pitch circle (for mating)
-        if pitchcircle:
-            style = { 'stroke': path_stroke, 'fill': path_fill, 'stroke-width': path_stroke_light }
-            draw_SVG_circle(g, pitch_radius, 0, 0, 'Pitch circle', style)
+        with self.profiler.stage('svg'):
+            t = 'translate(' + str( self.view_center[0] ) + ',' + str( self.view_center[1] ) + ')'
+            g_attribs = { inkex.addNS('label','inkscape'):'Gear' + str( teeth ),
+                          inkex.addNS('transform-center-x','inkscape'): str(-center[0]),
+                          inkex.addNS('transform-center-y','inkscape'): str(-center[1]),
+                          'transform':t,
+                          'info':'N:'+str(teeth)+'; Pitch:'+ str(pitch) + '; Pressure Angle: '+str(angle) }
+            # add the group to the current layer
+            g = inkex.etree.SubElement(self.current_layer, 'g', g_attribs )
+
+            # Create gear path under top level group
+            style = { 'stroke': path_stroke, 'fill': path_fill, 'stroke-width': path_stroke_width }
+            self.gear_outline(g, path, style, 'Gear' + str( teeth ))
+
+            # Add center and pitch circle (for mating)
+            self.draw_guides(g, pitch, gear.pitch_radius)
 
         # Add Rack (below)
         if self.options.drawrack:
-            base_height = self.options.base_height * unit_factor
-            tab_width = self.options.base_tab * unit_factor
-            tooth_count = self.options.teeth_length
-            (points, guide_path) = generate_rack_points(tooth_count, pitch, addendum, angle,
-                                                        base_height, tab_width, clearance, pitchcircle)
-            path = points_to_svgd(points)
-            # position below Gear, so that it meshes nicely
-            # xoff = 0          ## if teeth % 4 == 2.
-            # xoff = -0.5*pitch     ## if teeth % 4 == 0.
-            # xoff = -0.75*pitch    ## if teeth % 4 == 3.
-            # xoff = -0.25*pitch    ## if teeth % 4 == 1.
-            xoff = (-0.5, -0.25, 0, -0.75)[teeth % 4] * pitch
-            t = 'translate(' + str( xoff ) + ',' + str( pitch_radius ) + ')'
-            g_attribs = { inkex.addNS('label', 'inkscape'): 'RackGear' + str(tooth_count),
-                          'transform': t }
-            rack = inkex.etree.SubElement(g, 'g', g_attribs)
-
-            # Create SVG Path for gear
-            style = {'stroke': path_stroke, 'fill': 'none', 'stroke-width': path_stroke_width }
-            gear_attribs = { 'style': simplestyle.formatStyle(style), 'd': path }
-            gear = inkex.etree.SubElement(
-                rack, inkex.addNS('path', 'svg'), gear_attribs)
-            if guide_path is not None:
-                style2 = { 'stroke': path_stroke, 'fill': 'none', 'stroke-width': path_stroke_light }
-                gear_attribs2 = { 'style': simplestyle.formatStyle(style2), 'd': guide_path }
-                gear = inkex.etree.SubElement(
-                    rack, inkex.addNS('path', 'svg'), gear_attribs2)
+            self.draw_rack(g, teeth, 0.0, pitch, gear.pitch_radius, gear.addendum, unit_factor)
 
 
         # Add Annotations (above)
         if self.options.annotation:
-            outer_dia = outer_radius * 2
-            if self.options.internal_ring:
-                outer_dia += 2 * spoke_width
-            notes = []
-            notes.extend(warnings)
-            #notes.append('Document (%s) scale conversion = %2.4f' % (self.document.getroot().find(inkex.addNS('namedview', 'sodipodi')).get(inkex.addNS('document-units', 'inkscape')), unit_factor))
-            notes.extend(['Teeth: %d   CP: %2.4f(%s) ' % (teeth, pitch / unit_factor, self.options.units),
-                          'DP: %2.3f Module: %2.4f' % (pi / pitch * unit_factor, pitch / pi * 25.4),
-                          'Pressure Angle: %2.2f degrees' % (angle),
-                          'Pitch diameter: %2.3f %s' % (pitch_radius * 2 / unit_factor, self.options.units),
-                          'Outer diameter: %2.3f %s' % (outer_dia / unit_factor, self.options.units),
-                          'Root diameter:  %2.3f %s' % (root_radius * 2 / unit_factor, self.options.units),
-                          'Base diameter:  %2.3f %s' % (base_radius * 2 / unit_factor, self.options.units)#,
-                          #'Addendum:      %2.4f %s'  % (addendum / unit_factor, self.options.units),
-                          #'Dedendum:      %2.4f %s'  % (dedendum / unit_factor, self.options.units)
-                          ])
-            # text height relative to gear size.
-            # ranges from 10 to 22 over outer radius size 60 to 360
-            text_height = max(10, min(10+(outer_dia-60)/24, 22))
-            # position above
-            y = - outer_radius - (len(notes)+1) * text_height * 1.2
-            for note in notes:
-                self.add_text(g, note, [0,y], text_height)
-                y += text_height * 1.2
+            with self.profiler.stage('annotations'):
+                outer_dia = gear.outer_radius * 2
+                if self.options.internal_ring:
+                    outer_dia += 2 * spoke_width
+                notes = []
+                notes.extend(warnings)
+                if self.options.drawrack and not self.options.internal_ring:
+                    spec = (teeth, pitch, angle, clearance, False, self.options.profile_shift*0.01)
+                    notes.extend(self.rack_notes(spec, pitch, gear.addendum, unit_factor))
+                #notes.append('Document (%s) scale conversion = %2.4f' % (self.document.getroot().find(inkex.addNS('namedview', 'sodipodi')).get(inkex.addNS('document-units', 'inkscape')), unit_factor))
+                notes.extend(['Teeth: %d   CP: %2.4f(%s) ' % (teeth, pitch / unit_factor, self.options.units),
+                              'DP: %2.3f Module: %2.4f' % (pi / pitch * unit_factor, pitch / pi * 25.4),
+                              'Pressure Angle: %2.2f degrees' % (angle),
+                              'Pitch diameter: %2.3f %s' % (gear.pitch_radius * 2 / unit_factor, self.options.units),
+                              'Outer diameter: %2.3f %s' % (outer_dia / unit_factor, self.options.units),
+                              'Root diameter:  %2.3f %s' % (gear.root_radius * 2 / unit_factor, self.options.units),
+                              'Base diameter:  %2.3f %s' % (gear.base_radius * 2 / unit_factor, self.options.units)#,
+                              #'Addendum:      %2.4f %s'  % (addendum / unit_factor, self.options.units),
+                              #'Dedendum:      %2.4f %s'  % (dedendum / unit_factor, self.options.units)
+                              ])
+                # text height relative to gear size.
+                # ranges from 10 to 22 over outer radius size 60 to 360
+                text_height = max(10, min(10+(outer_dia-60)/24, 22))
+                # position above
+                y = - gear.outer_radius - (len(notes)+1) * text_height * 1.2
+                for note in notes:
+                    self.add_text(g, note, [0,y], text_height)
+                    y += text_height * 1.2
 
 if __name__ == '__main__':
     e = Gears()
@@ -0,0 +1,692 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Copyright (C) 2017 David Grimberg (sentinel @ bardicgrove.org)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+Headless batch generation of gears, no inkscape or inkex needed.
+
+Parameter sets are read from CSV, JSON or JSONL files, one gear per row or
+object. The parameter names are those of the dialog (gears-dev.inx),
+with '-' or '_': teeth, system, dimension, units, angle, clearance,
+profile-shift, internal-ring, mount-hole, mount-diameter, spoke-count,
+spoke-width, accuracy, max-deviation, compact, draw-rack,
+rack-teeth-length, rack-base-height, rack-base-tab and an optional name.
+Missing parameters take the dialog defaults. Unnamed gears are called
+gear-NNNN after their parameter set, swept ones get the swept values
+appended (gear-0003_teeth20). A name that is used twice is an error, the
+file is not overwritten.
+
+Sweeps generate every combination of parameter values, optionally on a
+process pool (-j). Each gear only depends on its parameters, so the output
+is the same for any number of workers.
+
+With --sheet all gears are also nested onto sheets of that size, with
+--kerf between them, and written as sheet-N.svg (see gears_dev_nest.py).
+
+DXF and G-code files are streamed from the generators with true arcs for
+the tip and root circles. --tool-radius moves the cuts outside of the
+gears (inside of holes); it and the feed settings are in --machine-units.
+
+usage: python gears_dev_batch.py [-f svg|dxf|gcode|none] [-o DIR] [-m manifest.json] params.csv ...
+       python gears_dev_batch.py -f none -m cat.json -j 0 -s teeth=8:300 -s dimension=0.5,1 -s angle=14.5,20
+       python gears_dev_batch.py -f none --sheet 600x400 --kerf 0.2 -s teeth=10:40
+       python gears_dev_batch.py -f gcode --tool-radius 1.5 --feed 800 --depth -3 gears.csv
+'''
+
+from __future__ import print_function
+import sys, os, re, csv, json, time, itertools, multiprocessing, optparse
+try:
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+except ImportError:     # python 2 without the futures backport: no pool
+    ProcessPoolExecutor = None
+
+from gears_dev_core import (unit_factor, calc_circular_pitch, accuracy_settings, gear_calculations,
+                            undercut_message, generate_rack_points,
+                            generate_spokes_path, write_spur_path, stream_gear_outline, compact_precision,
+                            rack_offset, rack_bbox, PathWriter)
+from gears_dev_cache import GeometryCache, cached_gear_outline, DEFAULT_MAX_BYTES
+from gears_dev_nest import gear_part, nest, nest_report
+from gears_dev_export import (DxfWriter, GcodeWriter, OffsetWriter, write_svg_header, write_svg_footer, write_svg_group_start,
+                              write_svg_group_end, write_svg_path_start, write_svg_path_end)
+
+# dialog defaults from gears-dev.inx
+DEFAULTS = {
+    'name':              '',
+    'teeth':             24,
+    'system':            'MM',
+    'dimension':         1.0,
+    'units':             'mm',
+    'angle':             20.0,
+    'clearance':         0.0,
+    'profile_shift':     0.0,
+    'internal_ring':     False,
+    'mount_hole':        4.0,
+    'mount_diameter':    10.0,
+    'spoke_count':       3,
+    'spoke_width':       3.0,
+    'accuracy':          0,
+    'max_deviation':     0.0,
+    'compact':           False,
+    'draw_rack':         False,
+    'rack_teeth_length': 10,
+    'rack_base_height':  5.0,
+    'rack_base_tab':     5.0,
+}
+
+PATH_STYLE = {'stroke': '#000000', 'fill': 'none', 'stroke-width': 0.6}
+
+# DXF / G-code settings, lengths in 'units' (mm or in)
+MACHINE = {
+    'units':       'mm',
+    'tool_radius': 0.0,
+    'feed':        600.0,
+    'plunge_feed': 100.0,
+    'depth':       -1.0,
+    'safe_z':      5.0,
+    'spindle':     None,
+}
+
+FORMATS = ('svg', 'dxf', 'gcode', 'none')
+
+try:
+    string_types = basestring   # python 2: csv/json give str or unicode
+except NameError:
+    string_types = str
+
+
+def coerce(value, default):
+    " convert value (e.g. a CSV string) to the type of default "
+    if isinstance(default, bool):
+        if isinstance(value, string_types):
+            return value.strip().lower() in ('1', 'true', 'yes', 'on')
+        return bool(value)
+    if isinstance(default, int):
+        return int(float(value))
+    if isinstance(default, float):
+        return float(value)
+    return str(value)
+
+def normalize_params(raw):
+    """ complete a parameter set with the defaults and convert all values.
+        - raises ValueError for unknown parameter names
+    """
+    params = dict(DEFAULTS)
+    for key, value in raw.items():
+        k = key.strip().replace('-', '_')
+        if k not in DEFAULTS:
+            raise ValueError("unknown parameter '%s'" % key)
+        if value is None or value == '':
+            continue    # empty CSV cell
+        params[k] = coerce(value, DEFAULTS[k])
+    return params
+
+def read_param_sets(path, fmt=None):
+    """ yield the raw parameter dicts of a CSV, JSON or JSONL file ('-' is stdin)
+        - fmt defaults to the file extension (stdin: jsonl)
+    """
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower().lstrip('.')
+        fmt = ext if ext in ('csv', 'json', 'jsonl') else 'jsonl'
+    f = sys.stdin if path == '-' else open(path)
+    try:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                yield row
+        elif fmt == 'json':
+            data = json.load(f)
+            if isinstance(data, dict):
+                data = [data]
+            for row in data:
+                yield row
+        elif fmt == 'jsonl':
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield json.loads(line)
+        else:
+            raise ValueError("unknown input format '%s', try csv, json, jsonl" % fmt)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def compute_gear(params):
+    """ all derived values of one gear, as Gears.effect() computes them.
+        Lengths are in px (inkscape user units).
+    """
+    uf = unit_factor(params['units'])
+    teeth = params['teeth']
+    angle = params['angle']
+    pitch = calc_circular_pitch(params['dimension'], params['system'], uf)
+    # the arguments of gear_calculations(), also the geometry cache key
+    spec = (teeth, pitch, angle, params['clearance'] * uf, params['internal_ring'], params['profile_shift'] * 0.01)
+    (pitch_radius, base_radius, addendum, dedendum,
+     outer_radius, root_radius, tooth) = gear_calculations(*spec)
+    (accuracy_involute, accuracy_circular) = accuracy_settings(teeth, params['accuracy'])
+    max_deviation = None
+    if params['max_deviation'] > 0:
+        max_deviation = params['max_deviation'] * uf
+    warnings = []
+    msg = undercut_message(teeth, angle)
+    if msg is not None:
+        warnings.extend(msg.split('\n'))
+    return {'params': params, 'unit_factor': uf, 'spec': spec, 'teeth': teeth, 'angle': angle, 'pitch': pitch,
+            'pitch_radius': pitch_radius, 'base_radius': base_radius, 'addendum': addendum,
+            'dedendum': dedendum, 'outer_radius': outer_radius, 'root_radius': root_radius,
+            'accuracy_involute': accuracy_involute, 'accuracy_circular': accuracy_circular,
+            'max_deviation': max_deviation, 'undercut': msg is not None, 'warnings': warnings}
+
+def write_gear_path(writer, gear, cache=None, holes_first=False):
+    """ outline, spokes and mount hole (or the ring) of the gear into writer,
+        which is a PathWriter or anything with the same interface
+        (DxfWriter, GcodeWriter, OffsetWriter)
+        - the outline of a PathWriter comes from the GeometryCache cache, if given,
+          otherwise it is streamed one tooth at a time (stream_gear_outline()).
+          The other writers get true arcs for the tip and root circles
+        - holes_first: spokes and mount hole before the outline, so that
+          a cut out gear is finished last
+        - returns the messages of generate_spokes_path()
+    """
+    params = gear['params']
+    uf = gear['unit_factor']
+    messages = []
+    if not params['internal_ring'] and holes_first:
+        messages = write_gear_holes(writer, gear)
+    if not isinstance(writer, PathWriter):
+        write_spur_path(writer, gear['teeth'], gear['base_radius'], gear['pitch_radius'], gear['outer_radius'],
+                        gear['root_radius'], gear['accuracy_involute'], gear['max_deviation'])
+    elif cache is None or not cache.enabled:
+        stream_gear_outline(writer, gear['teeth'], gear['base_radius'], gear['pitch_radius'], gear['outer_radius'],
+                            gear['root_radius'], gear['accuracy_involute'], gear['accuracy_circular'],
+                            gear['max_deviation'], arcs=params['compact'])
+    else:
+        cached_gear_outline(cache, writer, gear['spec'],
+                            (gear['accuracy_involute'], gear['accuracy_circular'], gear['max_deviation']),
+                            arcs=params['compact'])
+    if not params['internal_ring']:
+        if not holes_first:
+            messages = write_gear_holes(writer, gear)
+    else:
+        writer.circle(gear['outer_radius'] + params['spoke_width'] * uf)
+    return messages
+
+def write_gear_holes(writer, gear):
+    " spokes and mount hole of the gear into writer, returns the messages of generate_spokes_path() "
+    params = gear['params']
+    uf = gear['unit_factor']
+    (path, messages) = generate_spokes_path(gear['root_radius'], params['spoke_width'] * uf, params['spoke_count'],
+                                            params['mount_diameter'] * 0.5 * uf, params['mount_hole'] * uf,
+                                            uf, params['units'], writer)
+    writer.circle(params['mount_hole'] * uf / 2)
+    return messages
+
+def rack_args(gear):
+    " the arguments of generate_rack_points() for the rack of the gear "
+    params = gear['params']
+    uf = gear['unit_factor']
+    return (params['rack_teeth_length'], gear['pitch'], gear['addendum'], gear['angle'],
+            params['rack_base_height'] * uf, params['rack_base_tab'] * uf, params['clearance'] * uf)
+
+def rack_position(gear):
+    " (x, y) offset of the rack below the gear, so that it meshes (see Gears.effect()) "
+    return (rack_offset(gear['teeth']) * gear['pitch'], gear['pitch_radius'])
+
+def rack_points(gear):
+    """ the points of the rack, already positioned below the gear
+        so that it meshes (see Gears.effect()), or None
+    """
+    if not gear['params']['draw_rack']:
+        return None
+    (points, guide_path) = generate_rack_points(*rack_args(gear))
+    (xoff, yoff) = rack_position(gear)
+    return [(x + xoff, y + yoff) for (x, y) in points]
+
+def gear_radius(gear):
+    " radius of the circle around the gear (a ring gear: its rim) in px "
+    r = gear['outer_radius']
+    if gear['params']['internal_ring']:
+        r += gear['params']['spoke_width'] * gear['unit_factor']
+    return r
+
+def gear_bbox(gear):
+    " bounding box of the gear (and rack) in px, from the gear parameters "
+    r = gear_radius(gear)
+    (llx, lly, urx, ury) = (-r, -r, r, r)
+    if gear['params']['draw_rack']:
+        (xoff, yoff) = rack_position(gear)
+        (rllx, rlly, rurx, rury) = rack_bbox(*rack_args(gear))
+        (rllx, rlly, rurx, rury) = (rllx + xoff, rlly + yoff, rurx + xoff, rury + yoff)
+        (llx, lly, urx, ury) = (min(llx, rllx), min(lly, rlly), max(urx, rurx), max(ury, rury))
+    return (llx, lly, urx, ury)
+
+def path_writer(gear, out=None):
+    " the PathWriter for the gear's output mode "
+    if gear['params']['compact']:
+        return PathWriter(compact_precision(gear['unit_factor']), relative=True, compact=True, out=out)
+    return PathWriter(out=out)
+
+def write_svg_gear(out, gear, label, cache=None, rack=None, transform=None):
+    """ stream the group of the gear (and rack) into out
+        - returns the messages of generate_spokes_path()
+    """
+    params = gear['params']
+    attribs = {'inkscape:label': label,
+               'info': 'N:%s; Pitch:%s; Pressure Angle: %s' % (gear['teeth'], gear['pitch'], gear['angle'])}
+    if transform:
+        attribs['transform'] = transform
+    write_svg_group_start(out, attribs)
+    write_svg_path_start(out, PATH_STYLE)
+    writer = path_writer(gear, out)
+    messages = write_gear_path(writer, gear, cache)
+    writer.flush()
+    write_svg_path_end(out)
+    if rack:
+        write_svg_path_start(out, PATH_STYLE, 'RackGear%d' % params['rack_teeth_length'])
+        writer = path_writer(gear, out)
+        writer.polygon(rack)
+        writer.flush()
+        write_svg_path_end(out)
+    write_svg_group_end(out)
+    return messages
+
+def write_svg(out, gear, label, cache=None):
+    """ stream a complete SVG document with the gear into out
+        - returns the messages of generate_spokes_path()
+    """
+    rack = rack_points(gear)
+    write_svg_header(out, gear_bbox(gear), gear['params']['units'], gear['unit_factor'], margin=gear['pitch'])
+    messages = write_svg_gear(out, gear, label, cache, rack)
+    write_svg_footer(out)
+    return messages
+
+def parse_sheet(spec):
+    " 'WIDTHxHEIGHT' as (width, height) "
+    try:
+        (width, height) = [float(v) for v in spec.lower().split('x')]
+    except ValueError:
+        raise ValueError("sheet '%s' is not WIDTHxHEIGHT" % spec)
+    if width <= 0 or height <= 0:
+        raise ValueError("sheet '%s': the size must be positive" % spec)
+    return (width, height)
+
+def nest_gears(manifest, sheet, units, kerf, outdir=None, cache=None):
+    """ nest the gears of the manifest entries onto sheets
+        - sheet is (width, height) and kerf the gap between the parts, in units
+        - adds 'sheet', 'x', 'y' (the gear center on the sheet, in units) to
+          the entries; writes sheet-N.svg into outdir, if given
+        - returns the report lines of nest_report()
+    """
+    uf = unit_factor(units)
+    gears = []
+    parts = []
+    for entry in manifest:
+        gear = compute_gear(entry['params'])
+        gears.append((gear, rack_points(gear)))
+        bbox = gear_bbox(gear)
+        parts.append(gear_part(entry['name'], gear_radius(gear), bbox))
+    (sheets, unplaced) = nest(parts, sheet[0] * uf, sheet[1] * uf, kerf * uf)
+    for (n, s) in enumerate(sheets, 1):
+        for p in s.placements:
+            manifest[p['part']].update({'sheet': n, 'x': p['x'] / uf, 'y': p['y'] / uf})
+        if outdir is None:
+            continue
+        with open(os.path.join(outdir, 'sheet-%d.svg' % n), 'w') as out:
+            write_svg_header(out, (0, 0, s.width, s.height), units, uf)
+            for p in s.placements:
+                (gear, rack) = gears[p['part']]
+                write_svg_gear(out, gear, manifest[p['part']]['name'], cache, rack,
+                               'translate(%.4f,%.4f)' % (p['x'], p['y']))
+            write_svg_footer(out)
+    return nest_report(sheets, parts, unplaced)
+
+def write_machine_paths(writer, gear, machine):
+    """ gear and rack into the DxfWriter or GcodeWriter writer, moved by
+        the tool radius of the machine settings, holes first
+        - returns the messages of generate_spokes_path()
+    """
+    tool_radius = machine['tool_radius'] * unit_factor(machine['units'])
+    paths = writer
+    if tool_radius:
+        # outside of the gear: a ring gear's outline is a hole
+        paths = OffsetWriter(writer, -tool_radius if gear['params']['internal_ring'] else tool_radius)
+    writer.begin()
+    messages = write_gear_path(paths, gear, holes_first=True)
+    rack = rack_points(gear)
+    if rack:
+        if tool_radius:
+            paths.offset = tool_radius
+        paths.polygon(rack)
+    paths.flush()
+    writer.end()
+    return messages
+
+def write_dxf(out, gear, machine=MACHINE):
+    """ stream a DXF file with the gear (in the gear's units) into out
+        - returns the messages of generate_spokes_path()
+    """
+    return write_machine_paths(DxfWriter(out, scale=1.0 / gear['unit_factor']), gear, machine)
+
+def write_gcode(out, gear, machine=MACHINE):
+    """ stream the G-code to cut the gear into out, in machine['units']
+        - returns the messages of generate_spokes_path()
+    """
+    writer = GcodeWriter(out, 1.0 / unit_factor(machine['units']), machine['units'] == 'in',
+                         machine['feed'], machine['plunge_feed'], machine['depth'], machine['safe_z'],
+                         machine['spindle'])
+    return write_machine_paths(writer, gear, machine)
+
+def manifest_entry(gear, name, filename):
+    " summary of one gear for the manifest, lengths in the gear's units "
+    uf = gear['unit_factor']
+    params = gear['params']
+    outer_dia = gear['outer_radius'] * 2
+    if params['internal_ring']:
+        outer_dia += 2 * params['spoke_width'] * uf
+    return {'name': name, 'file': filename, 'params': params, 'units': params['units'],
+            'pitch_diameter': gear['pitch_radius'] * 2 / uf,
+            'outer_diameter': outer_dia / uf,
+            'root_diameter': gear['root_radius'] * 2 / uf,
+            'base_diameter': gear['base_radius'] * 2 / uf,
+            'undercut': gear['undercut'], 'warnings': gear['warnings']}
+
+def safe_name(name):
+    return re.sub(r'[^A-Za-z0-9_.+-]+', '_', name).strip('._') or 'gear'
+
+def gear_name(params, index):
+    " the name of the gear of a normalized parameter set, also its file name (safe_name()) "
+    return params['name'] or 'gear-%04d' % index
+
+def generate(params, index, fmt='svg', outdir='.', cache=None, machine=MACHINE):
+    """ generate one gear from a normalized parameter set
+        - writes <name>.svg / .dxf / .gcode into outdir (fmt 'none': nothing)
+        - cache is a GeometryCache for the outlines, or None
+        - machine: the settings for DXF and G-code, see MACHINE
+        - returns the manifest entry
+    """
+    name = gear_name(params, index)
+    gear = compute_gear(params)
+    filename = None
+    if fmt == 'none':
+        messages = write_gear_path(PathWriter(), gear, cache)
+    else:
+        filename = os.path.join(outdir, safe_name(name) + '.' + fmt)
+        with open(filename, 'w') as out:
+            if fmt == 'svg':
+                messages = write_svg(out, gear, 'Gear%d' % gear['teeth'], cache)
+            elif fmt == 'dxf':
+                messages = write_dxf(out, gear, machine)
+            elif fmt == 'gcode':
+                messages = write_gcode(out, gear, machine)
+            else:
+                raise ValueError("unknown output format '%s', try %s" % (fmt, ', '.join(FORMATS)))
+    gear['warnings'].extend(messages)
+    return manifest_entry(gear, name, filename)
+
+
+def parse_sweep(spec):
+    """ parse a sweep like 'teeth=8:300', 'angle=14.5,20,25' or 'profile_shift=-20:20:10'
+        - start:stop[:step] includes stop, the default step is 1
+        - returns (name, list of values)
+    """
+    try:
+        (key, values) = spec.split('=', 1)
+    except ValueError:
+        raise ValueError("sweep '%s' is not name=values" % spec)
+    key = key.strip().replace('-', '_')
+    if key not in DEFAULTS or key == 'name':
+        raise ValueError("unknown parameter '%s'" % key)
+    if ':' in values and ',' not in values:
+        parts = [float(x) for x in values.split(':')]
+        if len(parts) not in (2, 3):
+            raise ValueError("sweep '%s': use start:stop[:step]" % spec)
+        (start, stop, step) = (parts + [1.0])[:3]
+        if step <= 0:
+            raise ValueError("sweep '%s': step must be positive" % spec)
+        count = int((stop - start) / step + 1e-9) + 1
+        values = [start + i * step for i in range(count)]
+    else:
+        values = [x.strip() for x in values.split(',') if x.strip()]
+    return (key, [coerce(v, DEFAULTS[key]) for v in values])
+
+def sweep_name(base, combo, row=None):
+    """ readable, unique file name for one point of a sweep
+        - base is the parameter set the sweep starts from, row its number
+          (from 1, over all files): unnamed rows are told apart by it
+    """
+    if base.get('name'):
+        parts = [base['name']]
+    else:
+        parts = ['gear-%04d' % row if row else 'gear']
+    for (key, value) in combo:
+        parts.append('%s%s' % (key, ('%g' % value) if isinstance(value, float) else value))
+    return '_'.join(parts)
+
+def iter_param_sets(paths, input_format=None, sweeps=()):
+    """ yield (source, raw parameter dict) for every gear to generate:
+        - every parameter set of the files (or one empty set without files)
+        - times every combination of the sweeps, in a fixed order
+    """
+    if paths:
+        bases = enumerate(((path, raw) for path in paths for raw in read_param_sets(path, input_format)), 1)
+    else:
+        bases = [(None, ('sweep', {}))]
+    for (row, (source, base)) in bases:
+        if not sweeps:
+            yield (source, base)
+            continue
+        keys = [key for (key, values) in sweeps]
+        for values in itertools.product(*[values for (key, values) in sweeps]):
+            raw = dict(base)
+            raw.update(zip(keys, values))
+            raw['name'] = sweep_name(base, list(zip(keys, values)), row)
+            yield (source, raw)
+
+def reject_duplicates(param_sets, rejected):
+    """ pass the (index, source, raw params) of param_sets on, except those
+        whose file name an earlier set has already: they go into rejected
+        as {'index', 'source', 'error'} instead of overwriting its file.
+        - file names are compared ignoring case (Windows, macOS)
+        - in input order, so the same sets are kept with any number of workers
+    """
+    seen = {}
+    for (index, source, raw) in param_sets:
+        try:
+            name = safe_name(gear_name(normalize_params(raw), index))
+        except ValueError:
+            yield (index, source, raw)      # reported by generate_chunk()
+            continue
+        if name.lower() in seen:
+            rejected.append({'index': index, 'source': source,
+                             'error': "output name '%s' is already used by parameter set %d" % (name, seen[name.lower()])})
+            continue
+        seen[name.lower()] = index
+        yield (index, source, raw)
+
+_caches = {}
+
+def worker_cache(settings):
+    """ the GeometryCache for settings (directory, max_bytes), or None.
+        One instance per process, it keeps track of the directory size.
+    """
+    if settings is None:
+        return None
+    if settings not in _caches:
+        _caches[settings] = GeometryCache(settings[0], settings[1])
+    return _caches[settings]
+
+def generate_chunk(jobs):
+    """ worker function: generate a list of (index, source, raw params, fmt, outdir, cache settings, machine)
+        - returns a manifest entry, or {'index', 'source', 'error'}, for each job
+        - only depends on the job data, so results do not depend on the worker
+    """
+    results = []
+    for (index, source, raw, fmt, outdir, cache, machine) in jobs:
+        try:
+            entry = generate(normalize_params(raw), index, fmt, outdir, worker_cache(cache), machine)
+            entry['index'] = index
+        except (ValueError, ZeroDivisionError) as e:
+            entry = {'index': index, 'source': source, 'error': str(e)}
+        results.append(entry)
+    return results
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def run_jobs(jobs, workers=1, chunksize=16, ordered=True):
+    """ yield the results of generate_chunk() for all jobs
+        - workers > 1 fans the chunks out over a process pool,
+          workers 0 uses one process per cpu.
+        - ordered=False yields the chunks as they complete (each result
+          carries its 'index'), ordered=True in job order.
+    """
+    if workers == 0:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1 or ProcessPoolExecutor is None:
+        for chunk in chunked(jobs, chunksize):
+            for result in generate_chunk(chunk):
+                yield result
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(generate_chunk, chunk) for chunk in chunked(jobs, chunksize)]
+        for future in (futures if ordered else as_completed(futures)):
+            for result in future.result():
+                yield result
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options] [PARAMFILE...] (csv, json, jsonl; - for stdin)')
+    parser.add_option('-f', '--format', dest='format', default='svg',
+                      help="Output files: svg (default), dxf, gcode or none")
+    parser.add_option('-o', '--output-dir', dest='outdir', default='.',
+                      help="Directory for the output files")
+    parser.add_option('-m', '--manifest', dest='manifest', default=None,
+                      help="Write a JSON manifest of all gears to this file (- for stdout)")
+    parser.add_option('-i', '--input-format', dest='input_format', default=None,
+                      help="csv, json or jsonl. Default: from the file extension")
+    parser.add_option('-s', '--sweep', dest='sweeps', action='append', default=[],
+                      help="Sweep a parameter, e.g. teeth=8:300 or angle=14.5,20,25 (repeatable). "
+                           "Every combination is generated for every parameter set")
+    parser.add_option('-j', '--jobs', dest='jobs', type='int', default=1,
+                      help="Worker processes (0: one per cpu, default 1: no pool)")
+    parser.add_option('-c', '--chunksize', dest='chunksize', type='int', default=16,
+                      help="Gears per work unit sent to a worker")
+    parser.add_option('-u', '--unordered', dest='ordered', action='store_false', default=True,
+                      help="Collect results as they complete, not in input order")
+    parser.add_option('--no-cache', dest='cache', action='store_false', default=True,
+                      help="Do not use the geometry cache")
+    parser.add_option('--clear-cache', dest='clear_cache', action='store_true', default=False,
+                      help="Empty the geometry cache first")
+    parser.add_option('--cache-dir', dest='cache_dir', default=None,
+                      help="Geometry cache directory (default: $GEARS_DEV_CACHE_DIR or ~/.cache/inkscape-gears-dev)")
+    parser.add_option('--cache-size', dest='cache_size', type='float', default=DEFAULT_MAX_BYTES / 1048576.0,
+                      help="Size limit of the geometry cache in MB (default %default)")
+    parser.add_option('--sheet', dest='sheet', default=None,
+                      help="Nest all gears onto sheets of WIDTHxHEIGHT (e.g. 600x400), written as sheet-N.svg")
+    parser.add_option('--sheet-units', dest='sheet_units', default='mm',
+                      help="Units of --sheet and --kerf (default %default)")
+    parser.add_option('--kerf', dest='kerf', type='float', default=0.2,
+                      help="Gap between the nested parts, in sheet units (default %default)")
+    parser.add_option('--machine-units', dest='machine_units', default=MACHINE['units'],
+                      help="Units of the tool and feed settings and of the G-code: mm (default) or in")
+    parser.add_option('--tool-radius', dest='tool_radius', type='float', default=MACHINE['tool_radius'],
+                      help="DXF and G-code: cut this far outside of the gear, e.g. the kerf/2 of a laser")
+    parser.add_option('--feed', dest='feed', type='float', default=MACHINE['feed'],
+                      help="G-code: cutting feed per minute (default %default)")
+    parser.add_option('--plunge-feed', dest='plunge_feed', type='float', default=MACHINE['plunge_feed'],
+                      help="G-code: plunge feed per minute (default %default)")
+    parser.add_option('--depth', dest='depth', type='float', default=MACHINE['depth'],
+                      help="G-code: Z of the cuts (default %default)")
+    parser.add_option('--safe-z', dest='safe_z', type='float', default=MACHINE['safe_z'],
+                      help="G-code: Z for rapid moves (default %default), equal to --depth: no Z moves")
+    parser.add_option('--spindle', dest='spindle', type='float', default=MACHINE['spindle'],
+                      help="G-code: spindle speed or laser power, turned on with M3 (default: none)")
+    parser.add_option('-q', '--quiet', dest='quiet', action='store_true', default=False,
+                      help="Do not print warnings")
+    (options, args) = parser.parse_args(argv)
+    if not args and not options.sweeps:
+        parser.error('no parameter file or sweep given')
+    if options.format not in FORMATS:
+        parser.error("unknown output format '%s', try %s" % (options.format, ', '.join(FORMATS)))
+    if options.machine_units not in ('mm', 'in'):
+        parser.error("unknown machine units '%s', try mm or in" % options.machine_units)
+    if options.tool_radius < 0:
+        parser.error("the tool radius cannot be negative")
+    machine = dict((key, getattr(options, 'machine_units' if key == 'units' else key)) for key in MACHINE)
+    try:
+        sweeps = [parse_sweep(spec) for spec in options.sweeps]
+        sheet = parse_sheet(options.sheet) if options.sheet else None
+        if sheet:
+            unit_factor(options.sheet_units)
+    except ValueError as e:
+        parser.error(str(e))
+    if (options.format != 'none' or sheet) and not os.path.isdir(options.outdir):
+        os.makedirs(options.outdir)
+
+    cache = GeometryCache(options.cache_dir, int(options.cache_size * 1048576), options.cache)
+    if options.clear_cache:
+        cache.clear()
+    cache_settings = (cache.directory, cache.max_bytes) if cache.enabled else None
+    param_sets = ((index, source, raw)
+                  for index, (source, raw) in enumerate(iter_param_sets(args, options.input_format, sweeps), 1))
+    rejected = []
+    if options.format != 'none':
+        param_sets = reject_duplicates(param_sets, rejected)
+    jobs = ((index, source, raw, options.format, options.outdir, cache_settings, machine)
+            for (index, source, raw) in param_sets)
+    manifest = []
+    errors = 0
+    start = time.time()
+    for entry in itertools.chain(run_jobs(jobs, options.jobs, max(1, options.chunksize), options.ordered), rejected):
+        if 'error' in entry:
+            errors += 1
+            print("%s: parameter set %d: %s" % (entry['source'], entry['index'], entry['error']), file=sys.stderr)
+            continue
+        if entry['warnings'] and not options.quiet:
+            print("%s: %s" % (entry['name'], ' '.join(entry['warnings'])), file=sys.stderr)
+        manifest.append(entry)
+    elapsed = time.time() - start
+    count = len(manifest) + errors
+    if not options.quiet or options.sweeps:
+        print("%d gears in %.2f s, %.1f gears/s (%d errors, jobs=%d)" %
+              (count, elapsed, count / elapsed if elapsed > 0 else 0, errors, options.jobs), file=sys.stderr)
+
+    if sheet:
+        try:
+            report = nest_gears(sorted(manifest, key=lambda e: e['index']), sheet, options.sheet_units, options.kerf, options.outdir, cache)
+        except ValueError as e:
+            parser.error(str(e))
+        for line in report:
+            print(line, file=sys.stderr)
+
+    if options.manifest:
+        if options.manifest == '-':
+            json.dump(manifest, sys.stdout, indent=1, sort_keys=True)
+            sys.stdout.write('\n')
+        else:
+            with open(options.manifest, 'w') as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Copyright (C) 2017 David Grimberg (sentinel @ bardicgrove.org)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+Persistent on-disk cache for finished gear geometry (points and path data).
+
+Entries are content addressed: the key is a hash of the canonicalized
+gear parameters, the accuracy settings, the gears-dev version and
+GEOMETRY_FORMAT. Entries of an older algorithm are not found, as long as
+GEOMETRY_FORMAT (gears_dev_core.py) is bumped with every change of the
+output. The cache directory is kept below max_bytes by evicting the least
+recently used entries.
+
+Besides the outlines, the effect keeps the results of its later stages
+here (cached_stage()): the complete gear path, the rack and the mesh
+analysis. An edit in the dialog then only recomputes the stages whose
+inputs changed, e.g. a new spoke count reuses the outline and a changed
+guide or annotation option reuses all paths.
+
+Location: $GEARS_DEV_CACHE_DIR, or inkscape-gears-dev in $XDG_CACHE_HOME
+(default ~/.cache). GEARS_DEV_CACHE=0 disables the cache. The batch CLI
+uses it by default, the extension only with "Use geometry cache".
+'''
+
+import os, hashlib, pickle
+from array import array
+
+import gears_dev_core
+from gears_dev_core import __version__, GEOMETRY_FORMAT, gear_calculations, write_gear_outline, PathWriter
+
+SUFFIX = '.gear'
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def default_cache_dir():
+    d = os.environ.get('GEARS_DEV_CACHE_DIR')
+    if d:
+        return d
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'inkscape-gears-dev')
+
+def canonical(value):
+    """ a stable text form of value for cache keys
+        - floats are rounded to 12 significant digits, so values that only
+          differ by unit conversion noise (e.g. 25.4 * x / 25.4) share a key
+    """
+    if isinstance(value, bool) or value is None:
+        return repr(value)
+    if isinstance(value, float):
+        return '%.12g' % value
+    if isinstance(value, int):
+        return '%d' % value
+    if isinstance(value, (list, tuple)):
+        return '(' + ','.join([canonical(v) for v in value]) + ')'
+    if isinstance(value, dict):
+        return '{' + ','.join(['%s:%s' % (k, canonical(value[k])) for k in sorted(value)]) + '}'
+    return repr(str(value))
+
+def pack_points(points):
+    " points (list of pairs, (N,2) array or already flat) as a flat array('d'), None stays None "
+    if points is None or isinstance(points, array):
+        return points
+    numpy = gears_dev_core.numpy
+    if numpy is not None and isinstance(points, numpy.ndarray):
+        return array('d', points.ravel().tolist())
+    flat = array('d')
+    for p in points:
+        flat.append(p[0])
+        flat.append(p[1])
+    return flat
+
+def unpack_points(flat):
+    " inverse of pack_points(): an (N,2) array if numpy is loaded, else the flat array itself "
+    numpy = gears_dev_core.numpy
+    if numpy is not None and flat is not None:
+        return numpy.frombuffer(flat, dtype=float).reshape(-1, 2)     # a view, not a copy
+    return flat
+
+
+class GeometryCache(object):
+    """ size bounded LRU cache of picklable values in a directory
+        - get() marks an entry as recently used (file mtime)
+        - put() writes atomically (temp file + rename), so several
+          processes (e.g. a sweep pool) may share the directory.
+        - any problem with the cache is a miss, never an error.
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.enabled = enabled and os.environ.get('GEARS_DEV_CACHE', '1') != '0'
+        self.hits = self.misses = 0
+        self.size = None    # bytes in the directory, scanned on first put()
+
+    def key(self, *parts):
+        " content address of the parts, including the gears-dev version and GEOMETRY_FORMAT "
+        text = canonical((__version__, GEOMETRY_FORMAT) + parts)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def filename(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        fn = self.filename(key)
+        try:
+            with open(fn, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(fn, None)      # recently used
+        except Exception:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            data = pickle.dumps(value, 2)
+            import tempfile     # only needed on a miss, keeps the startup short
+            (fd, tmp) = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            fn = self.filename(key)
+            if hasattr(os, 'replace'):
+                os.replace(tmp, fn)
+            else:
+                if os.path.exists(fn):
+                    os.remove(fn)
+                os.rename(tmp, fn)
+        except Exception:
+            return
+        if self.size is None:
+            self.size = sum([size for (mtime, size, fn) in self.entries()])
+        else:
+            self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        " (mtime, size, filename) of all entries "
+        result = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return result
+        for name in names:
+            if not name.endswith(SUFFIX):
+                continue
+            fn = os.path.join(self.directory, name)
+            try:
+                st = os.stat(fn)
+            except OSError:
+                continue
+            result.append((st.st_mtime, st.st_size, fn))
+        return result
+
+    def evict(self, target=None):
+        """ remove least recently used entries until the cache
+            is below target bytes (default: 3/4 of max_bytes)
+        """
+        if target is None:
+            target = self.max_bytes * 3 // 4
+        entries = sorted(self.entries())
+        size = sum([e[1] for e in entries])
+        for (mtime, nbytes, fn) in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(fn)
+                size -= nbytes
+            except OSError:
+                pass
+        self.size = size
+
+    def clear(self):
+        " remove all entries "
+        self.evict(0)
+
+
+def cached_stage(cache, name, inputs, compute, keep=None):
+    """ the result of compute() through the cache: one stage of the effect
+        - inputs are all values the result depends on, name tells stages
+          with the same inputs apart. Only a changed input recomputes a stage.
+        - keep(result) False: the result is not stored (e.g. incomplete)
+        - the result must be picklable
+    """
+    if cache is None or not cache.enabled:
+        return compute()
+    key = cache.key('stage', name, inputs)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry['result']
+    result = compute()
+    if keep is None or keep(result):
+        cache.put(key, {'result': result})
+    return result
+
+def cached_gear_outline(cache, writer, spec, accuracy, arcs=False):
+    """ write_gear_outline() through the cache
+        - spec are the arguments of gear_calculations():
+          (teeth, circular_pitch, pressure_angle, clearance, ring_gear, profile_shift)
+        - accuracy is (accuracy_involute, accuracy_circular, max_deviation)
+        - writer is a PathWriter, its output settings are part of the key.
+        - returns the points of the outline, None with arcs=True (see write_gear_outline())
+    """
+    (accuracy_involute, accuracy_circular, max_deviation) = accuracy
+    (pitch_radius, base_radius, addendum, dedendum,
+     outer_radius, root_radius, tooth) = gear_calculations(*spec)
+    args = (spec[0], base_radius, pitch_radius, outer_radius, root_radius,
+            accuracy_involute, accuracy_circular, max_deviation, arcs)
+    if cache is None or not cache.enabled:
+        return write_gear_outline(writer, *args)
+    key = cache.key('outline', spec, accuracy, arcs, writer.precision, writer.relative, writer.compact)
+    entry = cache.get(key)
+    if entry is not None:
+        writer.raw(entry['d'], entry['state'])
+        return unpack_points(entry['points'])
+    tmp = PathWriter(writer.precision, writer.relative, writer.compact)
+    points = write_gear_outline(tmp, *args)
+    (d, state) = (tmp.getvalue(), tmp.state())
+    writer.raw(d, state)
+    cache.put(key, {'points': pack_points(points), 'd': d, 'state': state})
+    return points
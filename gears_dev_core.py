@@ -0,0 +1,1324 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Copyright (C) 2007 Aaron Spike  (aaron @ ekips.org)
+Copyright (C) 2007 Tavmjong Bah (tavmjong @ free.fr)
+Copyright (C) http://cnc-club.ru/forum/viewtopic.php?f=33&t=434&p=2594#p2500
+Copyright (C) 2014 Jürgen Weigert (juewei@fabmail.org)
+Copyright (C) 2017 David Grimberg (sentinel @ bardicgrove.org)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+Geometry core of gears-dev: gear calculations, point generators and
+path serialization. Pure python (numpy optional), no inkex needed, so it
+can be used by gears-dev.py inside inkscape as well as by the headless
+tools (gears_dev_batch.py).
+
+Importing it has no side effects and is fast: inkscape starts a new
+process for every preview. numpy is only imported when it is used, see
+load_numpy().
+'''
+
+import os, re
+from math import pi, cos, sin, tan, radians, degrees, ceil, asin, acos, atan2, sqrt, log10
+from collections import OrderedDict
+from itertools import chain, islice
+from array import array
+try:
+    from itertools import izip
+except ImportError:
+    izip = zip      # python 3
+
+# the names 'from gears_dev_core import *' gives (gears-dev.py), not the imported modules
+__all__ = ['two_pi', 'load_numpy', '__version__', 'GEOMETRY_FORMAT', 'UNITS', 'unit_factor',
+           'calc_circular_pitch', 'accuracy_settings', 'MEMO_SIZE', 'memo_key', 'memoized', 'memo_stats',
+           'memo_clear', 'linspace', 'involute_intersect_angle', 'point_on_circle', 'point_pairs',
+           'point_count', 'points_to_bbox', 'new_bbox', 'track_bbox', 'points_to_bbox_center',
+           'bbox_center', 'circle_bbox', 'spur_bbox', 'rack_bbox', 'PathWriter', 'ClassicPathWriter',
+           'format_number', 'points_to_svgd', 'undercut_min_teeth', 'undercut_max_k', 'undercut_min_angle',
+           'have_undercut', 'undercut_message', 'gear_calculations', 'GEAR_FIELDS', 'SPEC_FIELDS',
+           'GearGeometry', 'gear_calculations_array', 'mesh_rotation', 'rack_offset', 'GEAR_SET_ENTRY',
+           'parse_gear_set', 'gear_set_layout', 'gear_set_speeds', 'generate_rack_points',
+           'iter_rack_teeth', 'involute_deviation', 'involute_sample_radii', 'arc_point_count',
+           'spur_sampling', 'rotation_table', 'rotate_tooth', 'generate_spur_points', 'generate_spur_flat',
+           'iter_spur_teeth', 'iter_spur_points', 'generate_spur_array', 'rotate_tooth_array',
+           'generate_spur_outline', 'write_spur_path', 'write_gear_outline', 'spur_outline_points', 'spur_outline_bbox',
+           'stream_gear_outline', 'compact_precision', 'generate_spokes_path']
+
+two_pi = 2 * pi
+
+numpy = None            # optional: array backed engine, see load_numpy()
+_numpy_loaded = False
+
+def load_numpy():
+    """ import numpy on first use, returns it or None if it is missing
+        - importing numpy takes longer than drawing a large gear in pure
+          python, so the startup path does not; it is only loaded for
+          the array functions (generate_spur_array(), ...).
+        - GEARS_DEV_NUMPY=0 in the environment disables numpy.
+    """
+    global numpy, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        if os.environ.get('GEARS_DEV_NUMPY', '1') != '0':
+            try:
+                import numpy as module
+                numpy = module
+            except ImportError:
+                pass
+    return numpy
+
+
+__version__ = '0.9'
+
+# Part of every cache key (gears_dev_cache.py): bump it whenever the
+# generated points, path data or mesh analysis change, so that no cache
+# returns results of an older algorithm.
+GEOMETRY_FORMAT = 5
+
+# inkscape user units (90dpi 'pixel') per unit, as in inkex.uuconv
+UNITS = {'in': 90.0, 'pt': 1.25, 'px': 1.0, 'mm': 3.5433070866, 'cm': 35.433070866,
+         'm': 3543.3070866, 'pc': 15.0, 'ft': 1080.0}
+
+def unit_factor(units):
+    " scale factor from units (e.g. 'mm') to inkscape user units (px) "
+    try:
+        return UNITS[units]
+    except KeyError:
+        raise ValueError("unknown units '%s', try %s" % (units, ', '.join(sorted(UNITS))))
+
+def calc_circular_pitch(dimension, system, unit_factor):
+    """ We use math based on circular pitch.
+        - dimension is CP, DP or module, depending on system
+        - result is in inkscape units (px), dimension in the units of unit_factor
+    """
+    if   system == 'CP': # circular pitch
+        circular_pitch = dimension
+    elif system == 'DP': # diametral pitch
+        circular_pitch = pi / dimension
+    elif system == 'MM': # module (metric)
+        circular_pitch = dimension * pi
+    else:
+        raise ValueError("unknown system '%s', try CP, DP, MM" % system)
+    return circular_pitch * unit_factor
+
+def accuracy_settings(teeth, accuracy=0):
+    """ number of points on the involute and on the circular parts.
+        - accuracy 0 is automatic: more points for low tooth counts
+    """
+    accuracy_involute = 20 # Number of points of the involute curve
+    accuracy_circular = 9  # Number of points on circular parts
+    if accuracy is not None:
+        if accuracy == 0:
+            # automatic
+            if   teeth < 10: accuracy_involute = 20
+            elif teeth < 30: accuracy_involute = 12
+            else:            accuracy_involute = 6
+        else:
+            accuracy_involute = accuracy
+        accuracy_circular = max(3, int(accuracy_involute/2) - 1) # never less than three
+    return (accuracy_involute, accuracy_circular)
+
+### Memoization of the pure calculations
+MEMO_SIZE = 4096    # entries per memoized function
+
+def memo_key(value):
+    """ normalized (hashable) form of an argument
+        - floats are rounded to 12 significant digits, so values that only
+          differ by unit conversion noise (e.g. 25.4 * x / 25.4) are equal
+    """
+    if isinstance(value, float):
+        return float('%.12g' % value)
+    return value
+
+class memoized(object):
+    """ decorator: bounded LRU memo cache for a pure function
+        - the cache key are the normalized arguments (memo_key()), the
+          function is called with the arguments as given, so a miss is
+          exactly the unmemoized result. A hit may be the result of
+          arguments that only differed by conversion noise.
+        - unhashable arguments (lists, arrays) bypass the cache.
+        - hits, misses: statistics, see memo_stats()
+    """
+    registry = []
+
+    def __init__(self, func, maxsize=MEMO_SIZE):
+        self.func = func
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = self.misses = 0
+        self.__name__ = func.__name__
+        self.__doc__ = func.__doc__
+        memoized.registry.append(self)
+
+    def __call__(self, *args, **kwargs):
+        key = tuple([memo_key(a) for a in args])
+        if kwargs:
+            key += tuple(sorted([(k, memo_key(v)) for (k, v) in kwargs.items()]))
+        cache = self.cache
+        try:
+            result = cache.pop(key)
+        except KeyError:
+            pass
+        except TypeError:           # unhashable
+            return self.func(*args, **kwargs)
+        else:
+            cache[key] = result     # most recently used
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = self.func(*args, **kwargs)
+        if self.maxsize > 0:
+            if len(cache) >= self.maxsize:
+                cache.popitem(last=False)
+            cache[key] = result
+        return result
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = self.misses = 0
+
+def memo_stats():
+    " {function name: {'hits', 'misses', 'size', 'maxsize'}} of all memoized functions "
+    return dict([(m.__name__, {'hits': m.hits, 'misses': m.misses, 'size': len(m.cache), 'maxsize': m.maxsize})
+                 for m in memoized.registry])
+
+def memo_clear():
+    " empty all memo caches and reset the statistics "
+    for m in memoized.registry:
+        m.clear()
+
+
+def linspace(a,b,n):
+    """ return list of linear interp of a to b in n steps
+        - if a and b are ints - you'll get an int result.
+        - n must be an integer
+    """
+    return [a+x*(b-a)/(n-1) for x in range(0,n)]
+
+@memoized
+def involute_intersect_angle(Rb, R):
+    " "
+    Rb, R = float(Rb), float(R)
+    return (sqrt(R**2 - Rb**2) / (Rb)) - (acos(Rb / R))
+
+def point_on_circle(radius, angle):
+    " return xy coord of the point at distance radius from origin at angle "
+    x = radius * cos(angle)
+    y = radius * sin(angle)
+    return (x, y)
+    
+def point_pairs(points):
+    """ points as (x, y) pairs
+        - a flat outline (array('d') x0, y0, x1, y1, ..., see generate_spur_flat())
+          is read in place, one pair at a time: nothing is copied
+        - so is an (N,2) float array (generate_spur_array()), through a
+          memoryview of its buffer, which also yields python floats
+        - anything else (list of pairs, other arrays, iterator) is returned as is
+    """
+    if (numpy is not None and isinstance(points, numpy.ndarray) and points.dtype == float
+            and points.flags.c_contiguous and hasattr(memoryview, 'cast')):     # not in python 2
+        points = memoryview(points).cast('B').cast('d')
+    if isinstance(points, (array, memoryview)):
+        it = iter(points)
+        return izip(it, it)
+    return points
+
+def point_count(points):
+    " the number of points of a list of pairs, an (N,2) array or a flat array('d') "
+    if isinstance(points, array):
+        return len(points) // 2
+    return len(points)
+
+def points_to_bbox(p):
+    """ from a list of points (x,y pairs)
+        - return the lower-left xy and upper-right xy
+    """
+    if numpy is not None and isinstance(p, numpy.ndarray):
+        (llx, lly), (urx, ury) = p.min(axis=0), p.max(axis=0)
+        return (float(llx), float(lly), float(urx), float(ury))
+    if isinstance(p, array):
+        # a flat outline: strided reads of the buffer, no pairs are built
+        if numpy is not None:
+            return points_to_bbox(numpy.frombuffer(p, dtype=float).reshape(-1, 2))
+        return (min(islice(p, 0, None, 2)), min(islice(p, 1, None, 2)),
+                max(islice(p, 0, None, 2)), max(islice(p, 1, None, 2)))
+    if not isinstance(p, (list, tuple)):
+        # an iterator, e.g. iter_spur_points(): one pass
+        bbox = new_bbox()
+        for point in track_bbox(p, bbox):
+            pass
+        return tuple(bbox)
+    xs = [x for (x, y) in p]
+    ys = [y for (x, y) in p]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def new_bbox():
+    " an empty bounding box for track_bbox() "
+    return [float('inf'), float('inf'), float('-inf'), float('-inf')]
+
+def track_bbox(points, bbox):
+    """ pass points through (lazily), growing bbox on the way
+        - bbox is a list [llx, lly, urx, ury], e.g. new_bbox(), so the
+          bounding box of a streamed outline comes with writing it
+    """
+    for p in points:
+        (x, y) = (p[0], p[1])
+        if x < bbox[0]: bbox[0] = x
+        if y < bbox[1]: bbox[1] = y
+        if x > bbox[2]: bbox[2] = x
+        if y > bbox[3]: bbox[3] = y
+        yield p
+
+def points_to_bbox_center(p):
+    """ from a list of points (x,y pairs)
+        - find midpoint of bounding box around all points
+        - return (x,y)
+    """
+    return bbox_center(points_to_bbox(p))
+
+def bbox_center(bbox):
+    return ((bbox[0]+bbox[2])/2.0, (bbox[1]+bbox[3])/2.0)
+
+def circle_bbox(radius):
+    " bounding box of a circle around the origin, e.g. the rim of a ring gear "
+    return (-radius, -radius, radius, radius)
+
+def spur_bbox(teeth, base_radius, pitch_radius, outer_radius, root_radius):
+    """ exact bounding box of the outline of generate_spur_points(), without the points
+        - tooth 0 is centered on the +x axis; in each axis direction the outline
+          reaches outer_radius if a tip arc crosses the axis, else the end of
+          the nearest tip arc: outer_radius * cos(angle from the arc to the axis)
+        - returns None if that does not hold (very few teeth: a flank or
+          the root circle may reach further), use points_to_bbox() then.
+    """
+    tooth_angle = two_pi / teeth
+    half_tip = abs(two_pi / (4.0 * teeth) + involute_intersect_angle(base_radius, pitch_radius)
+                   - involute_intersect_angle(base_radius, outer_radius))
+    # flanks move away from the axis beyond this angle between axis and tip
+    limit = pi / 2 - acos(min(1.0, base_radius / outer_radius))
+    extents = []
+    for axis in (pi, 0.0, 0.5 * pi):     # -x, +x, +y; the outline is symmetric to the x axis
+        u = axis % tooth_angle
+        d = max(0.0, min(u, tooth_angle - u) - half_tip)
+        if d > 0 and (d >= limit or outer_radius * cos(d) < root_radius):
+            return None
+        extents.append(outer_radius * cos(d))
+    return (-extents[0], -extents[2], extents[1], extents[2])
+
+def rack_bbox(tooth_count, pitch, addendum, pressure_angle, base_height, tab_length, clearance=0):
+    " bounding box of the points of generate_rack_points() with the same arguments "
+    spacing = 0.5 * pitch
+    tasc = tan(radians(pressure_angle)) * (addendum+clearance)
+    base_top = addendum+clearance
+    x_lhs = -pitch * int(0.5*tooth_count-.5) - spacing - tab_length - tasc + 0.5 * spacing
+    x_rhs = x_lhs + tab_length + tasc + tooth_count * pitch - spacing + tasc + tab_length
+    top = -addendum if tooth_count > 0 else base_top
+    return (x_lhs, top, x_rhs, base_top + base_height)
+                
+class PathWriter(object):
+    """ writer for the 'd' attribute of an SVG path, shared by all path producers.
+        - fragments are collected in a list and joined once, or written
+          to the file-like object out (streaming). Either way linear time.
+        - precision: number of decimals.
+        - relative=True: l/a commands relative to the previous point.
+          The deltas are taken between rounded positions, so no error accumulates.
+        - compact=True: trim trailing (and leading) zeros, omit repeated
+          command letters and separators that are not needed.
+        The defaults reproduce the classic 'M%.4f,%.4fL%.4f,%.4f...z' output.
+    """
+    flush_every = 4096  # fragments buffered before they are written to out
+
+    def __init__(self, precision=4, relative=False, compact=False, out=None):
+        self.precision = precision
+        self.relative = relative
+        self.compact = compact
+        self.out = out
+        self.parts = []
+        self.last_cmd = None
+        self.last_num = ''
+        self.cur = self.start = (0.0, 0.0)
+
+    def fmt(self, v):
+        " format one number "
+        s = '%.*f' % (self.precision, v)
+        if self.compact:
+            if '.' in s:
+                s = s.rstrip('0').rstrip('.')
+            if s.startswith('0.'):
+                s = s[1:]
+            elif s.startswith('-0.'):
+                s = '-' + s[2:]
+            if s in ('-0', '', '-'):
+                s = '0'
+        return s
+
+    def _emit(self, cmd, numbers):
+        " append a command letter (if needed) and its numbers "
+        parts = self.parts
+        # After M (m) a repeated command is an implicit L (l).
+        implicit = {'M': 'L', 'm': 'l'}.get(self.last_cmd, self.last_cmd)
+        if not (self.compact and cmd == implicit):
+            parts.append(cmd)
+            self.last_num = ''
+        for n in numbers:
+            if self.last_num and not (self.compact and (n[0] == '-' or (n[0] == '.' and '.' in self.last_num))):
+                parts.append(',' if self.compact or len(numbers) == 2 else ' ')
+            parts.append(n)
+            self.last_num = n
+        self.last_cmd = cmd
+        if self.out is not None and len(parts) >= self.flush_every:
+            self.flush()
+
+    def _round(self, x, y):
+        return (round(x, self.precision), round(y, self.precision))
+
+    def move_to(self, x, y):
+        # the first move of a path is always absolute
+        if self.relative and self.last_cmd is not None:
+            (rx, ry) = self._round(x, y)
+            self._emit('m', (self.fmt(rx - self.cur[0]), self.fmt(ry - self.cur[1])))
+        else:
+            self._emit('M', (self.fmt(x), self.fmt(y)))
+        self.cur = self.start = self._round(x, y)
+        return self
+
+    def line_to(self, x, y):
+        if self.relative:
+            (rx, ry) = self._round(x, y)
+            self._emit('l', (self.fmt(rx - self.cur[0]), self.fmt(ry - self.cur[1])))
+        else:
+            self._emit('L', (self.fmt(x), self.fmt(y)))
+        self.cur = self._round(x, y)
+        return self
+
+    def arc_to(self, rx, ry, rotation, large_arc, sweep, x, y):
+        " A rx,ry  x-axis-rotation, large-arc-flag, sweep-flag  x,y "
+        args = [self.fmt(rx), self.fmt(ry), '%d' % rotation, '%d' % large_arc, '%d' % sweep]
+        if self.relative:
+            (ex, ey) = self._round(x, y)
+            self._emit('a', args + [self.fmt(ex - self.cur[0]), self.fmt(ey - self.cur[1])])
+        else:
+            self._emit('A', args + [self.fmt(x), self.fmt(y)])
+        self.cur = self._round(x, y)
+        return self
+
+    def close(self):
+        self._emit('z', ())
+        self.cur = self.start
+        return self
+
+    def polygon(self, points, close=True):
+        " a subpath through all points, e.g. from generate_spur_points() or generate_spur_flat() "
+        pairs = point_pairs(points)
+        if numpy is not None and isinstance(pairs, numpy.ndarray):
+            pairs = pairs.tolist()      # not read in place (see point_pairs()): python floats format much faster
+        it = iter(pairs)
+        f = next(it)
+        self.move_to(f[0], f[1])
+        line_to = self.line_to
+        for x in it:
+            line_to(x[0], x[1])
+        if close:
+            self.close()
+        return self
+
+    def circle(self, r, cx=0, cy=0):
+        " a full circle made of two arcs, starting at the bottom "
+        self.move_to(cx, cy+r)
+        self.arc_to(r, r, 0, 0, 0, cx, cy-r)
+        self.arc_to(r, r, 0, 0, 0, cx, cy+r)
+        return self
+
+    def state(self):
+        " what the next command depends on, see raw() "
+        return (self.last_cmd, self.last_num, self.cur, self.start)
+
+    def raw(self, data, state=None):
+        """ append finished path data, e.g. from a cache.
+            - state is the state() of the writer that wrote data, so the
+              output continues as if data was written here. Without it
+              the next move_to() is absolute again.
+        """
+        self.parts.append(data)
+        if state is None:
+            (self.last_cmd, self.last_num) = (None, '')
+        else:
+            (self.last_cmd, self.last_num, self.cur, self.start) = state
+        if self.out is not None and len(self.parts) >= self.flush_every:
+            self.flush()
+        return self
+
+    def flush(self):
+        if self.out is not None and self.parts:
+            self.out.write(''.join(self.parts))
+            self.parts = []
+
+    def getvalue(self):
+        " the path data collected so far (not available when streaming) "
+        if self.out is not None:
+            self.flush()
+            return None
+        return ''.join(self.parts)
+
+class ClassicPathWriter(PathWriter):
+    """ PathWriter with the spacing and precision of the hand written path
+        data of the original extension: 'M %f,%f', 'L %f,%f',
+        'A  %f,%f %s %s %s %f,%f' and 'Z' (spokes, mount hole, ring).
+        Absolute commands only.
+    """
+    def __init__(self, precision=6, out=None):
+        PathWriter.__init__(self, precision, out=out)
+
+    def _emit(self, cmd, numbers):
+        if cmd == 'z':
+            self.parts.append('Z')
+        elif cmd == 'A':
+            self.parts.append('A  %s,%s %s %s %s %s,%s' % tuple(numbers))
+        else:
+            self.parts.append('%s %s,%s' % ((cmd,) + tuple(numbers)))
+        self.last_cmd = cmd
+        if self.out is not None and len(self.parts) >= self.flush_every:
+            self.flush()
+
+def format_number(value, precision=4):
+    " '%.4f' % value for attributes (transform), but '0.0000' instead of '-0.0000' "
+    s = '%.*f' % (precision, value)
+    if s.startswith('-') and not s.strip('-0.'):
+        s = s[1:]
+    return s
+
+def points_to_svgd(p, writer=None):
+    """ convert list of points (or an (N,2) array) into a closed SVG path list
+        - with a PathWriter, the path is appended to it and None returned.
+    """
+    if writer is not None:
+        writer.polygon(p)
+        return None
+    return PathWriter().polygon(p).getvalue()
+
+### Undercut support functions
+@memoized
+def undercut_min_teeth(pitch_angle, k=1.0):
+    """ computes the minimum tooth count for a 
+        spur gear so that no undercut with the given pitch_angle (in deg) 
+        and an addendum = k * metric_module, where 0 < k < 1
+    Note:
+    The return value should be rounded upwards for perfect safety. E.g.
+    min_teeth = int(math.ceil(undercut_min_teeth(20.0)))    # 18, not 17
+    """
+    x = sin(radians(pitch_angle))
+    return 2*k /(x*x)
+
+@memoized
+def undercut_max_k(teeth, pitch_angle=20.0):
+    """ computes the maximum k value for a given teeth count and pitch_angle
+        so that no undercut occurs.
+    """
+    x = sin(radians(pitch_angle))
+    return 0.5 * teeth * x * x
+
+@memoized
+def undercut_min_angle(teeth, k=1.0):
+    """ computes the minimum pitch angle, to that the given teeth count (and
+        profile shift) cause no undercut.
+    """
+    return degrees(asin(min(0.856, sqrt(2.0*k/teeth))))    # max 59.9 deg
+
+
+def have_undercut(teeth, pitch_angle=20.0, k=1.0):
+    """ returns true if the specified number of teeth would
+        cause an undercut.
+    """
+    return (teeth < undercut_min_teeth(pitch_angle, k))
+
+def undercut_message(teeth, pitch_angle=20.0):
+    """ the undercut warning (with hints against it) for this gear,
+        or None if there is no undercut.
+    """
+    if not have_undercut(teeth, pitch_angle, 1.0):
+        return None
+    min_teeth = int(ceil(undercut_min_teeth(pitch_angle, 1.0)))
+    min_angle = undercut_min_angle(teeth, 1.0) + .1
+    max_k = undercut_max_k(teeth, pitch_angle)
+    return "Undercut Warning: This gear (%d teeth) will not work well.\nTry tooth count of %d or more,\nor a pressure angle of %.1f [deg] or more,\nor try a profile shift of %d %%.\nOr other decent combinations." % (teeth, min_teeth, min_angle, int(100.*max_k)-100.)
+
+
+## gather all basic gear calculations in one place
+@memoized
+def gear_calculations(num_teeth, circular_pitch, pressure_angle, clearance=0, ring_gear=False, profile_shift=0.):
+    """ Put base calcs for spur/ring gears in one place.
+        - negative profile shifting helps against undercut. 
+    """
+    diametral_pitch = pi / circular_pitch
+    pitch_diameter = num_teeth / diametral_pitch
+    pitch_radius = pitch_diameter / 2.0
+    addendum = 1 / diametral_pitch
+    #dedendum = 1.157 / diametral_pitch # auto calc clearance
+    dedendum = addendum
+    dedendum *= 1+profile_shift
+    addendum *= 1-profile_shift
+    if ring_gear:
+        addendum = addendum + clearance # our method
+    else:
+        dedendum = dedendum + clearance # our method
+    #
+    #
+    base_radius = pitch_diameter * cos(radians(pressure_angle)) / 2.0
+    outer_radius = pitch_radius + addendum
+    root_radius =  pitch_radius - dedendum
+    # Tooth thickness: Tooth width along pitch circle.
+    tooth_thickness  = ( pi * pitch_diameter ) / ( 2.0 * num_teeth )
+    # we don't use these
+    #working_depth = 2 / diametral_pitch
+    #whole_depth = 2.157 / diametral_pitch
+    #outside_diameter = (num_teeth + 2) / diametral_pitch
+    #
+    return (pitch_radius, base_radius,
+            addendum, dedendum, outer_radius, root_radius,
+            tooth_thickness
+            )
+
+GEAR_FIELDS = ('pitch_radius', 'base_radius', 'addendum', 'dedendum',
+               'outer_radius', 'root_radius', 'tooth_thickness')
+SPEC_FIELDS = ('teeth', 'circular_pitch', 'pressure_angle', 'clearance', 'ring_gear', 'profile_shift')
+
+
+class GearGeometry(object):
+    """ one gear: its spec (the arguments of gear_calculations()), the
+        values derived from it (GEAR_FIELDS) and its outline.
+        - __slots__: no dict per gear, for gear sets and catalogs
+        - outline: None until generate_outline(), then a flat array('d')
+          x0, y0, x1, y1, ... (an (N,2) array if numpy is loaded). Both
+          are buffers: numpy.frombuffer(), points_to_bbox() and the writers
+          (through point_pairs()) read them in place.
+    """
+    __slots__ = SPEC_FIELDS + GEAR_FIELDS + ('outline',)
+
+    def __init__(self, teeth, circular_pitch, pressure_angle, clearance=0, ring_gear=False, profile_shift=0.):
+        (self.teeth, self.circular_pitch, self.pressure_angle,
+         self.clearance, self.ring_gear, self.profile_shift) = (teeth, circular_pitch, pressure_angle,
+                                                                 clearance, ring_gear, profile_shift)
+        (self.pitch_radius, self.base_radius, self.addendum, self.dedendum,
+         self.outer_radius, self.root_radius, self.tooth_thickness) = gear_calculations(*self.spec())
+        self.outline = None
+
+    def spec(self):
+        " the arguments of gear_calculations() "
+        return (self.teeth, self.circular_pitch, self.pressure_angle, self.clearance, self.ring_gear, self.profile_shift)
+
+    def calc(self):
+        " the tuple of gear_calculations() "
+        return (self.pitch_radius, self.base_radius, self.addendum, self.dedendum,
+                self.outer_radius, self.root_radius, self.tooth_thickness)
+
+    def generate_outline(self, accuracy_involute, accuracy_circular, max_deviation=None):
+        " compute the outline (the points write_gear_outline() writes) and return it "
+        self.outline = spur_outline_points(self.teeth, self.base_radius, self.pitch_radius, self.outer_radius,
+                                           self.root_radius, accuracy_involute, accuracy_circular, max_deviation)
+        return self.outline
+
+    def point_count(self):
+        return 0 if self.outline is None else point_count(self.outline)
+
+    def bbox(self):
+        """ bounding box of the outline: from the radii (spur_bbox()) if
+            possible, else from the points of the outline
+        """
+        return (spur_bbox(self.teeth, self.base_radius, self.pitch_radius, self.outer_radius, self.root_radius)
+                or points_to_bbox(self.outline))
+
+
+def gear_calculations_array(num_teeth, circular_pitch, pressure_angle, clearance=0, ring_gear=False, profile_shift=0.):
+    """ gear_calculations() for many gears at once.
+        - the arguments are columns (sequences or arrays of equal length)
+          or scalars that apply to all gears.
+        - returns a dict of columns: GEAR_FIELDS (same values as the
+          7-tuple of gear_calculations()) and 'undercut' (have_undercut()).
+        - numpy arrays, or lists without numpy.
+    """
+    if load_numpy() is None:
+        columns = [num_teeth, circular_pitch, pressure_angle, clearance, ring_gear, profile_shift]
+        n = max([len(c) for c in columns if isinstance(c, (list, tuple))] or [1])
+        columns = [list(c) if isinstance(c, (list, tuple)) else [c] * n for c in columns]
+        result = dict([(f, []) for f in GEAR_FIELDS + ('undercut',)])
+        for (teeth, cp, angle, cl, ring, shift) in zip(*columns):
+            for (f, v) in zip(GEAR_FIELDS, gear_calculations(teeth, cp, angle, cl, ring, shift)):
+                result[f].append(v)
+            result['undercut'].append(have_undercut(teeth, angle))
+        return result
+    (teeth, cp, angle, cl, ring, shift) = numpy.broadcast_arrays(
+        numpy.asarray(num_teeth, dtype=float), numpy.asarray(circular_pitch, dtype=float),
+        numpy.asarray(pressure_angle, dtype=float), numpy.asarray(clearance, dtype=float),
+        numpy.asarray(ring_gear, dtype=bool), numpy.asarray(profile_shift, dtype=float))
+    # same operations, in the same order, as gear_calculations()
+    diametral_pitch = pi / cp
+    pitch_diameter = teeth / diametral_pitch
+    pitch_radius = pitch_diameter / 2.0
+    addendum = 1 / diametral_pitch
+    dedendum = addendum * (1 + shift)
+    addendum = addendum * (1 - shift)
+    addendum = numpy.where(ring, addendum + cl, addendum)
+    dedendum = numpy.where(ring, dedendum, dedendum + cl)
+    base_radius = pitch_diameter * numpy.cos(numpy.radians(angle)) / 2.0
+    x = numpy.sin(numpy.radians(angle))
+    return {'pitch_radius': pitch_radius, 'base_radius': base_radius,
+            'addendum': addendum, 'dedendum': dedendum,
+            'outer_radius': pitch_radius + addendum, 'root_radius': pitch_radius - dedendum,
+            'tooth_thickness': (pi * pitch_diameter) / (2.0 * teeth),
+            'undercut': teeth < 2 * 1.0 / (x * x)}
+
+def mesh_rotation(teeth_a, rotation_a, teeth_b, direction, ring_a=False, ring_b=False):
+    """ rotation (deg) of gear b, placed in direction (deg) from the
+        center of gear a, so that its teeth mesh with gear a rotated by rotation_a.
+        - both gears as generate_spur_points() makes them:
+          at rotation 0 a tooth is centered on the +x axis. The outline of
+          a ring gear has its tooth spaces there.
+        - one of the gears may be a ring gear, the other one inside it.
+        - the result is in [0, 360/teeth_b)
+    """
+    pitch_a = 360.0 / teeth_a
+    pitch_b = 360.0 / teeth_b
+    if not (ring_a or ring_b):
+        # the tooth of a next to the pitch point is f pitches before it,
+        # the gap of b must be f pitches after the pitch point (seen from b).
+        f = ((direction - rotation_a) / pitch_a) % 1.0
+        return (direction + 180.0 + (f - 0.5) * pitch_b) % pitch_b
+    # internal: the pitch point is on the same side of both centers
+    # and both gears turn the same way.
+    alpha = direction if ring_a else direction + 180.0
+    f = ((alpha - rotation_a) / pitch_a) % 1.0
+    return (alpha - f * pitch_b) % pitch_b
+
+def rack_offset(teeth, rotation=0.0):
+    """ x offset (in pitches) of the rack of generate_rack_points(), placed
+        below the gear at pitch radius, so that it meshes with the gear rotated by rotation (deg).
+        Rotation 0 gives (-0.5, -0.25, 0, -0.75)[teeth % 4].
+    """
+    # the tooth next to the pitch point (at 90 deg) is f pitches before it
+    f = ((90.0 - rotation) * teeth / 360.0) % 1.0
+    x = (f - 0.5) % 1.0
+    return x - 1.0 if x else 0.0
+
+GEAR_SET_ENTRY = re.compile(r'^(\d+)(r?)(?:([@=])(\d+)(?::(-?\d+(?:\.\d*)?))?)?$')
+
+def parse_gear_set(spec):
+    """ parse a gear set like '24; 12@1:90; 36=2; 60r@1:180'
+        - entries are separated by ';' and numbered from 1
+        - TEETH            meshes with the previous gear, in direction 0
+        - TEETH@N[:ANGLE]  meshes with gear N, placed in direction ANGLE (deg) from it
+        - TEETH=N          on the shaft of gear N (compound gear)
+        - a trailing r on TEETH makes it a ring gear
+        - returns [(teeth, ring, relation, parent, angle)], relation is
+          None for the first gear, 'mesh' or 'shaft'; parent is 0-based
+    """
+    result = []
+    for (i, text) in enumerate([e for e in spec.replace(' ', '').split(';') if e]):
+        m = GEAR_SET_ENTRY.match(text)
+        if m is None:
+            raise ValueError("gear set entry %d '%s': use TEETH[r][@N[:ANGLE]] or TEETH[r]=N" % (i + 1, text))
+        (teeth, ring, relation, parent, angle) = m.groups()
+        teeth = int(teeth)
+        if teeth < 3:
+            raise ValueError("gear set entry %d: at least 3 teeth" % (i + 1))
+        if i == 0:
+            if relation:
+                raise ValueError("gear set entry 1 cannot refer to another gear")
+            result.append((teeth, bool(ring), None, None, 0.0))
+            continue
+        parent = int(parent) - 1 if parent else i - 1
+        if not 0 <= parent < i:
+            raise ValueError("gear set entry %d: gear %d is not defined before" % (i + 1, parent + 1))
+        if relation == '=' and angle is not None:
+            raise ValueError("gear set entry %d: a gear on a shaft has no direction" % (i + 1))
+        result.append((teeth, bool(ring), 'shaft' if relation == '=' else 'mesh', parent, float(angle or 0.0)))
+    if not result:
+        raise ValueError("empty gear set")
+    return result
+
+def gear_set_layout(gear_set, circular_pitch, pressure_angle, clearance=0, profile_shift=0.):
+    """ place the gears of parse_gear_set() so that they mesh
+        - meshing gears are at pitch radius center distance, rotated by mesh_rotation()
+        - returns a dict per gear: teeth, ring, x, y (px, the first gear at 0, 0),
+          rotation (deg) and calc (the gear_calculations() tuple)
+    """
+    gears = []
+    for (i, (teeth, ring, relation, parent, angle)) in enumerate(gear_set):
+        calc = gear_calculations(teeth, circular_pitch, pressure_angle, clearance, ring, profile_shift)
+        gear = {'teeth': teeth, 'ring': ring, 'x': 0.0, 'y': 0.0, 'rotation': 0.0, 'calc': calc}
+        if relation is not None:
+            p = gears[parent]
+            gear['x'], gear['y'] = p['x'], p['y']
+        if relation == 'mesh':
+            (r, rp) = (calc[0], p['calc'][0])
+            if ring and p['ring']:
+                raise ValueError("gear %d: two ring gears cannot mesh" % (i + 1))
+            elif p['ring']:
+                distance = rp - r
+            elif ring:
+                distance = r - rp
+            else:
+                distance = rp + r
+            if distance <= 0:
+                raise ValueError("gear %d: the ring gear is too small" % (i + 1))
+            gear['x'] += distance * cos(radians(angle))
+            gear['y'] += distance * sin(radians(angle))
+            gear['rotation'] = mesh_rotation(p['teeth'], p['rotation'], teeth, angle, p['ring'], ring)
+        gears.append(gear)
+    return gears
+
+def gear_set_speeds(gear_set):
+    """ angular speed of the gears of parse_gear_set() relative to gear 1
+        - meshing gears turn teeth_parent / teeth times as fast, in the opposite
+          direction (negative) or, with a ring gear, in the same direction
+        - gears on a shaft turn with it
+    """
+    speeds = []
+    for (teeth, ring, relation, parent, angle) in gear_set:
+        if relation is None:
+            speeds.append(1.0)
+        elif relation == 'shaft':
+            speeds.append(speeds[parent])
+        else:
+            (parent_teeth, parent_ring) = gear_set[parent][:2]
+            sign = 1.0 if ring or parent_ring else -1.0
+            speeds.append(sign * speeds[parent] * parent_teeth / float(teeth))
+    return speeds
+
+ 
+def generate_rack_points(tooth_count, pitch, addendum, pressure_angle,
+                       base_height, tab_length, clearance=0, draw_guides=False):
+        """ Return path (suitable for svg) of the Rack gear.
+            - rack gear uses straight sides
+                - involute on a circle of infinite radius is a simple linear ramp
+            - the meshing circle touches at y = 0, 
+            - the highest elevation of the teeth is at y = +addendum
+            - the lowest elevation of the teeth is at y = -addendum-clearance
+            - the base_height extends downwards from the lowest elevation.
+            - we generate this middle tooth exactly centered on the y=0 line.
+              (one extra tooth on the right hand side, if number of teeth is even)
+            - the points come from iter_rack_teeth()
+        """
+        points = [] # make list of points
+        for chunk in iter_rack_teeth(tooth_count, pitch, addendum, pressure_angle,
+                                     base_height, tab_length, clearance):
+            points.extend(chunk)
+        # We don't close the path here. Caller does it.
+
+        # Draw line representing the pitch circle of infinite diameter
+        guide_path = None
+        if draw_guides:
+            (x_lhs, x_rhs) = (points[0][0], points[-1][0])
+            p = []
+            p.append( (x_lhs + 0.5 * tab_length, 0) )
+            p.append( (x_rhs - 0.5 * tab_length, 0) )
+            guide_path = points_to_svgd(p)
+        # return points ready for use in an SVG 'path'
+        return (points, guide_path)
+
+def iter_rack_teeth(tooth_count, pitch, addendum, pressure_angle,
+                    base_height, tab_length, clearance=0):
+        """ the points of generate_rack_points() in chunks (lazy):
+            the base tab on the left, one list per tooth, the tab on the right
+        """
+        spacing = 0.5 * pitch # rolling one pitch distance on the spur gear pitch_diameter.
+        # roughly center rack in drawing, exact position is so that it meshes
+        # nicely with the spur gear.
+        # -0.5*spacing has a gap in the center.
+        # +0.5*spacing has a tooth in the center.
+        fudge = +0.5 * spacing
+
+        tas  = tan(radians(pressure_angle)) * addendum
+        tasc = tan(radians(pressure_angle)) * (addendum+clearance)
+        base_top = addendum+clearance
+        base_bot = addendum+clearance+base_height
+
+        x_lhs = -pitch * int(0.5*tooth_count-.5) - spacing - tab_length - tasc + fudge
+        #inkex.debug("angle=%s spacing=%s"%(pressure_angle, spacing))
+        # Start with base tab on LHS
+        yield [(x_lhs, base_bot), (x_lhs, base_top)]
+        x = x_lhs + tab_length+tasc
+
+        # An involute on a circle of infinite radius is a simple linear ramp.
+        # We need to add curve at bottom and use clearance.
+        for i in range(tooth_count):
+            # move along path, generating the next 'tooth'
+            # pitch line is at y=0. the left edge hits the pitch line at x
+            yield [(x-tasc, base_top), (x+tas, -addendum),
+                   (x+spacing-tas, -addendum), (x+spacing+tasc, base_top)]
+            x += pitch
+        x -= spacing # remove last adjustment
+        # add base on RHS
+        x_rhs = x+tasc+tab_length
+        yield [(x_rhs, base_top), (x_rhs, base_bot)]
+    
+
+def involute_deviation(ta, tb):
+    """ largest distance between the involute of a unit base circle and
+        its chord, for the roll angles ta..tb (radius = sqrt(1+t*t))
+        - the tangent of the involute at roll angle t has the direction
+          t, so the farthest point is where t is the direction of the
+          chord (ta < t < tb for tb - ta < pi): exact, no sampling
+    """
+    (x0, y0) = (cos(ta) + ta*sin(ta), sin(ta) - ta*cos(ta))
+    (x1, y1) = (cos(tb) + tb*sin(tb), sin(tb) - tb*cos(tb))
+    (dx, dy) = (x1 - x0, y1 - y0)
+    length = sqrt(dx*dx + dy*dy)
+    if length == 0:
+        return 0.0
+    direction = atan2(dy, dx)
+    t = direction + two_pi * round((0.5 * (ta + tb) - direction) / two_pi)
+    t = min(max(t, ta), tb)
+    (x, y) = (cos(t) + t*sin(t), sin(t) - t*cos(t))
+    return abs((x - x0)*dy - (y - y0)*dx) / length
+
+def involute_sample_radii(base_radius, start_radius, outer_radius, max_deviation):
+    """ radii of the involute points, so that no chord between them is
+        further than max_deviation from the curve. Uses the fewest points:
+        - the curvature radius at roll angle t is base_radius*t, so the
+          sagitta formula gives a closed form guess for the next step,
+          which is then verified (and bisected if needed) numerically.
+        - first and last radius are exactly start_radius and outer_radius
+    """
+    rb = float(base_radius)
+    tol = max_deviation / rb    # everything below on the unit involute
+    t = sqrt(max(0.0, (start_radius / rb)**2 - 1))
+    t_end = sqrt(max(0.0, (outer_radius / rb)**2 - 1))
+    ts = [t]
+    while t < t_end:
+        if involute_deviation(t, t_end) <= tol:
+            t = t_end
+        else:
+            # L*L / (8*rho) = tol with rho = t and arc length L = (tb*tb - t*t) / 2
+            # gives a safe lower bound, then bisect for the longest chord.
+            lo, hi = t, t_end
+            guess = sqrt(t*t + 2*sqrt(8 * tol * t))
+            if guess < t_end and involute_deviation(t, guess) <= tol:
+                lo = guess
+            for i in range(50):
+                mid = 0.5 * (lo + hi)
+                if involute_deviation(t, mid) <= tol:
+                    lo = mid
+                else:
+                    hi = mid
+            t = lo if lo > t else hi    # always make progress
+        ts.append(t)
+    radii = [rb * sqrt(1 + t*t) for t in ts]
+    radii[0], radii[-1] = start_radius, outer_radius
+    if len(radii) < 2:
+        radii = [start_radius, outer_radius]
+    return radii
+
+def arc_point_count(radius, angle, max_deviation):
+    """ number of points for a polyline along an arc (radius, angle)
+        that stays within max_deviation of the arc. At least 2.
+    """
+    if max_deviation >= radius:
+        return 2
+    step = 2 * acos(1 - float(max_deviation) / radius)
+    return max(2, int(ceil(abs(angle) / step)) + 1)
+
+def spur_sampling(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular, max_deviation=None):
+    """ where to put the points of a tooth
+        - returns (radii, tip_points, root_points): radii of the involute
+          points and the number of points on the tip and on the root arc.
+        - without max_deviation: accuracy_involute equally spaced radii and
+          accuracy_circular points on both arcs (fixed accuracy tiers).
+        - with max_deviation (in px): adaptive, see involute_sample_radii()
+    """
+    start_involute_radius = max(base_radius, root_radius)
+    if not max_deviation:
+        return (linspace(start_involute_radius, outer_radius, accuracy_involute),
+                accuracy_circular, accuracy_circular)
+    radii = involute_sample_radii(base_radius, start_involute_radius, outer_radius, max_deviation)
+    half_thick_angle = two_pi / (4.0 * teeth )
+    pitch_to_base_angle  = involute_intersect_angle( base_radius, pitch_radius )
+    tip = 2 * half_thick_angle + 2 * (pitch_to_base_angle - involute_intersect_angle(base_radius, outer_radius))
+    if root_radius > base_radius:
+        pitch_to_root_angle = pitch_to_base_angle - involute_intersect_angle(base_radius, root_radius )
+        root = two_pi / teeth - 2 * half_thick_angle - 2 * pitch_to_root_angle
+    else:
+        root = two_pi / teeth - 2 * half_thick_angle - 2 * pitch_to_base_angle
+    return (radii, arc_point_count(outer_radius, tip, max_deviation),
+            arc_point_count(root_radius, root, max_deviation))
+
+def rotation_table(count):
+    " cos/sin pairs of count equally spaced angles, starting at angle 0 "
+    return [(cos(c), sin(c)) for c in [(x * two_pi / float(count)) for x in range(count)]]
+
+def rotate_tooth(tooth, count):
+    """ repeat the points of one tooth around the origin
+        - tooth is centered at angle 0, the result has count copies
+        - uses one rotation_table() instead of recomputing each tooth
+    """
+    points = []
+    for (ca, sa) in rotation_table(count):
+        points.extend([(x*ca - y*sa, x*sa + y*ca) for (x, y) in tooth])
+    return points
+
+def generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular, template=False,
+                         max_deviation=None):
+    """ given a set of core gear params
+        - generate the svg path for the gear
+        - template=True computes only the first tooth and
+          rotates copies of it into place (see rotate_tooth())
+        - max_deviation replaces the accuracy settings with
+          adaptive sampling, see spur_sampling()
+        - the teeth come from iter_spur_teeth()
+    """
+    points = []
+    for tooth in iter_spur_teeth(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                 accuracy_involute, accuracy_circular, template, max_deviation):
+        points.extend(tooth)
+    return (points)
+
+def generate_spur_flat(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular, template=False,
+                       max_deviation=None):
+    """ flat variant of generate_spur_points(): the same points as one
+        array('d') x0, y0, x1, y1, ..., built one tooth at a time.
+        16 bytes per point instead of about 110 for a list of pairs.
+    """
+    flat = array('d')
+    for tooth in iter_spur_teeth(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                 accuracy_involute, accuracy_circular, template, max_deviation):
+        flat.extend(chain.from_iterable(tooth))
+    return flat
+
+def iter_spur_teeth(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular, template=False,
+                    max_deviation=None):
+    """ the points of generate_spur_points(), one list per tooth (lazy)
+        - a consumer (PathWriter with out, DxfWriter, track_bbox(), ...)
+          only needs the memory of one tooth, not of the gear
+        - template=True computes the first tooth and yields rotated
+          copies of it, as rotate_tooth()
+    """
+    half_thick_angle = two_pi / (4.0 * teeth ) #?? = pi / (2.0 * teeth)
+    pitch_to_base_angle  = involute_intersect_angle( base_radius, pitch_radius )
+
+    (radii, tip_points, root_points) = spur_sampling(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                                     accuracy_involute, accuracy_circular, max_deviation)
+    angles = [involute_intersect_angle(base_radius, r) for r in radii]
+
+    def tooth(c):
+        # Angles
+        pitch1 = c - half_thick_angle
+        base1  = pitch1 - pitch_to_base_angle
+        offsetangles1 = [ base1 + x for x in angles]
+        points1 = [ point_on_circle( radii[i], offsetangles1[i]) for i in range(0,len(radii)) ]
+
+        pitch2 = c + half_thick_angle
+        base2  = pitch2 + pitch_to_base_angle
+        offsetangles2 = [ base2 - x for x in angles] 
+        points2 = [ point_on_circle( radii[i], offsetangles2[i]) for i in range(0,len(radii)) ]
+
+        points_on_outer_radius = [ point_on_circle(outer_radius, x) for x in linspace(offsetangles1[-1], offsetangles2[-1], tip_points) ]
+
+        if root_radius > base_radius:
+            pitch_to_root_angle = pitch_to_base_angle - involute_intersect_angle(base_radius, root_radius )
+            root1 = pitch1 - pitch_to_root_angle
+            root2 = pitch2 + pitch_to_root_angle
+            points_on_root = [point_on_circle (root_radius, x) for x in linspace(root2, root1+(two_pi/float(teeth)), root_points) ]
+            return points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root[1:-1] # [::-1] reverses list; [1:-1] removes first and last element
+        points_on_root = [point_on_circle (root_radius, x) for x in linspace(base2, base1+(two_pi/float(teeth)), root_points) ]
+        return points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root # [::-1] reverses list
+
+    if template:
+        first = tooth(0.0)
+        for i in range(teeth):
+            # the angles of rotation_table()
+            c = i * two_pi / float(teeth)
+            (ca, sa) = (cos(c), sin(c))
+            yield [(x*ca - y*sa, x*sa + y*ca) for (x, y) in first]
+        return
+    for i in range(teeth):
+        yield tooth(i * two_pi / float(teeth))
+
+def iter_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular, template=False,
+                     max_deviation=None):
+    " the points of iter_spur_teeth() one by one, e.g. for PathWriter.polygon() "
+    return chain.from_iterable(iter_spur_teeth(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                               accuracy_involute, accuracy_circular, template, max_deviation))
+
+
+def generate_spur_array(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular, template=False,
+                        max_deviation=None):
+    """ array backed variant of generate_spur_points()
+        - same arguments, same points in the same order,
+          but returned as a (N,2) numpy float array.
+        - all teeth are computed at once: one angle matrix
+          (teeth x points per tooth) and one batched cos/sin call.
+        - template=True computes one tooth and rotates it with a
+          (teeth x 2) cos/sin table instead.
+        - falls back to generate_spur_points() if numpy is missing.
+    """
+    if load_numpy() is None:
+        return generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular, template,
+                                    max_deviation)
+    half_thick_angle = two_pi / (4.0 * teeth )
+    pitch_to_base_angle  = involute_intersect_angle( base_radius, pitch_radius )
+
+    (radii, tip_points, root_points) = spur_sampling(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                                     accuracy_involute, accuracy_circular, max_deviation)
+    # only len(radii) values, shared by all teeth.
+    angles = numpy.array([involute_intersect_angle(base_radius, r) for r in radii])
+    radii = numpy.array(radii)
+
+    # one row per tooth. Operations are ordered as in generate_spur_points()
+    # so that every point rounds the same way.
+    if template:
+        centers = numpy.zeros((1, 1))
+    else:
+        centers = (numpy.arange(teeth) * two_pi / float(teeth))[:, None]
+    pitch1 = centers - half_thick_angle
+    base1  = pitch1 - pitch_to_base_angle
+    offsetangles1 = base1 + angles
+    pitch2 = centers + half_thick_angle
+    base2  = pitch2 + pitch_to_base_angle
+    offsetangles2 = base2 - angles
+
+    def _linspace(a, b, n):
+        # linspace() for a column of start/end values
+        return a + numpy.arange(n) * (b - a) / (n - 1)
+
+    outer_angles = _linspace(offsetangles1[:, -1:], offsetangles2[:, -1:], tip_points)
+    if root_radius > base_radius:
+        pitch_to_root_angle = pitch_to_base_angle - involute_intersect_angle(base_radius, root_radius )
+        root1 = pitch1 - pitch_to_root_angle
+        root2 = pitch2 + pitch_to_root_angle
+        root_angles = _linspace(root2, root1+(two_pi/float(teeth)), root_points)[:, 1:-1]
+    else:
+        root_angles = _linspace(base2, base1+(two_pi/float(teeth)), root_points)
+
+    # same layout as p_tmp: flank1, tip, flank2 reversed, root
+    tooth_angles = numpy.hstack((offsetangles1, outer_angles[:, 1:-1],
+                                 offsetangles2[:, ::-1], root_angles))
+    n_root = root_angles.shape[1]
+    tooth_radii = numpy.hstack((radii, numpy.full(tip_points-2, float(outer_radius)),
+                                radii[::-1], numpy.full(n_root, float(root_radius))))
+    points = numpy.empty(tooth_angles.shape + (2,))
+    points[..., 0] = tooth_radii * numpy.cos(tooth_angles)
+    points[..., 1] = tooth_radii * numpy.sin(tooth_angles)
+    if template:
+        points = rotate_tooth_array(points[0], teeth)
+    return points.reshape(-1, 2)
+
+def rotate_tooth_array(tooth, count):
+    """ numpy variant of rotate_tooth()
+        - tooth is a (M,2) array, returns a (count,M,2) array
+    """
+    table = numpy.array(rotation_table(count))
+    ca, sa = table[:, 0:1], table[:, 1:2]
+    x, y = tooth[:, 0], tooth[:, 1]
+    points = numpy.empty((count,) + tooth.shape)
+    points[..., 0] = x*ca - y*sa
+    points[..., 1] = x*sa + y*ca
+    return points
+
+
+def generate_spur_outline(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, max_deviation=None):
+    """ outline of the tooth centered at angle 0 (plus the following gap)
+        with the tip and root circles as true arcs instead of points.
+        - returns (start, segments): start is the first involute point,
+          segments is a list of ('L', (x,y)) and ('A', radius, (x,y)).
+        - the last segment ends at the start of the next tooth.
+        - all arcs run in direction of increasing angle (sweep-flag 1)
+    """
+    step = two_pi / float(teeth)
+    half_thick_angle = two_pi / (4.0 * teeth )
+    pitch_to_base_angle  = involute_intersect_angle( base_radius, pitch_radius )
+
+    (radii, tip_points, root_points) = spur_sampling(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                                     accuracy_involute, 0, max_deviation)
+    angles = [involute_intersect_angle(base_radius, r) for r in radii]
+
+    pitch1 = - half_thick_angle
+    base1  = pitch1 - pitch_to_base_angle
+    points1 = [ point_on_circle( radii[i], base1 + angles[i]) for i in range(0,len(radii)) ]
+    pitch2 = half_thick_angle
+    base2  = pitch2 + pitch_to_base_angle
+    points2 = [ point_on_circle( radii[i], base2 - angles[i]) for i in range(0,len(radii)) ]
+    next_start = point_on_circle( radii[0], base1 + angles[0] + step)
+
+    segments  = [('L', p) for p in points1[1:]]
+    segments += [('A', outer_radius, points2[-1])]
+    segments += [('L', p) for p in points2[-2::-1]]
+    if root_radius > base_radius:
+        segments += [('A', root_radius, next_start)]
+    else:
+        # radial lines down from the base circle
+        segments += [('L', point_on_circle(root_radius, base2)),
+                     ('A', root_radius, point_on_circle(root_radius, base1 + step)),
+                     ('L', next_start)]
+    return (points1[0], segments)
+
+
+def write_spur_path(writer, teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, max_deviation=None):
+    """ write the closed gear outline into writer (a PathWriter)
+        - the tooth from generate_spur_outline() is rotated into place,
+          tip and root circles become SVG 'A' arcs.
+    """
+    (start, segments) = generate_spur_outline(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute,
+                                              max_deviation)
+    writer.move_to(*start)
+    for (ca, sa) in rotation_table(teeth):
+        for seg in segments:
+            (x, y) = seg[-1]
+            x, y = x*ca - y*sa, x*sa + y*ca
+            if seg[0] == 'L':
+                writer.line_to(x, y)
+            else:
+                writer.arc_to(seg[1], seg[1], 0, 0, 1, x, y)
+    writer.close()
+
+
+def write_gear_outline(writer, teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                       accuracy_involute, accuracy_circular, max_deviation=None, arcs=False):
+    """ write the closed spur or ring gear outline into writer
+        - arcs=True uses true arcs for tip and root (write_spur_path()),
+          otherwise the points are written as a polygon.
+        - returns the points, e.g. for the bounding box: an (N,2) array
+          if numpy is loaded already, else a flat array('d')
+          (generate_spur_flat()). numpy is not imported for this: the
+          import takes longer than the largest gear without it.
+        - with arcs=True no points are computed, None is returned
+          (spur_outline_bbox() gives the bounding box).
+        - every tooth is computed, not rotated from a template: the rotated
+          copies differ in the last bits (e.g. -0.0000 instead of 0.0000),
+          the classic output stays that of the original extension.
+    """
+    if arcs:
+        write_spur_path(writer, teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                        accuracy_involute, max_deviation)
+        return None
+    points = spur_outline_points(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                 accuracy_involute, accuracy_circular, max_deviation)
+    writer.polygon(points)
+    return points
+
+
+def spur_outline_points(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                        accuracy_involute, accuracy_circular, max_deviation=None):
+    """ the points of the outline as write_gear_outline() writes them
+        (every tooth computed): an (N,2) array if numpy is loaded, else a
+        flat array('d')
+    """
+    spur_points = generate_spur_array if numpy is not None else generate_spur_flat
+    return spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                       accuracy_involute, accuracy_circular, max_deviation=max_deviation)
+
+
+def spur_outline_bbox(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                      accuracy_involute, accuracy_circular, max_deviation=None):
+    """ bounding box of the outline: spur_bbox(), or for the few gears
+        it does not cover from the points (every tooth computed, as in
+        write_gear_outline()), one at a time
+    """
+    return (spur_bbox(teeth, base_radius, pitch_radius, outer_radius, root_radius) or
+            points_to_bbox(iter_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                            accuracy_involute, accuracy_circular, max_deviation=max_deviation)))
+
+
+def stream_gear_outline(writer, teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                        accuracy_involute, accuracy_circular, max_deviation=None, arcs=False):
+    """ write_gear_outline() one tooth at a time, for a writer that streams
+        to a file: the memory needed is that of one tooth, not of the gear.
+        - returns the bounding box instead of the points
+        - every tooth is computed, as in write_gear_outline(), so the path
+          is the same byte for byte (also that of the cached outline)
+    """
+    if arcs:
+        write_spur_path(writer, teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                        accuracy_involute, max_deviation)
+        return spur_outline_bbox(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                 accuracy_involute, accuracy_circular, max_deviation)
+    bbox = new_bbox()
+    writer.polygon(track_bbox(iter_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                               accuracy_involute, accuracy_circular, max_deviation=max_deviation), bbox))
+    return tuple(bbox)
+
+
+def compact_precision(unit_factor, tolerance=0.001):
+    """ number of decimals needed to keep the rounding error below
+        tolerance (in dialog units, where unit_factor converts to px)
+    """
+    return max(0, int(ceil(-log10(2.0 * tolerance * unit_factor))))
+
+
+def generate_spokes_path(root_radius, spoke_width, spoke_count, mount_radius, mount_hole,
+                         unit_factor, unit_label, writer=None):
+    """ given a set of constraints
+        - generate the svg path for the gear spokes
+        - the path goes into writer (a PathWriter), if given.
+          Otherwise a new one is used and its path returned.
+        - lies between mount_radius (inner hole) and root_radius (bottom of the teeth)
+        - spoke width also defines the spacing at the root_radius
+        - mount_radius is adjusted so that spokes fit if there is room
+        - if no room (collision) then spokes not drawn
+    """
+    # Spokes
+    collision = False # assume we draw spokes
+    messages = []     # messages to send back about changes.
+    path = writer
+    if writer is None:
+        path = ClassicPathWriter()
+    r_outer = root_radius - spoke_width
+    # checks for collision with spokes
+    # check for mount hole collision with inner spokes
+    if mount_radius <= mount_hole/2:
+        adj_factor = (r_outer - mount_hole/2) / 5
+        if adj_factor < 0.1:
+            # not enough reasonable room
+            collision = True
+        else:
+            mount_radius = mount_hole/2 + adj_factor # small fix
+            messages.append("Mount support too small. Auto increased to %2.2f%s." % (mount_radius/unit_factor*2, unit_label))
+            
+    # then check to see if cross-over on spoke width
+    if spoke_width * spoke_count +0.5 >= two_pi * mount_radius:
+        adj_factor = 1.2 # wrong value. its probably one of the points distances calculated below
+        mount_radius += adj_factor
+        messages.append("Too many spokes. Increased Mount support by %2.3f%s" % (adj_factor/unit_factor, unit_label))
+    
+    # check for collision with outer rim
+    if r_outer <= mount_radius:
+        # not enough room to draw spokes so cancel
+        collision = True
+    if collision: # don't draw spokes if no room.
+        messages.append("Not enough room for Spokes. Decrease Spoke width.")
+    else: # draw spokes
+        for i in range(spoke_count):
+            points = []
+            start_a, end_a = i * two_pi / spoke_count, (i+1) * two_pi / spoke_count
+            # inner circle around mount
+            asin_factor = spoke_width/mount_radius/2
+            # check if need to clamp radius
+            asin_factor = max(-1.0, min(1.0, asin_factor)) # no longer needed - resized above
+            a = asin(asin_factor)
+            points += [ point_on_circle(mount_radius, start_a + a), point_on_circle(mount_radius, end_a - a)]
+            # is inner circle too small
+            asin_factor = spoke_width/r_outer/2
+            # check if need to clamp radius
+            asin_factor = max(-1.0, min(1.0, asin_factor)) # no longer needed - resized above
+            a = asin(asin_factor)
+            points += [point_on_circle(r_outer, end_a - a), point_on_circle(r_outer, start_a + a) ]
+
+            path.move_to(*points[0])
+            path.arc_to(*((mount_radius, mount_radius, 0, 0 if spoke_count!=1 else 1, 1 ) + points[1]))
+            path.line_to(*points[2])
+            path.arc_to(*((r_outer, r_outer, 0, 0 if spoke_count!=1 else 1, 0 ) + points[3]))
+            path.close()
+    if writer is not None:
+        return (None, messages)
+    return (path.getvalue(), messages)
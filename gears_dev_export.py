@@ -0,0 +1,521 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Copyright (C) 2017 David Grimberg (sentinel @ bardicgrove.org)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+File writers for the headless tools. They stream into a file handle:
+- SVG documents around the path data of gears_dev_core.PathWriter
+- DXF (R12) through DxfWriter and G-code through GcodeWriter. Both have
+  the same interface as PathWriter, so all path producers
+  (write_spur_path(), generate_spokes_path(), ...) write them directly.
+- OffsetWriter sits in front of any of them and moves the paths by the
+  tool radius (kerf compensation).
+'''
+
+from math import asin, atan2, pi, sqrt, tan
+
+from gears_dev_core import point_pairs
+
+EPSILON = 1e-9
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+INKSCAPE_NS = 'http://www.inkscape.org/namespaces/inkscape'
+
+
+def xml_escape(text):
+    return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+def style_string(style):
+    " like simplestyle.formatStyle() "
+    return ';'.join(['%s:%s' % (k, style[k]) for k in sorted(style)])
+
+def write_svg_header(out, bbox, units, unit_factor, margin=0.0):
+    """ start an SVG document that shows bbox (llx, lly, urx, ury in px)
+        - width and height are given in units, so the document has real world size
+    """
+    (llx, lly, urx, ury) = bbox
+    llx, lly, urx, ury = llx - margin, lly - margin, urx + margin, ury + margin
+    w, h = urx - llx, ury - lly
+    out.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n')
+    out.write('<svg xmlns="%s" xmlns:inkscape="%s" version="1.1"\n' % (SVG_NS, INKSCAPE_NS))
+    out.write('     width="%.4f%s" height="%.4f%s" viewBox="%.4f %.4f %.4f %.4f">\n' %
+              (w / unit_factor, units, h / unit_factor, units, llx, lly, w, h))
+
+def write_svg_footer(out):
+    out.write('</svg>\n')
+
+def write_svg_group_start(out, attribs):
+    out.write('<g')
+    for k in sorted(attribs):
+        out.write(' %s="%s"' % (k, xml_escape(attribs[k])))
+    out.write('>\n')
+
+def write_svg_group_end(out):
+    out.write('</g>\n')
+
+def write_svg_path_start(out, style, label=None):
+    " open a path element, the caller streams the 'd' data next "
+    out.write('<path style="%s"' % xml_escape(style_string(style)))
+    if label is not None:
+        out.write(' inkscape:label="%s"' % xml_escape(label))
+    out.write(' d="')
+
+def write_svg_path_end(out):
+    out.write('"/>\n')
+
+
+class DxfWriter(object):
+    """ write DXF R12 entities with the interface of gears_dev_core.PathWriter
+        - every subpath becomes a POLYLINE, arcs become vertex bulges,
+          circle() becomes a CIRCLE entity.
+        - coordinates are multiplied by scale (px to real units) and
+          y is flipped, as DXF has y pointing up.
+        - only one vertex is held back (its bulge is known with the next
+          segment), everything else is written to out immediately.
+        - call begin() / end() around the entities of one file.
+    """
+    def __init__(self, out, scale=1.0, layer='0', precision=6):
+        self.out = out
+        self.scale = scale
+        self.layer = layer
+        self.precision = precision
+        self.pending = None     # [x, y, bulge] not yet written
+        self.start = None
+        self.cur = None
+
+    def begin(self):
+        self.out.write('0\nSECTION\n2\nENTITIES\n')
+
+    def end(self):
+        self._end_polyline()
+        self.out.write('0\nENDSEC\n0\nEOF\n')
+
+    def _num(self, v):
+        return '%.*f' % (self.precision, v)
+
+    def _xy(self, x, y):
+        return (x * self.scale, -y * self.scale)
+
+    def _vertex(self, x, y, bulge):
+        self.out.write('0\nVERTEX\n8\n%s\n10\n%s\n20\n%s\n' % (self.layer, self._num(x), self._num(y)))
+        if bulge:
+            self.out.write('42\n%s\n' % self._num(bulge))
+
+    def _end_polyline(self):
+        if self.pending is not None:
+            self._vertex(*self.pending)
+            self.pending = None
+            self.out.write('0\nSEQEND\n8\n%s\n' % self.layer)
+
+    def move_to(self, x, y):
+        self._end_polyline()
+        self.out.write('0\nPOLYLINE\n8\n%s\n66\n1\n70\n0\n' % self.layer)
+        self.cur = self.start = (x, y)
+        self.pending = list(self._xy(x, y)) + [0.0]
+        return self
+
+    def line_to(self, x, y):
+        self._vertex(*self.pending)
+        self.pending = list(self._xy(x, y)) + [0.0]
+        self.cur = (x, y)
+        return self
+
+    def arc_to(self, rx, ry, rotation, large_arc, sweep, x, y):
+        " circular arcs only (rx == ry), as produced by the gear generators "
+        (x0, y0) = self.cur
+        chord = sqrt((x - x0)**2 + (y - y0)**2)
+        if chord == 0:
+            return self
+        half = asin(min(1.0, chord / (2.0 * rx)))
+        angle = 2 * half if not large_arc else 2 * pi - 2 * half
+        # sweep 1 turns with increasing angle in SVG coordinates,
+        # that is clockwise once y is flipped: negative bulge.
+        bulge = tan(angle / 4.0)
+        self.pending[2] = -bulge if sweep else bulge
+        return self.line_to(x, y)
+
+    def close(self):
+        (x0, y0), (x1, y1) = self.cur, self.start
+        if abs(x1 - x0) + abs(y1 - y0) > 1e-9 * (abs(x1) + abs(y1) + 1):
+            self.line_to(x1, y1)
+        self._end_polyline()
+        self.cur = self.start
+        return self
+
+    def polygon(self, points, close=True):
+        it = iter(point_pairs(points))
+        f = next(it)
+        self.move_to(f[0], f[1])
+        for x in it:
+            self.line_to(x[0], x[1])
+        if close:
+            self.close()
+        return self
+
+    def circle(self, r, cx=0, cy=0):
+        self._end_polyline()
+        (x, y) = self._xy(cx, cy)
+        self.out.write('0\nCIRCLE\n8\n%s\n10\n%s\n20\n%s\n40\n%s\n' %
+                       (self.layer, self._num(x), self._num(y), self._num(r * self.scale)))
+        return self
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return None
+
+
+def arc_center(start, end, radius, large_arc, sweep):
+    " center of the circular SVG arc from start to end (x-axis-rotation 0) "
+    ((x0, y0), (x1, y1)) = (start, end)
+    (hx, hy) = ((x0 - x1) / 2.0, (y0 - y1) / 2.0)
+    h2 = hx * hx + hy * hy
+    k = sqrt(max(0.0, radius * radius / h2 - 1.0)) if h2 > 0 else 0.0
+    if large_arc == sweep:
+        k = -k
+    return ((x0 + x1) / 2.0 + k * hy, (y0 + y1) / 2.0 - k * hx)
+
+
+class GcodeWriter(object):
+    """ write G-code moves with the interface of gears_dev_core.PathWriter
+        - lines become G1, circular arcs G2/G3 with the center (I, J)
+          relative to the start. Every subpath starts with a retract to
+          safe_z, a rapid move (G0) and a plunge to depth.
+        - coordinates are multiplied by scale (px to mm or inch) and y is
+          flipped, as in DxfWriter. inch=True selects G20, otherwise G21.
+        - feed and plunge_feed are in units per minute, spindle is the S
+          word of M3 (None: no spindle commands). With depth == safe_z there
+          are no Z moves at all, e.g. for a laser.
+        - every move is written to out immediately.
+        - call begin() / end() around the moves of one file.
+    """
+    def __init__(self, out, scale=1.0, inch=False, feed=600.0, plunge_feed=100.0, depth=-1.0, safe_z=5.0,
+                 spindle=None, precision=4):
+        self.out = out
+        self.scale = scale
+        self.inch = inch
+        self.feed = feed
+        self.plunge_feed = plunge_feed
+        self.depth = depth
+        self.safe_z = safe_z
+        self.spindle = spindle
+        self.precision = precision
+        self.z_moves = depth != safe_z
+        self.down = False       # tool at cutting depth
+        self.last_feed = None   # F of the last feed move
+        self.start = None
+        self.cur = None
+
+    def begin(self):
+        self.out.write('(inkscape-gears-dev)\nG90 G17 %s\n' % ('G20' if self.inch else 'G21'))
+        if self.z_moves:
+            self.out.write('G0 Z%s\n' % self._num(self.safe_z))
+        if self.spindle is not None:
+            self.out.write('M3 S%s\n' % self._num(self.spindle))
+
+    def end(self):
+        self._retract()
+        if self.spindle is not None:
+            self.out.write('M5\n')
+        self.out.write('M2\n')
+
+    def _num(self, v):
+        s = '%.*f' % (self.precision, v)
+        if '.' in s:
+            s = s.rstrip('0').rstrip('.')
+        return '0' if s in ('-0', '') else s
+
+    def _xy(self, x, y):
+        return 'X%s Y%s' % (self._num(x * self.scale), self._num(-y * self.scale))
+
+    def _feed(self, feed):
+        if feed == self.last_feed:
+            return ''
+        self.last_feed = feed
+        return ' F%s' % self._num(feed)
+
+    def _retract(self):
+        if self.down and self.z_moves:
+            self.out.write('G0 Z%s\n' % self._num(self.safe_z))
+        self.down = False
+
+    def move_to(self, x, y):
+        self._retract()
+        self.out.write('G0 %s\n' % self._xy(x, y))
+        if self.z_moves:
+            self.out.write('G1 Z%s%s\n' % (self._num(self.depth), self._feed(self.plunge_feed)))
+        self.down = True
+        self.cur = self.start = (x, y)
+        return self
+
+    def line_to(self, x, y):
+        self.out.write('G1 %s%s\n' % (self._xy(x, y), self._feed(self.feed)))
+        self.cur = (x, y)
+        return self
+
+    def arc_to(self, rx, ry, rotation, large_arc, sweep, x, y):
+        " circular arcs only (rx == ry), as produced by the gear generators "
+        (x0, y0) = self.cur
+        (cx, cy) = arc_center(self.cur, (x, y), rx, large_arc, sweep)
+        # sweep 1 turns with increasing angle in SVG coordinates,
+        # that is clockwise once y is flipped: G2.
+        self.out.write('%s %s I%s J%s%s\n' % ('G2' if sweep else 'G3', self._xy(x, y),
+                                               self._num((cx - x0) * self.scale), self._num((y0 - cy) * self.scale),
+                                               self._feed(self.feed)))
+        self.cur = (x, y)
+        return self
+
+    def close(self):
+        (x0, y0), (x1, y1) = self.cur, self.start
+        if abs(x1 - x0) + abs(y1 - y0) > EPSILON * (abs(x1) + abs(y1) + 1):
+            self.line_to(x1, y1)
+        self.cur = self.start
+        return self
+
+    def polygon(self, points, close=True):
+        it = iter(point_pairs(points))
+        f = next(it)
+        self.move_to(f[0], f[1])
+        for x in it:
+            self.line_to(x[0], x[1])
+        if close:
+            self.close()
+        return self
+
+    def circle(self, r, cx=0, cy=0):
+        " a full circle made of two arcs, starting at the bottom (as PathWriter.circle()) "
+        self.move_to(cx, cy + r)
+        self.arc_to(r, r, 0, 0, 0, cx, cy - r)
+        self.arc_to(r, r, 0, 0, 0, cx, cy + r)
+        return self
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return None
+
+
+class OffsetWriter(object):
+    """ move the paths written to it sideways by offset and pass them on to
+        writer (PathWriter, DxfWriter or GcodeWriter), for the tool radius
+        - offset (px) is to the left of the direction of travel, in SVG
+          coordinates (y down). The outlines of the generators (spur, ring
+          and rack points, write_spur_path()) run with their inside on the
+          right, holes (spokes, circle()) the other way round. So a positive
+          offset cuts outside of a gear, a ring gear needs a negative one.
+          offset can be changed between subpaths.
+        - outside corners get an arc around the corner, inside corners are
+          cut where the offset segments cross. Details smaller than the tool
+          are not removed.
+        - streams: only one segment is held back, and the first one of each
+          subpath until it is closed. A closed subpath is passed on starting
+          at its second point.
+        - call flush() at the end, before writer.end().
+    """
+    def __init__(self, writer, offset):
+        self.writer = writer
+        self.offset = offset
+        self.first = None   # first segment of the subpath, written at close()
+        self.last = None    # segment not written yet
+        self.started = False
+        self.start = None
+        self.cur = None
+
+    def _left(self, t):
+        return (t[1] * self.offset, -t[0] * self.offset)
+
+    def _segment(self, kind, p0, p1, t0, t1, center=None, large_arc=0, sweep=0):
+        " a segment from p0 to p1 with the tangents t0, t1, moved by offset "
+        (n0, n1) = (self._left(t0), self._left(t1))
+        return {'kind': kind, 'p0': (p0[0] + n0[0], p0[1] + n0[1]), 'p1': (p1[0] + n1[0], p1[1] + n1[1]),
+                't0': t0, 't1': t1, 'center': center, 'large_arc': large_arc, 'sweep': sweep}
+
+    def move_to(self, x, y):
+        self._finish()
+        self.cur = self.start = (x, y)
+        return self
+
+    def line_to(self, x, y):
+        (x0, y0) = self.cur
+        d = sqrt((x - x0)**2 + (y - y0)**2)
+        if d > EPSILON:
+            t = ((x - x0) / d, (y - y0) / d)
+            self._add(self._segment('L', self.cur, (x, y), t, t))
+            self.cur = (x, y)
+        return self
+
+    def arc_to(self, rx, ry, rotation, large_arc, sweep, x, y):
+        " circular arcs only (rx == ry), as produced by the gear generators "
+        (x0, y0) = self.cur
+        if abs(x - x0) + abs(y - y0) <= EPSILON:
+            return self
+        c = arc_center(self.cur, (x, y), rx, large_arc, sweep)
+        s = 1.0 if sweep else -1.0
+        t0 = (-(y0 - c[1]) * s / rx, (x0 - c[0]) * s / rx)
+        t1 = (-(y - c[1]) * s / rx, (x - c[0]) * s / rx)
+        self._add(self._segment('A', self.cur, (x, y), t0, t1, c, large_arc, sweep))
+        self.cur = (x, y)
+        return self
+
+    def close(self):
+        (x0, y0), (x1, y1) = self.cur, self.start
+        if abs(x1 - x0) + abs(y1 - y0) > EPSILON * (abs(x1) + abs(y1) + 1):
+            self.line_to(x1, y1)
+        if self.first is not None and self.first is not self.last:
+            corner = self._join(self.last, self.first, self.start)
+            self._draw(self.last)
+            if corner is not None:
+                self._draw(corner)
+            self._draw(self.first)
+            self.writer.close()
+        self.first = self.last = None
+        self._finish()
+        self.cur = self.start
+        return self
+
+    def polygon(self, points, close=True):
+        it = iter(point_pairs(points))
+        f = next(it)
+        self.move_to(f[0], f[1])
+        for x in it:
+            self.line_to(x[0], x[1])
+        if close:
+            self.close()
+        return self
+
+    def circle(self, r, cx=0, cy=0):
+        " PathWriter.circle() turns against the angle: the offset shrinks it "
+        self._finish()
+        if r - self.offset > EPSILON:
+            self.writer.circle(r - self.offset, cx, cy)
+        return self
+
+    def flush(self):
+        self._finish()
+        self.writer.flush()
+
+    def getvalue(self):
+        self._finish()
+        return self.writer.getvalue()
+
+    def _add(self, seg):
+        if self.last is None:
+            self.first = self.last = seg
+            return
+        corner = self._join(self.last, seg, self.cur)
+        if self.last is not self.first:
+            self._draw(self.last)
+        if corner is not None:
+            self._draw(corner)
+        self.last = seg
+
+    def _finish(self):
+        " pass on the rest of a subpath that was not closed "
+        if self.last is not None and self.last is not self.first:
+            self._draw(self.last)
+        if self.first is not None:
+            self.started = False
+            self._draw(self.first)
+        self.first = self.last = None
+        self.started = False
+
+    def _join(self, a, b, vertex):
+        """ connect the segments a and b at vertex: trim them where they
+            cross (inside corner) or return the arc around an outside corner
+        """
+        (pa, pb) = (a['p1'], b['p0'])
+        if abs(pa[0] - pb[0]) + abs(pa[1] - pb[1]) <= EPSILON * (abs(pa[0]) + abs(pa[1]) + 1):
+            b['p0'] = pa
+            return None
+        n = self._left(a['t1'])
+        if b['t0'][0] * n[0] + b['t0'][1] * n[1] > 0:
+            # turns towards the tool: the offset segments cross near vertex
+            crossings = segment_crossings(a, b)
+            if crossings:
+                x = min(crossings, key=lambda p: (p[0] - vertex[0])**2 + (p[1] - vertex[1])**2)
+                if (x[0] - vertex[0])**2 + (x[1] - vertex[1])**2 <= 4 * self.offset**2:
+                    a['p1'] = b['p0'] = x
+                    return None
+            return {'kind': 'L', 'p0': pa, 'p1': pb}
+        (ua, ub) = ((pa[0] - vertex[0], pa[1] - vertex[1]), (pb[0] - vertex[0], pb[1] - vertex[1]))
+        sweep = 1 if ua[0] * ub[1] - ua[1] * ub[0] > 0 else 0
+        return {'kind': 'A', 'p0': pa, 'p1': pb, 'center': vertex, 'large_arc': 0, 'sweep': sweep}
+
+    def _draw(self, seg):
+        writer = self.writer
+        if not self.started:
+            writer.move_to(*seg['p0'])
+            self.started = True
+        (x, y) = seg['p1']
+        if seg['kind'] == 'L':
+            writer.line_to(x, y)
+            return
+        (cx, cy) = seg['center']
+        r = sqrt((x - cx)**2 + (y - cy)**2)
+        if r <= EPSILON:
+            writer.line_to(x, y)
+            return
+        (x0, y0) = seg['p0']
+        angle = atan2(y - cy, x - cx) - atan2(y0 - cy, x0 - cx)
+        if not seg['sweep']:
+            angle = -angle
+        large_arc = 1 if angle % (2 * pi) > pi else 0
+        if large_arc and not seg['large_arc']:
+            # trimmed beyond its start: nothing of the arc is left
+            writer.line_to(x, y)
+            return
+        writer.arc_to(r, r, 0, large_arc, seg['sweep'], x, y)
+
+
+def segment_crossings(a, b):
+    " the points where the lines or circles of the segments a and b cross "
+    if a['kind'] == 'L' and b['kind'] == 'L':
+        (p, t, q, w) = (a['p0'], a['t0'], b['p0'], b['t0'])
+        d = t[0] * w[1] - t[1] * w[0]
+        if abs(d) <= EPSILON:
+            return []
+        s = ((q[0] - p[0]) * w[1] - (q[1] - p[1]) * w[0]) / d
+        return [(p[0] + s * t[0], p[1] + s * t[1])]
+    if a['kind'] == 'A' and b['kind'] == 'A':
+        return circle_crossings(a['center'], seg_radius(a), b['center'], seg_radius(b))
+    (line, arc) = (a, b) if a['kind'] == 'L' else (b, a)
+    (p, t, c) = (line['p0'], line['t0'], arc['center'])
+    (dx, dy) = (p[0] - c[0], p[1] - c[1])
+    half_b = dx * t[0] + dy * t[1]
+    disc = half_b * half_b - (dx * dx + dy * dy - seg_radius(arc)**2)
+    if disc < 0:
+        return []
+    return [(p[0] + s * t[0], p[1] + s * t[1]) for s in (-half_b - sqrt(disc), -half_b + sqrt(disc))]
+
+def seg_radius(seg):
+    return sqrt((seg['p0'][0] - seg['center'][0])**2 + (seg['p0'][1] - seg['center'][1])**2)
+
+def circle_crossings(c0, r0, c1, r1):
+    (dx, dy) = (c1[0] - c0[0], c1[1] - c0[1])
+    d2 = dx * dx + dy * dy
+    if d2 <= EPSILON:
+        return []
+    d = sqrt(d2)
+    a = (r0 * r0 - r1 * r1 + d2) / (2 * d)
+    h2 = r0 * r0 - a * a
+    if h2 < 0:
+        return []
+    h = sqrt(h2)
+    (mx, my) = (c0[0] + a * dx / d, c0[1] + a * dy / d)
+    return [(mx - h * dy / d, my + h * dx / d), (mx + h * dy / d, my - h * dx / d)]
@@ -0,0 +1,357 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Copyright (C) 2017 David Grimberg (sentinel @ bardicgrove.org)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+Mesh analysis of a gear pair, or of a gear and its rack.
+
+The involute formulas give the operating pressure angle, the contact
+ratio, the backlash and the tip/root clearances at a center distance.
+With numpy the pair is also rolled through one pitch of the first gear:
+the outline of the mate is transformed into the frame of the first gear
+for all steps at once and tested against the exact (polar) tooth shape
+of the first gear. That measures interference, i.e. how deep the teeth
+would cut into each other (the undercut they need), and the smallest
+free play on the way. A time budget stops the rolling early, so the
+analysis can run inside a search loop.
+'''
+
+import time
+from math import pi, sin, tan, acos, sqrt, radians, degrees
+
+from gears_dev_core import (load_numpy, gear_calculations, involute_intersect_angle, generate_spur_array,
+                            generate_rack_points, mesh_rotation, rack_offset)
+numpy = load_numpy()    # for the rolling simulation
+
+STEPS = 32              # positions per pitch of the first gear
+TIME_BUDGET = 0.05      # s for the rolling simulation
+SAMPLES = 200           # points per pitch along the outline of the mate
+
+
+def inv(angle):
+    " involute function "
+    return tan(angle) - angle
+
+
+class GearProfile(object):
+    """ the exact outline of a gear of generate_spur_points() in polar form
+        - spec are the arguments of gear_calculations()
+        - the outline polygon of a ring gear is its tooth spaces, the ring
+          is the material outside of it.
+    """
+    def __init__(self, teeth, circular_pitch, pressure_angle, clearance=0, ring_gear=False, profile_shift=0.):
+        self.spec = (teeth, circular_pitch, pressure_angle, clearance, ring_gear, profile_shift)
+        (self.pitch_radius, self.base_radius, self.addendum, self.dedendum,
+         self.outer_radius, self.root_radius, tooth) = gear_calculations(*self.spec)
+        self.teeth = teeth
+        self.pitch = circular_pitch
+        self.pressure_angle = pressure_angle
+        self.ring = ring_gear
+        self.pitch_angle = 2 * pi / teeth
+        # half width (angle) of an outline tooth where the flank is radial or starts
+        self.base_half = pi / (2.0 * teeth) + involute_intersect_angle(self.base_radius, self.pitch_radius)
+
+    def tip_radius(self):
+        " where the teeth end: the outer radius, for a ring gear the inner one "
+        return self.root_radius if self.ring else self.outer_radius
+
+    def half_angle(self, rho):
+        " half angular width of the outline teeth at the radii rho (array) "
+        rb = self.base_radius
+        r = numpy.maximum(rho, rb)
+        flank = self.base_half - (numpy.sqrt(r * r - rb * rb) / rb - numpy.arccos(rb / r))
+        half = numpy.clip(flank, 0.0, self.pitch_angle / 2)
+        half = numpy.where(rho < self.root_radius, self.pitch_angle / 2, half)
+        return numpy.where(rho > self.outer_radius, 0.0, half)
+
+    def material(self, rho, phi):
+        """ where the points (rho, phi) of the gear frame are relative to the teeth (arrays)
+            - returns (inside, depth, plus, minus): inside the material, how deep
+              (tangential or below the tip, the smaller one), and for the points
+              outside: the rotation (rad) of the gear in + and - direction that
+              brings a tooth to the point (inf if no tooth at that radius)
+        """
+        offset = self.pitch_angle / 2 if self.ring else 0.0
+        delta = numpy.mod(phi - offset, self.pitch_angle)
+
+        def width(r):
+            " half width of the material at the radii r, for a ring between the outline teeth "
+            half = self.half_angle(r)
+            return self.pitch_angle / 2 - half if self.ring else half
+
+        half = width(rho)
+        inside = (delta < half) | (delta > self.pitch_angle - half)
+        # below the root circle (ring: beyond it) the material is solid; the
+        # depth there is the way up to the root circle and along it to the
+        # next tooth space, not the width of a tooth at rho
+        r = numpy.clip(rho, self.root_radius, self.outer_radius)
+        h = width(r)
+        tangential = numpy.maximum(numpy.where(delta < h, h - delta, delta - (self.pitch_angle - h)), 0.0) * r
+        tangential += numpy.abs(rho - r)
+        if self.ring:
+            radial = rho - self.root_radius
+        else:
+            radial = self.outer_radius - rho
+        depth = numpy.where(inside, numpy.minimum(tangential, radial), 0.0)
+        solid = half > 0
+        plus = numpy.where(solid & ~inside, delta - half, numpy.inf)
+        minus = numpy.where(solid & ~inside, self.pitch_angle - half - delta, numpy.inf)
+        return (inside, depth, plus, minus)
+
+    def outline(self, step):
+        " the outline as (N,2) array, no point more than step from the next "
+        (acc_i, acc_c) = (40, 9)
+        points = generate_spur_array(self.teeth, self.base_radius, self.pitch_radius, self.outer_radius,
+                                     self.root_radius, acc_i, acc_c)
+        return densify(points, step)
+
+
+def densify(points, step, closed=True):
+    " points (polygon) as (N,2) array with extra points on the edges longer than step "
+    p = numpy.asarray(points, dtype=float)
+    q = numpy.roll(p, -1, axis=0)
+    if not closed:
+        (p, q) = (p[:-1], q[:-1])
+    d = q - p
+    n = numpy.maximum(1, numpy.ceil(numpy.hypot(d[:, 0], d[:, 1]) / step)).astype(int)
+    index = numpy.repeat(numpy.arange(len(p)), n)
+    t = (numpy.arange(n.sum()) - numpy.repeat(numpy.cumsum(n) - n, n)) / numpy.repeat(n, n).astype(float)
+    return p[index] + d[index] * t[:, None]
+
+
+def contact_ratio(length, gear):
+    " contact ratio of a line of action length "
+    return max(0.0, length) / (gear.pitch_angle * gear.base_radius)
+
+def analyze_mesh(spec_a, spec_b, center_distance=None, steps=STEPS, time_budget=TIME_BUDGET):
+    """ mesh analysis of the gears spec_a and spec_b (gear_calculations() arguments)
+        - one of them may be a ring gear, the other one inside it
+        - center_distance defaults to the sum (ring: difference) of the pitch radii
+        - steps positions per pitch are simulated (numpy only, 0: formulas only)
+        - returns a dict, see mesh_notes():
+          center_distance, operating_angle (deg), contact_ratio, backlash
+          (circular, on the pitch circle of a), clearance (smallest tip/root
+          clearance), tip_interference (from the formulas: how far a tip circle
+          reaches beyond the interference point of the mate, radially, 0 if
+          not), interference (bool: that or the teeth cut into each other,
+          simulated), undercut_a / undercut_b (how deep
+          the teeth of the mate cut into a / b, simulated), steps, complete,
+          elapsed (s)
+    """
+    start = time.time()
+    a = GearProfile(*spec_a)
+    b = GearProfile(*spec_b)
+    if a.ring and b.ring:
+        raise ValueError('two ring gears cannot mesh')
+    internal = a.ring or b.ring
+    (pinion, ring) = (b, a) if a.ring else (a, b)
+    if center_distance is None:
+        center_distance = ring.pitch_radius - pinion.pitch_radius if internal else a.pitch_radius + b.pitch_radius
+    cd = float(center_distance)
+    alpha = radians(a.pressure_angle)
+    if internal:
+        cos_w = (ring.base_radius - pinion.base_radius) / cd if cd > 0 else 2.0
+    else:
+        cos_w = (a.base_radius + b.base_radius) / cd
+    if cos_w > 1.0:
+        raise ValueError('center distance %.4f is too small, the base circles overlap' % cd)
+    alpha_w = acos(cos_w)
+    line = cd * sin(alpha_w)    # between the tangent points of the base circles
+    result = {'center_distance': cd, 'operating_angle': degrees(alpha_w)}
+
+    # line of action, backlash and clearance
+    reach_p = sqrt(pinion.outer_radius ** 2 - pinion.base_radius ** 2)
+    thick = lambda g, sign: 2 * g.base_radius / cos_w * (pi / (2.0 * g.teeth) + sign * (inv(alpha) - inv(alpha_w)))
+    if internal:
+        # measured from the tangent point of the ring, the one of the pinion is at line
+        ri = ring.tip_radius()
+        reach_r = sqrt(max(ri * ri - ring.base_radius ** 2, 0.0))
+        reach_root = sqrt(ring.outer_radius ** 2 - ring.base_radius ** 2)
+        length = min(line + reach_p, reach_root) - max(reach_r, line)
+        # the ring tips must stay outside the tangent point of the pinion
+        interference = sqrt(ring.base_radius ** 2 + line * line) - ri
+        clearance = min(ri - (cd + pinion.root_radius), ring.outer_radius - (cd + pinion.outer_radius))
+        backlash = 2 * pi * pinion.base_radius / cos_w / pinion.teeth - thick(pinion, 1) - thick(ring, -1)
+        backlash *= pinion.pitch_radius / (pinion.base_radius / cos_w)
+    else:
+        reach_b = sqrt(b.outer_radius ** 2 - b.base_radius ** 2)
+        reach_a = sqrt(a.outer_radius ** 2 - a.base_radius ** 2)
+        length = min(reach_a, line) + min(reach_b, line) - line
+        # the tips must not reach beyond the tangent point of the mate
+        interference = max(a.outer_radius - sqrt(a.base_radius ** 2 + line * line),
+                           b.outer_radius - sqrt(b.base_radius ** 2 + line * line))
+        clearance = min(cd - a.outer_radius - b.root_radius, cd - b.outer_radius - a.root_radius)
+        backlash = 2 * pi * a.base_radius / cos_w / a.teeth - thick(a, 1) - thick(b, 1)
+        backlash *= a.pitch_radius / (a.base_radius / cos_w)
+    result.update({'contact_ratio': contact_ratio(length, pinion), 'backlash': backlash,
+                   'clearance': clearance if abs(clearance) > 1e-9 else 0.0,
+                   'tip_interference': max(0.0, interference), 'interference': interference > 0,
+                   'undercut_a': 0.0, 'undercut_b': 0.0, 'steps': 0, 'complete': False})
+
+    if numpy is not None and steps > 0:
+        # b rolls with a through one pitch of a; each gear is checked
+        # against the outline points of the other one
+        rot_b0 = radians(mesh_rotation(a.teeth, 0.0, b.teeth, 0.0, a.ring, b.ring))
+        ratio = (1.0 if internal else -1.0) * a.teeth / float(b.teeth)
+        rot_a = numpy.arange(steps) * (a.pitch_angle / steps)
+        rot_b = rot_b0 + ratio * rot_a
+        points_a = near_points(a, a.outline(a.pitch / SAMPLES), 0.0, cd, b)
+        points_b = near_points(b, b.outline(b.pitch / SAMPLES), pi - rot_b0, cd, a)
+        views = [(a, rot_a, lambda k: rotated(points_b, rot_b[k], cd)),
+                 (b, rot_b, lambda k: rotated(points_a, rot_a[k], -cd))]
+        (done, simulated) = roll(views, steps, start, time_budget)
+        if done:
+            ((undercut_a, play_a), (undercut_b, play_b)) = simulated
+            finish(result, undercut_a, undercut_b, min(play_a, play_b), a.pitch)
+        result.update({'steps': done, 'complete': done == steps})
+    result['elapsed'] = time.time() - start
+    return result
+
+def near_points(gear, points, toward, distance, mate):
+    """ the outline points of gear that can reach the mate (its center at
+        distance in direction toward, in the frame of gear) while gear turns
+        one pitch: inside the tip circle of a spur gear, outside the one of a ring
+    """
+    r = numpy.hypot(points[:, 0], points[:, 1])
+    reach = mate.tip_radius() + (-0.01 if mate.ring else 0.01) * mate.pitch
+    # law of cosines: the angle from toward where r is at reach from the mate center
+    limit = numpy.arccos(numpy.clip((r * r + distance * distance - reach * reach) / (2 * r * distance), -1.0, 1.0))
+    angle = numpy.abs(numpy.mod(numpy.arctan2(points[:, 1], points[:, 0]) - toward + pi, 2 * pi) - pi)
+    if mate.ring:
+        return points[angle >= limit - 1.5 * gear.pitch_angle]
+    return points[angle <= limit + 1.5 * gear.pitch_angle]
+
+def rotated(points, rotation, dx):
+    " points (N,2) rotated by the rotations (k,) and moved by dx: x, y arrays (k,N) "
+    (c, s) = (numpy.cos(rotation)[:, None], numpy.sin(rotation)[:, None])
+    return (points[:, 0] * c - points[:, 1] * s + dx, points[:, 0] * s + points[:, 1] * c)
+
+def finish(result, undercut_a, undercut_b, play, pitch):
+    """ the simulated values into result, a pair without play has none
+        - interference is found by the formulas or by the simulation: a tip
+          beyond the interference point is reported even if the outlines
+          (with their radial flanks below the base circle) do not cut
+    """
+    tolerance = pitch * 1e-4
+    undercut_a = undercut_a if undercut_a > tolerance else 0.0
+    undercut_b = undercut_b if undercut_b > tolerance else 0.0
+    result.update({'undercut_a': undercut_a, 'undercut_b': undercut_b,
+                   'interference': result['tip_interference'] > 0 or undercut_a > 0 or undercut_b > 0})
+    if undercut_a > 0 or undercut_b > 0:
+        result['backlash'] = 0.0
+    elif play < numpy.inf:
+        result['backlash'] = max(0.0, play)
+
+def analyze_rack_mesh(spec, rack, distance=None, steps=STEPS, time_budget=TIME_BUDGET):
+    """ mesh analysis of the gear spec (gear_calculations() arguments) and a rack
+        - rack are the arguments of generate_rack_points(): (tooth_count, pitch,
+          addendum, pressure_angle, base_height, tab_length, clearance)
+        - the rack is below the gear as the effect draws it, its pitch line at
+          distance from the gear center (default: the pitch radius)
+        - returns a dict as analyze_mesh(), undercut_b is the rack
+    """
+    start = time.time()
+    a = GearProfile(*spec)
+    if a.ring:
+        raise ValueError('a rack cannot mesh with a ring gear')
+    (tooth_count, pitch, addendum, pressure_angle, base_height, tab_length, clearance) = rack
+    if distance is None:
+        distance = a.pitch_radius
+    shift = float(distance) - a.pitch_radius
+    alpha = radians(pressure_angle)
+    line = a.pitch_radius * sin(alpha)     # from the tangent point to the pitch point
+    reach = sqrt(a.outer_radius ** 2 - a.base_radius ** 2)
+    # the gear rolls on the line at its pitch radius, the rack tips are addendum - shift from it
+    rack_reach = (addendum - shift) / sin(alpha)
+    length = max(0.0, reach - line) + min(rack_reach, line)
+    result = {'center_distance': float(distance), 'operating_angle': pressure_angle,
+              'contact_ratio': contact_ratio(length, a),
+              'backlash': 2 * shift * tan(alpha),
+              'clearance': min(distance + addendum + clearance - a.outer_radius, distance - addendum - a.root_radius),
+              'tip_interference': max(0.0, (rack_reach - line) * sin(alpha)), 'interference': rack_reach > line,
+              'undercut_a': 0.0, 'undercut_b': 0.0, 'steps': 0, 'complete': False}
+
+    if numpy is not None and steps > 0:
+        (outline, guide) = generate_rack_points(*rack)
+        points = densify(outline, pitch / SAMPLES)
+        points[:, 0] += rack_offset(a.teeth) * pitch
+        points[:, 1] += distance
+        points = points[numpy.abs(points[:, 0]) <= a.outer_radius + 2 * pitch]
+        # rotating the gear by t (rad) moves the rack by -pitch_radius * t
+        rot_a = numpy.arange(steps) * (a.pitch_angle / steps)
+        move = -a.pitch_radius * rot_a
+        views = [(a, rot_a, lambda k: (points[:, 0] + move[k][:, None], numpy.tile(points[:, 1], (len(k), 1))))]
+        (done, simulated) = roll(views, steps, start, time_budget, split=True)
+        if done:
+            ((undercut_a, undercut_b, play),) = simulated
+            finish(result, undercut_a, undercut_b, play, pitch)
+        result.update({'steps': done, 'complete': done == steps})
+    result['elapsed'] = time.time() - start
+    return result
+
+def roll(views, steps, start, time_budget, split=False):
+    """ the steps of the meshing, a chunk of steps per array operation
+        - views are (gear, rotations of gear, place): place(indices) gives the
+          outline points of the mate at those steps relative to the center of gear
+        - stops after time_budget (s since start), at least one chunk is done
+        - returns (steps done, [(depth, play)] per view): how deep the mate
+          reaches into the gear, the smallest free play (on the pitch circle)
+          - split=True: (depth in the dedendum of gear, depth elsewhere, play)
+    """
+    found = [[0.0, 0.0, numpy.inf] for v in views]
+    done = 0
+    chunk = 8
+    while done < steps:
+        if done and time.time() - start > time_budget:
+            break
+        k = numpy.arange(done, min(steps, done + chunk))
+        for (n, (gear, rotations, place)) in enumerate(views):
+            (x, y) = place(k)
+            rho = numpy.hypot(x, y)
+            phi = numpy.arctan2(y, x) - rotations[k][:, None]
+            (inside, depth, plus, minus) = gear.material(rho, phi)
+            own = (rho < gear.pitch_radius) != gear.ring
+            if split:
+                found[n][0] = max(found[n][0], float(numpy.where(own, depth, 0.0).max()))
+                found[n][1] = max(found[n][1], float(numpy.where(own, 0.0, depth).max()))
+            else:
+                found[n][0] = max(found[n][0], float(depth.max()))
+            play = plus.min(axis=1) + minus.min(axis=1)
+            found[n][2] = min(found[n][2], float(play.min()) * gear.pitch_radius)
+        done += len(k)
+    if split:
+        return (done, [tuple(f) for f in found])
+    return (done, [(f[0], f[2]) for f in found])
+
+
+def mesh_notes(result, unit_factor, units, name='Mesh'):
+    " annotation lines for an analyze_mesh() result, lengths in units "
+    notes = ['%s: contact ratio %.2f, pressure angle %.2f deg, center distance %.3f %s' %
+             (name, result['contact_ratio'], result['operating_angle'], result['center_distance'] / unit_factor, units),
+             '%s: backlash %.4f %s, tip clearance %.4f %s' %
+             (name, result['backlash'] / unit_factor, units, result['clearance'] / unit_factor, units)]
+    if result['steps'] > 0 and (result['undercut_a'] > 0 or result['undercut_b'] > 0):
+        notes.append('%s: Interference Warning: the teeth cut %.4f / %.4f %s deep into each other' %
+                     (name, result['undercut_a'] / unit_factor, result['undercut_b'] / unit_factor, units))
+    if result['tip_interference'] > 0:
+        notes.append('%s: Interference Warning: the tips reach %.4f %s beyond the interference point, the flanks need undercut' %
+                     (name, result['tip_interference'] / unit_factor, units))
+    if result['contact_ratio'] < 1.0:
+        notes.append('%s: Contact ratio below 1, the teeth lose contact' % name)
+    if result['clearance'] < 0:
+        notes.append('%s: Warning: tips touch the roots of the mate' % name)
+    return notes
@@ -0,0 +1,404 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Copyright (C) 2017 David Grimberg (sentinel @ bardicgrove.org)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+Nesting of gears on sheets, e.g. for laser cutting.
+
+A part is a circle (a gear: its outer radius, centered on the origin)
+or a rectangle (its bounding box, e.g. a gear with its rack). Parts are
+placed largest first at the top-left-most free position that keeps the
+kerf gap to all other parts. The candidate positions touch the sheet
+edges and the parts already placed (circles nest into the gaps between
+circles). Collisions are checked through a uniform grid, so only the
+parts near a candidate are tested. A placed circle that no circle of the
+smallest part can touch any more is enclosed: round parts only take
+their candidates from the parts on the free frontier, not from all parts
+of the sheet, and nesting hundreds of parts is fast.
+'''
+
+from math import sqrt, pi, acos, atan2
+
+EPSILON = 1e-9
+
+
+def circle_part(name, radius):
+    " a round part: the disc of radius around its origin "
+    return {'name': name, 'radius': radius, 'bbox': (-radius, -radius, radius, radius), 'area': pi * radius * radius}
+
+def box_part(name, bbox):
+    " a rectangular part: bbox (llx, lly, urx, ury) relative to its origin "
+    (llx, lly, urx, ury) = bbox
+    return {'name': name, 'radius': None, 'bbox': bbox, 'area': (urx - llx) * (ury - lly)}
+
+def gear_part(name, outer_radius, bbox=None):
+    """ the part of a gear: a circle of outer_radius, or the rectangle bbox
+        (points_to_bbox() extents) if that reaches beyond the circle (rack)
+    """
+    r = outer_radius
+    if bbox is None or (bbox[0] >= -r - EPSILON and bbox[1] >= -r - EPSILON and
+                        bbox[2] <= r + EPSILON and bbox[3] <= r + EPSILON):
+        return circle_part(name, r)
+    return box_part(name, bbox)
+
+
+class GridIndex(object):
+    """ uniform grid of placed items for collision queries
+        - an item is a dict with 'bbox' in sheet coordinates
+        - each item is registered in every cell its bbox overlaps
+    """
+    def __init__(self, cell):
+        self.cell = float(cell)
+        self.cells = {}
+
+    def span(self, bbox):
+        c = self.cell
+        return (int(bbox[0] // c), int(bbox[1] // c), int(bbox[2] // c), int(bbox[3] // c))
+
+    def insert(self, item):
+        (i0, j0, i1, j1) = self.span(item['bbox'])
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                self.cells.setdefault((i, j), []).append(item)
+
+    def query(self, bbox):
+        " the items whose cells overlap bbox (each once) "
+        (i0, j0, i1, j1) = self.span(bbox)
+        found = []
+        seen = set()
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for item in self.cells.get((i, j), ()):
+                    if id(item) not in seen:
+                        seen.add(id(item))
+                        found.append(item)
+        return found
+
+
+def shapes_clear(a, b, gap):
+    """ True if the placed shapes a and b are at least gap apart
+        - a shape is a dict with 'bbox' and, for circles, 'x', 'y', 'radius'
+    """
+    (ab, bb) = (a['bbox'], b['bbox'])
+    if (ab[0] >= bb[2] + gap - EPSILON or bb[0] >= ab[2] + gap - EPSILON or
+            ab[1] >= bb[3] + gap - EPSILON or bb[1] >= ab[3] + gap - EPSILON):
+        return True
+    if a['radius'] is not None and b['radius'] is not None:
+        d = a['radius'] + b['radius'] + gap
+        return (a['x'] - b['x']) ** 2 + (a['y'] - b['y']) ** 2 >= d * d - EPSILON
+    if a['radius'] is None and b['radius'] is None:
+        return False    # overlapping rectangles
+    (c, r) = (a, b) if a['radius'] is not None else (b, a)
+    rb = r['bbox']
+    dx = max(rb[0] - c['x'], 0.0, c['x'] - rb[2])
+    dy = max(rb[1] - c['y'], 0.0, c['y'] - rb[3])
+    d = c['radius'] + gap
+    return dx * dx + dy * dy >= d * d - EPSILON
+
+
+class Sheet(object):
+    """ one sheet of width x height with the parts placed on it
+        - placements are shape dicts: 'part' (index), 'x', 'y' (origin of
+          the part on the sheet), 'bbox' (on the sheet) and 'radius'
+        - min_radius: the radius of the smallest round part to come, or
+          None. Placed circles that no circle of min_radius can touch
+          any more (see enclosed()) leave the frontier: no round part
+          gets a candidate next to them.
+    """
+    def __init__(self, width, height, gap, cell, min_radius=None):
+        self.width = width
+        self.height = height
+        self.gap = gap
+        self.min_radius = min_radius
+        self.index = GridIndex(cell)
+        self.placements = []
+        self.frontier = []      # the placements that are not enclosed
+        self.blockers = {}      # candidate slot: the placement that blocked it last
+
+    def shape(self, part, x, y):
+        (llx, lly, urx, ury) = part['bbox']
+        return {'x': x, 'y': y, 'radius': part['radius'], 'bbox': (llx + x, lly + y, urx + x, ury + y)}
+
+    def fits(self, shape):
+        " inside the sheet and clear of all placed parts "
+        return self.blocker(shape) is None
+
+    def blocker(self, shape):
+        " None if shape fits, else a placed part it overlaps (or the sheet) "
+        (llx, lly, urx, ury) = shape['bbox']
+        if llx < -EPSILON or lly < -EPSILON or urx > self.width + EPSILON or ury > self.height + EPSILON:
+            return self
+        g = self.gap
+        for other in self.index.query((llx - g, lly - g, urx + g, ury + g)):
+            if not shapes_clear(shape, other, g):
+                return other
+        return None
+
+    def place(self, index, part, shape):
+        shape['part'] = index
+        shape['size'] = part_size(part)
+        shape['full'] = None    # the size of the last part that found no place next to this one
+        shape['enclosed'] = False
+        shape['near'] = []      # the circles a round part can touch together with this one
+        r = shape['radius']
+        (llx, lly, urx, ury) = shape['bbox']
+        if r is not None:
+            # round parts come largest first: the next ones fit between
+            # circles that are less than 2 * (r + gap) apart
+            reach = 2 * (r + self.gap)
+            for q in self.index.query((llx - reach, lly - reach, urx + reach, ury + reach)):
+                if q['radius'] is not None:
+                    d = r + q['radius'] + reach
+                    if (q['x'] - shape['x']) ** 2 + (q['y'] - shape['y']) ** 2 <= d * d:
+                        q['near'].append(shape)
+                        shape['near'].append(q)
+        self.placements.append(shape)
+        self.frontier.append(shape)
+        self.index.insert(shape)
+        if self.min_radius is None:
+            return
+        # only the new part and its neighbours can have become enclosed
+        reach = 2 * (self.min_radius + self.gap)
+        changed = False
+        for p in self.index.query((llx - reach, lly - reach, urx + reach, ury + reach)):
+            if not p['enclosed'] and self.enclosed(p):
+                p['enclosed'] = changed = True
+        if changed:
+            self.frontier = [p for p in self.frontier if not p['enclosed']]
+
+    def enclosed(self, p):
+        """ True if no circle of min_radius can touch the placed circle p at gap
+            - the centers of such circles are on a ring around p; the
+              neighbours (circles) and the sheet edges block arcs of it.
+              p is enclosed when the arcs cover the whole ring.
+            - a larger circle touching p contains a circle of min_radius
+              touching p at the same point: p is enclosed for it too, and
+              stays enclosed when more parts are placed.
+        """
+        if p['radius'] is None:
+            return False
+        (r, g) = (self.min_radius, self.gap)
+        ring = p['radius'] + r + g
+        arcs = []
+        # the sheet edges: center, distance of the ring center to the edge
+        for (direction, room) in ((pi, p['x'] - r), (0.0, self.width - r - p['x']),
+                                  (-0.5 * pi, p['y'] - r), (0.5 * pi, self.height - r - p['y'])):
+            if room < ring:
+                arcs.append((direction, acos(max(-1.0, room / ring))))
+        (llx, lly, urx, ury) = p['bbox']
+        reach = 2 * (r + g)
+        for q in self.index.query((llx - reach, lly - reach, urx + reach, ury + reach)):
+            if q is p or q['radius'] is None:
+                continue    # a rectangle blocks nothing here: p may stay on the frontier
+            (dx, dy) = (q['x'] - p['x'], q['y'] - p['y'])
+            d = sqrt(dx * dx + dy * dy)
+            reach_q = q['radius'] + r + g
+            if d < EPSILON:
+                return True
+            c = (ring * ring + d * d - reach_q * reach_q) / (2 * ring * d)
+            if c < 1.0:
+                arcs.append((atan2(dy, dx), acos(max(-1.0, c))))
+        return arcs_cover(arcs)
+
+    def candidates(self, part):
+        """ [(y, x, anchors, slot)] positions for the origin of part, top-left first
+            - anchors are the placements the position touches
+            - slot names the kind of position next to the anchors
+        """
+        (llx, lly, urx, ury) = part['bbox']
+        r = part['radius']
+        g = self.gap
+        size = part_size(part)
+        result = [(-lly, -llx, (), ())]     # the top-left corner
+        round_part = r is not None and self.min_radius is not None and r >= self.min_radius - EPSILON
+        near = self.frontier if round_part else self.placements
+        live = [p for p in near if p['full'] is None or not covers(size, p['full'])]
+        for p in live:
+            (pllx, plly, purx, pury) = p['bbox']
+            # right of and below the bounding box of p
+            key = id(p)
+            result.append((plly - lly, purx + g - llx, (p,), (key, 0)))
+            result.append((-lly, purx + g - llx, (p,), (key, 1)))
+            result.append((pury + g - lly, pllx - llx, (p,), (key, 2)))
+            result.append((pury + g - lly, -llx, (p,), (key, 3)))
+            if r is None or p['radius'] is None:
+                continue
+            # circles touching p and the top or left sheet edge
+            d = r + p['radius'] + g
+            dy = r - p['y']
+            if abs(dy) <= d:
+                dx = sqrt(d * d - dy * dy)
+                result.append((r, p['x'] + dx, (p,), (key, 4)))
+            dx = r - p['x']
+            if abs(dx) <= d:
+                dy = sqrt(d * d - dx * dx)
+                result.append((p['y'] + dy, r, (p,), (key, 5)))
+            # circles touching p and a neighbour q
+            for q in p['near']:
+                if id(q) <= id(p) or (q['full'] is not None and covers(size, q['full'])):
+                    continue
+                if round_part and q['enclosed']:
+                    continue
+                for (side, (x, y)) in enumerate(touching_circle(p, q, r, g)):
+                    result.append((y, x, (p, q), (key, id(q), side)))
+        result.sort(key=lambda c: (c[0], c[1]))
+        return result
+
+    def insert(self, index, part):
+        """ place part at the first free candidate position
+            - marks the placements with no free position next to them as full
+              for parts of this size or larger
+            - the part that blocked a slot is tried first the next time:
+              it mostly still blocks, and no grid query is needed
+            - returns the placement or None
+        """
+        candidates = self.candidates(part)
+        last = {}
+        for (n, (y, x, anchors, slot)) in enumerate(candidates):
+            for a in anchors:
+                last[id(a)] = n
+        size = part_size(part)
+        g = self.gap
+        for (n, (y, x, anchors, slot)) in enumerate(candidates):
+            shape = self.shape(part, x, y)
+            other = self.blockers.get(slot)
+            if other is not None and other is not self and not shapes_clear(shape, other, g):
+                continue
+            other = self.blocker(shape)
+            if other is not None:
+                self.blockers[slot] = other
+                continue
+            self.mark_full(last, n, size)
+            self.place(index, part, shape)
+            return shape
+        self.mark_full(last, len(candidates), size)
+        return None
+
+    def mark_full(self, last, tried, size):
+        " the placements whose candidates were all tried (and failed) are full "
+        for p in self.placements:
+            if id(p) in last and last[id(p)] < tried:
+                p['full'] = size
+
+    def used_area(self, parts):
+        return sum([parts[p['part']]['area'] for p in self.placements])
+
+    def utilization(self, parts):
+        " used area / sheet area "
+        return self.used_area(parts) / (self.width * self.height)
+
+
+def part_size(part):
+    (llx, lly, urx, ury) = part['bbox']
+    return (urx - llx, ury - lly)
+
+def covers(size, full):
+    " a part of size has no place where a part of size full had none "
+    return size[0] >= full[0] - EPSILON and size[1] >= full[1] - EPSILON
+
+def arcs_cover(arcs):
+    """ True if the open arcs (center, half width) cover the whole circle
+        (with a margin of EPSILON: arcs that only touch leave a gap)
+    """
+    spans = []
+    for (center, half) in arcs:
+        if half >= pi:
+            return True
+        start = (center - half) % (2 * pi)
+        end = start + 2 * half
+        spans.append((start, end))
+        if end > 2 * pi:
+            spans.append((start - 2 * pi, end - 2 * pi))
+    spans.sort()
+    covered = 0.0
+    for (start, end) in spans:
+        if start > covered - EPSILON and end > 0:
+            return False
+        covered = max(covered, end)
+        if covered >= 2 * pi:
+            return True
+    return False
+
+def touching_circle(p, q, r, gap):
+    " the centers of a circle of radius r that touches the circles p and q at gap "
+    (ra, rb) = (p['radius'] + r + gap, q['radius'] + r + gap)
+    (dx, dy) = (q['x'] - p['x'], q['y'] - p['y'])
+    d2 = dx * dx + dy * dy
+    if d2 < EPSILON:
+        return []
+    d = sqrt(d2)
+    if d > ra + rb or d < abs(ra - rb):
+        return []
+    a = (ra * ra - rb * rb + d2) / (2 * d)
+    h = sqrt(max(ra * ra - a * a, 0.0))
+    (mx, my) = (p['x'] + a * dx / d, p['y'] + a * dy / d)
+    return [(mx - h * dy / d, my + h * dx / d), (mx + h * dy / d, my - h * dx / d)]
+
+
+def nest(parts, width, height, gap=0.0, max_sheets=None):
+    """ place parts on sheets of width x height with gap (kerf) between them
+        - parts are dicts from circle_part(), box_part() or gear_part()
+        - parts are placed largest first, on the first sheet where they fit;
+          a new sheet is started when none has room (up to max_sheets)
+        - returns (sheets, unplaced): a list of Sheet, the indices of the parts
+          that fit on no sheet
+    """
+    if width <= 0 or height <= 0:
+        raise ValueError('the sheet size must be positive')
+    if gap < 0:
+        raise ValueError('the kerf gap cannot be negative')
+    # cells for the typical part: a large part is in several cells, but
+    # a query for a small one does not return all its neighbours' neighbours
+    sizes = sorted([max(part_size(p)) for p in parts]) or [1.0]
+    cell = max(sizes[len(sizes) // 2] + gap, EPSILON)
+    radii = [p['radius'] for p in parts if p['radius'] is not None]
+    min_radius = min(radii) if radii else None
+    order = sorted(range(len(parts)), key=lambda i: (-parts[i]['area'], -max(part_size(parts[i])), i))
+    sheets = []
+    unplaced = []
+    for i in order:
+        part = parts[i]
+        (w, h) = part_size(part)
+        if w > width + EPSILON or h > height + EPSILON:
+            unplaced.append(i)
+            continue
+        for sheet in sheets:
+            if sheet.insert(i, part) is not None:
+                break
+        else:
+            if max_sheets is not None and len(sheets) >= max_sheets:
+                unplaced.append(i)
+                continue
+            sheet = Sheet(width, height, gap, cell, min_radius)
+            sheets.append(sheet)
+            sheet.insert(i, part)
+    return (sheets, sorted(unplaced))
+
+def nest_report(sheets, parts, unplaced=()):
+    " one line per sheet and a total: parts, used area and utilization "
+    lines = []
+    used = total = 0.0
+    for (n, sheet) in enumerate(sheets, 1):
+        u = sheet.used_area(parts)
+        used += u
+        total += sheet.width * sheet.height
+        lines.append('sheet %d: %d parts, utilization %.1f%%' % (n, len(sheet.placements), 100.0 * u / (sheet.width * sheet.height)))
+    if total:
+        lines.append('%d sheets: %d parts, utilization %.1f%%' % (len(sheets), len(parts) - len(unplaced), 100.0 * used / total))
+    if unplaced:
+        lines.append('%d parts do not fit on a sheet: %s' % (len(unplaced), ', '.join([str(parts[i]['name']) for i in unplaced])))
+    return lines
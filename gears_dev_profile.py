@@ -0,0 +1,166 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Copyright (C) 2017 David Grimberg (sentinel @ bardicgrove.org)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+Per stage instrumentation of one run of the effect.
+
+Each stage (gear_calculations, outline, spokes, svg, annotations, ...)
+records its calls, wall time and counts such as points and path bytes.
+A stage that runs for several gears is summed up, a stage inside another
+one (the rack of a gear set) is not counted twice. At the end the report
+is written as JSON to stderr or a file, e.g.
+
+    GEARS_DEV_PROFILE=stderr inkscape ...
+    GEARS_DEV_PROFILE=/tmp/gears.json GEARS_DEV_PROFILE_HOOK=cprofile inkscape ...
+
+The hook adds the 30 most expensive functions (cprofile) or the peak
+memory and the 30 largest allocation sites (tracemalloc) to the report.
+Switched off (the default) every method returns at once.
+'''
+
+from __future__ import print_function
+import sys, os, time, json
+from contextlib import contextmanager
+
+from gears_dev_core import __version__
+
+HOOKS = ('none', 'cprofile', 'tracemalloc')
+TOP = 30    # entries of the hook reports
+
+clock = getattr(time, 'perf_counter', time.time)
+
+
+class Profiler(object):
+    """ stage timer of one effect run
+        - target: '' (off), 'stderr' or a file name; the environment
+          (GEARS_DEV_PROFILE, GEARS_DEV_PROFILE_HOOK) is used if not given.
+        - hook: one of HOOKS
+        - raises ValueError for an unknown hook, ImportError if the
+          tracemalloc hook is not available (Python 2.7); finish() raises
+          IOError if the file cannot be written
+    """
+    def __init__(self, target=None, hook=None):
+        if not target:
+            target = os.environ.get('GEARS_DEV_PROFILE', '')
+        if not hook or hook == 'none':
+            hook = os.environ.get('GEARS_DEV_PROFILE_HOOK', 'none')
+        if hook not in HOOKS:
+            raise ValueError('unknown profile hook %r, use one of %s' % (hook, ', '.join(HOOKS)))
+        self.target = target
+        self.enabled = bool(target)
+        self.hook = hook if self.enabled else 'none'
+        if self.hook == 'tracemalloc':
+            try:
+                __import__('tracemalloc')
+            except ImportError:
+                raise ImportError('the tracemalloc profile hook needs Python 3.4 or later')
+        self.stages = {}
+        self.order = []
+        self.nested = []    # time of the inner stages of the running ones
+        self.profile = None
+        self.started = None
+
+    def start(self):
+        if not self.enabled:
+            return
+        if self.hook == 'cprofile':
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        elif self.hook == 'tracemalloc':
+            import tracemalloc
+            tracemalloc.start()
+        self.started = clock()
+
+    @contextmanager
+    def stage(self, name, **counts):
+        """ with profiler.stage('outline', points=n): ...
+            - adds the wall time of the block to the stage name, without the
+              time of the stages nested in it
+        """
+        if not self.enabled:
+            yield
+            return
+        self.nested.append(0.0)
+        start = clock()
+        try:
+            yield
+        finally:
+            elapsed = clock() - start
+            inner = self.nested.pop()
+            if self.nested:
+                self.nested[-1] += elapsed
+            self.add(name, ms=1000 * (elapsed - inner), calls=1, **counts)
+
+    def add(self, name, **counts):
+        " add counts (points, bytes, ...) to the stage name "
+        if not self.enabled:
+            return
+        s = self.stages.get(name)
+        if s is None:
+            s = self.stages[name] = {}
+            self.order.append(name)
+        for (k, v) in counts.items():
+            s[k] = s.get(k, 0) + v
+
+    def report(self):
+        " the report as a dict (json compatible) "
+        total = 1000 * (clock() - self.started) if self.started is not None else None
+        report = {'version': __version__, 'python': '%d.%d.%d' % sys.version_info[:3],
+                  'argv': sys.argv[1:], 'total_ms': total,
+                  'stages': [dict(self.stages[name], stage=name) for name in self.order]}
+        if self.profile is not None:
+            self.profile.disable()
+            report['cprofile'] = cprofile_top(self.profile)
+        elif self.hook == 'tracemalloc':
+            report['tracemalloc'] = tracemalloc_top()
+        return report
+
+    def finish(self):
+        " write the report (if enabled) "
+        if not self.enabled:
+            return
+        text = json.dumps(self.report(), indent=1, sort_keys=True)
+        if self.target == 'stderr':
+            print(text, file=sys.stderr)
+        else:
+            with open(self.target, 'w') as f:
+                f.write(text + '\n')
+
+
+def cprofile_top(profile):
+    " [{function, calls, tottime_ms, cumtime_ms}] of the TOP functions by cumulative time "
+    import pstats
+    stats = pstats.Stats(profile).stats
+    rows = []
+    for ((filename, line, name), (cc, nc, tt, ct, callers)) in stats.items():
+        rows.append({'function': '%s:%d(%s)' % (os.path.basename(filename), line, name),
+                     'calls': nc, 'tottime_ms': 1000 * tt, 'cumtime_ms': 1000 * ct})
+    rows.sort(key=lambda r: -r['cumtime_ms'])
+    return rows[:TOP]
+
+def tracemalloc_top():
+    " {peak_bytes, current_bytes, top: [{line, bytes, count}]} and stop tracing "
+    import tracemalloc
+    (current, peak) = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    top = [{'line': '%s:%d' % (os.path.basename(s.traceback[0].filename), s.traceback[0].lineno),
+            'bytes': s.size, 'count': s.count}
+           for s in snapshot.statistics('lineno')[:TOP]]
+    return {'peak_bytes': peak, 'current_bytes': current, 'top': top}
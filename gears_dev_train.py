@@ -0,0 +1,358 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Copyright (C) 2017 David Grimberg (sentinel @ bardicgrove.org)
+
+This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+Gear train search: spur gear trains (simple or compound, up to a few
+stages) for a target ratio, with limits on tooth counts, center distance,
+stage ratio and undercut. The ratio of a train is the product of
+driven / driver teeth of its stages (input speed / output speed).
+
+How it is fast:
+- the products of the tooth counts of 1, 2, 3 ... stages are tabulated
+  once, a train is a pair of products (driven, driver). For every driver
+  product, the driven products in the tolerance window are found by
+  bisection in the sorted table.
+- the best rational approximations of the target (continued fraction
+  convergents and semiconvergents, i.e. a Stern-Brocot walk) are tried
+  first. They fill the list of the best solutions early, so the window
+  shrinks to the error of the worst kept solution and most of the table
+  is skipped.
+- trains that rank below the worst kept one (equal error but more stages
+  or teeth) are not paired at all, and once all kept solutions are exact
+  no train with more stages is looked at: a ratio with exact one-stage
+  trains (2, 1/3) is done in milliseconds.
+
+The solutions are ranked by error, number of stages and total teeth.
+A solution can be written as parameter sets for gears_dev_batch.py and as
+one SVG with all gears meshing at their center distances.
+
+usage: python gears_dev_train.py [options] RATIO      (e.g. 7.5 or 355/113)
+'''
+
+from __future__ import print_function
+import sys, json, time, heapq, itertools, optparse
+from bisect import bisect_left
+from math import radians, cos, sin
+
+from gears_dev_core import (unit_factor, calc_circular_pitch, gear_calculations, have_undercut,
+                            mesh_rotation)
+
+
+def parse_ratio(text):
+    " '7.5' or '355/113' "
+    if '/' in text:
+        (p, q) = text.split('/', 1)
+        return float(p) / float(q)
+    return float(text)
+
+def usable_teeth(min_teeth, max_teeth, pressure_angle=20.0, allow_undercut=False):
+    " the tooth counts in [min_teeth, max_teeth], without those that have undercut "
+    return [n for n in range(max(3, min_teeth), max_teeth + 1)
+            if allow_undercut or not have_undercut(n, pressure_angle)]
+
+def best_approximations(x, max_num, max_den):
+    """ yield the fractions (p, q) of the continued fraction of x > 0:
+        convergents and semiconvergents, with increasing q.
+        Every best rational approximation of x is among them.
+    """
+    (h0, k0, h1, k1) = (0, 1, 1, 0)     # convergents n-2 and n-1
+    rest = x
+    while True:
+        a = int(rest)
+        for m in range(1 if k0 or h0 else a, a + 1):
+            (p, q) = (h0 + m * h1, k0 + m * k1)
+            if p > max_num or q > max_den:
+                return
+            if q:
+                yield (p, q)
+        (h0, k0, h1, k1) = (h1, k1, a * h1 + h0, a * k1 + k0)
+        frac = rest - a
+        if frac < 1e-12 or abs(float(h1) / k1 - x) <= 1e-15 * x:
+            return
+        rest = 1.0 / frac
+
+def product_table(teeth, stages, per_value=8):
+    """ {stages: {product: [sorted tuples of tooth counts]}} for 1 .. stages
+        - at most per_value factorizations are kept per product
+    """
+    tables = {1: dict([(n, [(n,)]) for n in teeth])}
+    for k in range(2, stages + 1):
+        table = {}
+        for (value, factors) in tables[k - 1].items():
+            for f in factors:
+                for n in teeth:
+                    if n < f[-1]:
+                        continue
+                    entry = table.setdefault(value * n, [])
+                    if len(entry) < per_value:
+                        entry.append(f + (n,))
+        tables[k] = table
+    return tables
+
+
+def gear_set_spec(stages):
+    """ the train as gear set of the effect (--gear-set): each driven gear
+        meshes with its driver, the next driver is on the same shaft
+    """
+    entries = []
+    for (a, b) in stages:
+        if entries:
+            entries.append('%d=%d' % (a, len(entries)))
+        else:
+            entries.append('%d' % a)
+        entries.append('%d' % b)
+    return '; '.join(entries)
+
+
+class TrainSearch(object):
+    """ search spur gear trains for a ratio
+        - module (or CP/DP) as in the dialog: dimension, system, units;
+          center distances are in units.
+        - max_center, max_stage_ratio: 0 or None is no limit.
+    """
+    def __init__(self, min_teeth=0, max_teeth=100, max_stages=3, pressure_angle=20.0,
+                 dimension=1.0, system='MM', units='mm', max_center=None, max_stage_ratio=None,
+                 allow_undercut=False):
+        self.teeth = usable_teeth(min_teeth, max_teeth, pressure_angle, allow_undercut)
+        if not self.teeth:
+            raise ValueError("no usable tooth count between %d and %d" % (min_teeth, max_teeth))
+        self.max_stages = max_stages
+        self.pressure_angle = pressure_angle
+        self.dimension, self.system, self.units = dimension, system, units
+        self.max_center = max_center or None
+        self.max_stage_ratio = max_stage_ratio or None
+        uf = unit_factor(units)
+        pitch = calc_circular_pitch(dimension, system, uf)
+        self.pitch_radius = dict([(n, gear_calculations(n, pitch, pressure_angle)[0] / uf) for n in self.teeth])
+        self.tables = product_table(self.teeth, max_stages)
+        self.values = dict([(k, sorted(t)) for (k, t) in self.tables.items()])
+
+    def pairing(self, drivers, driven):
+        """ the stages [(driver, driven)] for two tooth count tuples, or None
+            - of all pairings within the limits, the one with the smallest
+              largest center distance.
+        """
+        best = None
+        for perm in set(itertools.permutations(driven)):
+            stages = list(zip(drivers, perm))
+            worst = 0.0
+            for (a, b) in stages:
+                if a == b:
+                    break       # a stage 1:1 is no stage
+                if self.max_stage_ratio and not (1.0 / self.max_stage_ratio <= float(b) / a <= self.max_stage_ratio):
+                    break
+                c = self.pitch_radius[a] + self.pitch_radius[b]
+                if self.max_center and c > self.max_center:
+                    break
+                worst = max(worst, c)
+            else:
+                if best is None or worst < best[0]:
+                    best = (worst, stages)
+        return best and best[1]
+
+    def search(self, target, tolerance=1e-3, limit=10):
+        """ the best trains for target, at most limit, within tolerance
+            (relative error; None: the closest trains, whatever their error)
+            - returns solution dicts, see solution()
+        """
+        heap = []       # (-error, -stages, -teeth, key, stages): the worst kept solution first
+        seen = set()
+
+        def bound():
+            if len(heap) >= limit:
+                worst = -heap[0][0]
+                return worst if tolerance is None else min(tolerance, worst)
+            return tolerance if tolerance is not None else float('inf')
+
+        def consider(k, driven_value, driver_value):
+            # rounded: float noise must not rank equal ratios differently
+            error = round(abs(float(driven_value) / driver_value / target - 1.0), 12)
+            if error > bound():
+                return
+            full = len(heap) >= limit
+            if full and error == -heap[0][0] and k > -heap[0][1]:
+                return      # as close as the worst kept one, with more stages
+            for drivers in self.tables[k][driver_value]:
+                for driven in self.tables[k][driven_value]:
+                    if full and (-error, -k, -sum(drivers + driven)) < heap[0][:3]:
+                        continue    # ranked below the worst kept one, whatever the pairing
+                    stages = self.pairing(drivers, driven)
+                    if stages is None:
+                        continue
+                    key = tuple(sorted(stages))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    item = (-error, -k, -sum(drivers + driven), key, stages)
+                    if len(heap) < limit:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+                    full = len(heap) >= limit
+
+        for k in range(1, self.max_stages + 1):
+            if len(heap) >= limit and heap[0][0] == 0 and -heap[0][1] < k:
+                break       # all kept trains are exact and have fewer stages than k
+            table = self.tables[k]
+            values = self.values[k]
+            top = values[-1]
+            # the best rational approximations first, they tighten the bound
+            for (p, q) in best_approximations(target, top, top):
+                for m in range(1, top // max(p, q) + 1):
+                    if p * m in table and q * m in table:
+                        consider(k, p * m, q * m)
+                    if m > 256:
+                        break
+            # then every driver product, with the driven products in the window
+            for q in values:
+                ideal = q * target
+                i = bisect_left(values, ideal)
+                j = i
+                while j < len(values) and values[j] <= ideal * (1 + bound() + 1e-12):
+                    consider(k, values[j], q)
+                    j += 1
+                j = i - 1
+                while j >= 0 and values[j] >= ideal * (1 - bound() - 1e-12):
+                    consider(k, values[j], q)
+                    j -= 1
+        return [self.solution(target, item[4]) for item in sorted(heap, reverse=True)]
+
+    def solution(self, target, stages):
+        ratio = 1.0
+        for (a, b) in stages:
+            ratio *= float(b) / a
+        return {'stages': stages, 'ratio': ratio, 'error': round(ratio / target - 1.0, 12),
+                'teeth': sum([a + b for (a, b) in stages]),
+                'centers': [self.pitch_radius[a] + self.pitch_radius[b] for (a, b) in stages],
+                'gear_set': gear_set_spec(stages)}
+
+    def layout(self, solution, direction=0.0, name='train'):
+        """ the gears of a solution, meshing at their center distances
+            - shaft 0 is at (0, 0), the shafts follow each other in direction (deg)
+            - the driven gear of a stage shares its shaft with the next driver
+            - returns dicts with the gear parameters (for gears_dev_batch.py)
+              and the position: x, y (units, y down as in SVG) and rotation (deg)
+        """
+        gears = []
+        (x, y) = (0.0, 0.0)
+        for (i, (a, b)) in enumerate(solution['stages']):
+            center = solution['centers'][i]
+            driver = {'teeth': a, 'x': x, 'y': y, 'rotation': 0.0}
+            x += center * cos(radians(direction))
+            y += center * sin(radians(direction))
+            driven = {'teeth': b, 'x': x, 'y': y, 'rotation': mesh_rotation(a, 0.0, b, direction)}
+            for (gear, role) in ((driver, 'driver'), (driven, 'driven')):
+                gear.update({'name': '%s-s%d-%s%d' % (name, i + 1, role, gear['teeth']),
+                             'system': self.system, 'dimension': self.dimension,
+                             'units': self.units, 'angle': self.pressure_angle})
+                gears.append(gear)
+        return gears
+
+
+def write_layout_svg(out, gears):
+    " one SVG with all gears of layout() at their positions "
+    from gears_dev_batch import normalize_params, compute_gear, write_gear_path, path_writer, PATH_STYLE
+    from gears_dev_export import (write_svg_header, write_svg_footer, write_svg_group_start,
+                                  write_svg_group_end, write_svg_path_start, write_svg_path_end)
+    computed = []
+    for gear in gears:
+        params = dict([(k, v) for (k, v) in gear.items() if k not in ('x', 'y', 'rotation')])
+        computed.append((gear, compute_gear(normalize_params(params))))
+    uf = computed[0][1]['unit_factor']
+    r = [c['outer_radius'] for (g, c) in computed]
+    llx = min([g['x'] * uf - ri for ((g, c), ri) in zip(computed, r)])
+    lly = min([g['y'] * uf - ri for ((g, c), ri) in zip(computed, r)])
+    urx = max([g['x'] * uf + ri for ((g, c), ri) in zip(computed, r)])
+    ury = max([g['y'] * uf + ri for ((g, c), ri) in zip(computed, r)])
+    write_svg_header(out, (llx, lly, urx, ury), gears[0]['units'], uf, margin=computed[0][1]['pitch'])
+    for (gear, c) in computed:
+        write_svg_group_start(out, {'inkscape:label': gear['name'],
+                                    'transform': 'translate(%.4f,%.4f) rotate(%.4f)' %
+                                                 (gear['x'] * uf, gear['y'] * uf, gear['rotation']),
+                                    'info': 'N:%s; Pitch:%s; Pressure Angle: %s' % (c['teeth'], c['pitch'], c['angle'])})
+        write_svg_path_start(out, PATH_STYLE)
+        writer = path_writer(c, out)
+        write_gear_path(writer, c)
+        writer.flush()
+        write_svg_path_end(out)
+        write_svg_group_end(out)
+    write_svg_footer(out)
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options] RATIO  (driven/driver, e.g. 7.5 or 355/113)')
+    parser.add_option('-t', '--tolerance', type='float', default=1e-3,
+                      help="Allowed relative error (default %default). 0: exact, -1: closest trains")
+    parser.add_option('-s', '--stages', type='int', default=3, help="Maximum number of stages (default %default)")
+    parser.add_option('--min-teeth', type='int', default=0,
+                      help="Smallest tooth count (default: smallest without undercut)")
+    parser.add_option('--max-teeth', type='int', default=100, help="Largest tooth count (default %default)")
+    parser.add_option('--max-center', type='float', default=0.0, help="Largest center distance in units (0: no limit)")
+    parser.add_option('--max-stage-ratio', type='float', default=0.0, help="Largest ratio of one stage (0: no limit)")
+    parser.add_option('--allow-undercut', action='store_true', default=False, help="Use tooth counts with undercut")
+    parser.add_option('-a', '--angle', type='float', default=20.0, help="Pressure angle (default %default)")
+    parser.add_option('--system', default='MM', help="CP, DP or MM (default %default)")
+    parser.add_option('--dimension', type='float', default=1.0, help="Circular pitch, diametral pitch or module")
+    parser.add_option('--units', default='mm', help="Units (default %default)")
+    parser.add_option('-n', '--limit', type='int', default=10, help="Number of solutions (default %default)")
+    parser.add_option('--pick', type='int', default=1, help="Solution for --params and --svg (default %default)")
+    parser.add_option('-p', '--params', default=None, help="Write the gears of the solution as JSONL parameter sets")
+    parser.add_option('--svg', default=None, help="Write the meshing gears of the solution as SVG")
+    parser.add_option('--json', action='store_true', default=False, help="Print the solutions as JSON")
+    (opts, args) = parser.parse_args(argv)
+    if len(args) != 1:
+        parser.error('one RATIO expected')
+    try:
+        target = parse_ratio(args[0])
+        if target <= 0:
+            raise ValueError('the ratio must be positive')
+        start = time.time()
+        search = TrainSearch(opts.min_teeth, opts.max_teeth, opts.stages, opts.angle, opts.dimension,
+                             opts.system, opts.units, opts.max_center, opts.max_stage_ratio, opts.allow_undercut)
+        tolerance = None if opts.tolerance < 0 else opts.tolerance
+        solutions = search.search(target, tolerance, opts.limit)
+        elapsed = time.time() - start
+    except (ValueError, ZeroDivisionError) as e:
+        parser.error(str(e))
+
+    if opts.json:
+        json.dump(solutions, sys.stdout, indent=1, sort_keys=True)
+        sys.stdout.write('\n')
+    else:
+        for (i, s) in enumerate(solutions, 1):
+            print('%2d  %-40s ratio %.8g  error %+.2e  teeth %d  centers %s %s' %
+                  (i, '  '.join(['%d:%d' % st for st in s['stages']]), s['ratio'], s['error'], s['teeth'],
+                   ', '.join(['%.4g' % c for c in s['centers']]), opts.units))
+    print('%d solutions in %.1f ms' % (len(solutions), elapsed * 1000), file=sys.stderr)
+
+    if (opts.params or opts.svg) and solutions:
+        if not 1 <= opts.pick <= len(solutions):
+            parser.error('--pick must be between 1 and %d' % len(solutions))
+        gears = search.layout(solutions[opts.pick - 1])
+        if opts.params:
+            with open(opts.params, 'w') as f:
+                for gear in gears:
+                    params = dict([(k, v) for (k, v) in gear.items() if k not in ('x', 'y', 'rotation')])
+                    f.write(json.dumps(params, sort_keys=True) + '\n')
+        if opts.svg:
+            with open(opts.svg, 'w') as f:
+                write_layout_svg(f, gears)
+    return 0 if solutions else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
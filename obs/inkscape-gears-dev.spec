@@ -72,6 +72,10 @@ Authors
 install -d -m 755            %{buildroot}%{_datadir}/inkscape/extensions/
 install -m 644 gears-dev.inx %{buildroot}%{_datadir}/inkscape/extensions/
 install -m 755 gears-dev.py  %{buildroot}%{_datadir}/inkscape/extensions/
+install -m 644 gears_dev_core.py %{buildroot}%{_datadir}/inkscape/extensions/
+install -m 644 gears_dev_cache.py %{buildroot}%{_datadir}/inkscape/extensions/
+install -m 644 gears_dev_mesh.py %{buildroot}%{_datadir}/inkscape/extensions/
+install -m 644 gears_dev_profile.py %{buildroot}%{_datadir}/inkscape/extensions/
 
 %files
 %defattr(-,root,root,-)
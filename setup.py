@@ -12,7 +12,7 @@ from setuptools.command.test import test as TestCommand
 inkex_dir='/usr/share/inkscape/extensions'
 sys.path.append(inkex_dir)        # gears-dev wants to import inkex.py
 import importlib	
-g = importlib.import_module('gears-dev')        # import 'gears-dev' as g
+g = importlib.import_module('gears_dev_core')   # the version lives in the geometry core, no inkex needed
 
 ## Unfinished.
 
@@ -35,7 +35,9 @@ setup(name='inkscape-gears-dev',
       author="Jürgen Weigert, et.al.",
       author_email="juewei@fabmail.org",
       url='https://github.com/jnweiger/inkscape-gears-dev',
-      scripts=['gears-dev.py', 'gears-dev.inx', 'README.md'],
+      scripts=['gears-dev.py', 'gears-dev.inx', 'README.md',
+               'gears_dev_core.py', 'gears_dev_cache.py', 'gears_dev_mesh.py', 'gears_dev_export.py', 'gears_dev_batch.py',
+               'gears_dev_nest.py', 'gears_dev_train.py', 'gears_dev_profile.py'],
       license='GPL-2.0',
       classifiers=[
           'License :: OSI Approved :: GNU General Public License v2 (GPLv2)',
@@ -0,0 +1,173 @@
+''' the geometry of the original extension (gears-dev.py before gears_dev_core.py),
+    kept unchanged as the reference of test_engines.py and test_bbox.py
+'''
+
+from math import pi, cos, sin, tan, radians, acos, sqrt
+two_pi = 2 * pi
+
+def linspace(a,b,n):
+    """ return list of linear interp of a to b in n steps
+        - if a and b are ints - you'll get an int result.
+        - n must be an integer
+    """
+    return [a+x*(b-a)/(n-1) for x in range(0,n)]
+
+def involute_intersect_angle(Rb, R):
+    " "
+    Rb, R = float(Rb), float(R)
+    return (sqrt(R**2 - Rb**2) / (Rb)) - (acos(Rb / R))
+
+def point_on_circle(radius, angle):
+    " return xy coord of the point at distance radius from origin at angle "
+    x = radius * cos(angle)
+    y = radius * sin(angle)
+    return (x, y)
+
+def points_to_svgd(p):
+    " convert list of points into a closed SVG path list"
+    f = p[0]
+    p = p[1:]
+    svgd = 'M%.4f,%.4f' % f
+    for x in p:
+        svgd += 'L%.4f,%.4f' % x
+    svgd += 'z'
+    return svgd
+
+## gather all basic gear calculations in one place
+def gear_calculations(num_teeth, circular_pitch, pressure_angle, clearance=0, ring_gear=False, profile_shift=0.):
+    """ Put base calcs for spur/ring gears in one place.
+        - negative profile shifting helps against undercut. 
+    """
+    diametral_pitch = pi / circular_pitch
+    pitch_diameter = num_teeth / diametral_pitch
+    pitch_radius = pitch_diameter / 2.0
+    addendum = 1 / diametral_pitch
+    #dedendum = 1.157 / diametral_pitch # auto calc clearance
+    dedendum = addendum
+    dedendum *= 1+profile_shift
+    addendum *= 1-profile_shift
+    if ring_gear:
+        addendum = addendum + clearance # our method
+    else:
+        dedendum = dedendum + clearance # our method
+    #
+    #
+    base_radius = pitch_diameter * cos(radians(pressure_angle)) / 2.0
+    outer_radius = pitch_radius + addendum
+    root_radius =  pitch_radius - dedendum
+    # Tooth thickness: Tooth width along pitch circle.
+    tooth_thickness  = ( pi * pitch_diameter ) / ( 2.0 * num_teeth )
+    # we don't use these
+    working_depth = 2 / diametral_pitch
+    whole_depth = 2.157 / diametral_pitch
+    #outside_diameter = (num_teeth + 2) / diametral_pitch
+    #
+    return (pitch_radius, base_radius,
+            addendum, dedendum, outer_radius, root_radius,
+            tooth_thickness
+            )
+
+ 
+def generate_rack_points(tooth_count, pitch, addendum, pressure_angle,
+                       base_height, tab_length, clearance=0, draw_guides=False):
+        """ Return path (suitable for svg) of the Rack gear.
+            - rack gear uses straight sides
+                - involute on a circle of infinite radius is a simple linear ramp
+            - the meshing circle touches at y = 0, 
+            - the highest elevation of the teeth is at y = +addendum
+            - the lowest elevation of the teeth is at y = -addendum-clearance
+            - the base_height extends downwards from the lowest elevation.
+            - we generate this middle tooth exactly centered on the y=0 line.
+              (one extra tooth on the right hand side, if number of teeth is even)
+        """
+        spacing = 0.5 * pitch # rolling one pitch distance on the spur gear pitch_diameter.
+        # roughly center rack in drawing, exact position is so that it meshes
+        # nicely with the spur gear.
+        # -0.5*spacing has a gap in the center.
+        # +0.5*spacing has a tooth in the center.
+        fudge = +0.5 * spacing
+
+        tas  = tan(radians(pressure_angle)) * addendum
+        tasc = tan(radians(pressure_angle)) * (addendum+clearance)
+        base_top = addendum+clearance
+        base_bot = addendum+clearance+base_height
+
+        x_lhs = -pitch * int(0.5*tooth_count-.5) - spacing - tab_length - tasc + fudge
+        #inkex.debug("angle=%s spacing=%s"%(pressure_angle, spacing))
+        # Start with base tab on LHS
+        points = [] # make list of points
+        points.append((x_lhs, base_bot))
+        points.append((x_lhs, base_top))
+        x = x_lhs + tab_length+tasc
+
+        # An involute on a circle of infinite radius is a simple linear ramp.
+        # We need to add curve at bottom and use clearance.
+        for i in range(tooth_count):
+            # move along path, generating the next 'tooth'
+            # pitch line is at y=0. the left edge hits the pitch line at x
+            points.append((x-tasc, base_top))
+            points.append((x+tas, -addendum))
+            points.append((x+spacing-tas, -addendum))
+            points.append((x+spacing+tasc, base_top)) 
+            x += pitch
+        x -= spacing # remove last adjustment
+        # add base on RHS
+        x_rhs = x+tasc+tab_length
+        points.append((x_rhs, base_top))
+        points.append((x_rhs, base_bot))
+        # We don't close the path here. Caller does it.
+        # points.append((x_lhs, base_bot))
+
+        # Draw line representing the pitch circle of infinite diameter
+        guide_path = None
+        if draw_guides:
+            p = []
+            p.append( (x_lhs + 0.5 * tab_length, 0) )
+            p.append( (x_rhs - 0.5 * tab_length, 0) )
+            guide_path = points_to_svgd(p)
+        # return points ready for use in an SVG 'path'
+        return (points, guide_path)
+    
+
+def generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, accuracy_involute, accuracy_circular):
+    """ given a set of core gear params
+        - generate the svg path for the gear
+    """
+    half_thick_angle = two_pi / (4.0 * teeth ) #?? = pi / (2.0 * teeth)
+    pitch_to_base_angle  = involute_intersect_angle( base_radius, pitch_radius )
+    pitch_to_outer_angle = involute_intersect_angle( base_radius, outer_radius ) - pitch_to_base_angle
+
+    start_involute_radius = max(base_radius, root_radius)
+    radii = linspace(start_involute_radius, outer_radius, accuracy_involute)
+    angles = [involute_intersect_angle(base_radius, r) for r in radii]
+
+    centers = [(x * two_pi / float( teeth) ) for x in range( teeth ) ]
+    points = []
+
+    for c in centers:
+        # Angles
+        pitch1 = c - half_thick_angle
+        base1  = pitch1 - pitch_to_base_angle
+        offsetangles1 = [ base1 + x for x in angles]
+        points1 = [ point_on_circle( radii[i], offsetangles1[i]) for i in range(0,len(radii)) ]
+
+        pitch2 = c + half_thick_angle
+        base2  = pitch2 + pitch_to_base_angle
+        offsetangles2 = [ base2 - x for x in angles] 
+        points2 = [ point_on_circle( radii[i], offsetangles2[i]) for i in range(0,len(radii)) ]
+
+        points_on_outer_radius = [ point_on_circle(outer_radius, x) for x in linspace(offsetangles1[-1], offsetangles2[-1], accuracy_circular) ]
+
+        if root_radius > base_radius:
+            pitch_to_root_angle = pitch_to_base_angle - involute_intersect_angle(base_radius, root_radius )
+            root1 = pitch1 - pitch_to_root_angle
+            root2 = pitch2 + pitch_to_root_angle
+            points_on_root = [point_on_circle (root_radius, x) for x in linspace(root2, root1+(two_pi/float(teeth)), accuracy_circular) ]
+            p_tmp = points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root[1:-1] # [::-1] reverses list; [1:-1] removes first and last element
+        else:
+            points_on_root = [point_on_circle (root_radius, x) for x in linspace(base2, base1+(two_pi/float(teeth)), accuracy_circular) ]
+            p_tmp = points1 + points_on_outer_radius[1:-1] + points2[::-1] + points_on_root # [::-1] reverses list
+
+        points.extend( p_tmp )
+    return (points)
+
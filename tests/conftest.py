@@ -0,0 +1,3 @@
+# the modules of the extension are in the directory above
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
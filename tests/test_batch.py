@@ -0,0 +1,42 @@
+''' file names and determinism of the batch generation (gears_dev_batch.py) '''
+
+import os
+
+import gears_dev_batch
+
+
+def write_csv(path, rows):
+    with open(path, 'w') as f:
+        f.write('name,teeth,angle\n')
+        for row in rows:
+            f.write('%s,%s,%s\n' % row)
+
+def run(tmp_path, csv, *options):
+    outdir = str(tmp_path / ('out%d' % len(os.listdir(str(tmp_path)))))
+    status = gears_dev_batch.main(['-q', '--no-cache', '-o', outdir] + list(options) + [csv])
+    files = {}
+    for name in os.listdir(outdir):
+        with open(os.path.join(outdir, name)) as f:
+            files[name] = f.read()
+    return (status, files)
+
+def test_sweep_rows(tmp_path):
+    # unnamed rows are told apart by their number, every gear gets a file
+    csv = str(tmp_path / 'gears.csv')
+    write_csv(csv, [('', 10 + i, 20) for i in range(5)] + [('pinion', 12, 20)])
+    (status, files) = run(tmp_path, csv, '-s', 'teeth=20:21', '-s', 'angle=14.5,20')
+    assert status == 0
+    assert len(files) == 6 * 4
+    assert 'gear-0003_teeth20_angle14.5.svg' in files and 'pinion_teeth21_angle20.svg' in files
+    # the same files with a pool, collected as they complete
+    (status, pooled) = run(tmp_path, csv, '-s', 'teeth=20:21', '-s', 'angle=14.5,20', '-j', '4', '-u', '-c', '1')
+    assert status == 0
+    assert pooled == files
+
+def test_duplicate_names(tmp_path):
+    csv = str(tmp_path / 'gears.csv')
+    write_csv(csv, [('wheel', 20, 20), ('Wheel', 30, 20), ('', 40, 20)])
+    (status, files) = run(tmp_path, csv)
+    assert status == 1
+    assert sorted(files) == ['gear-0003.svg', 'wheel.svg']
+    assert 'Gear20' in files['wheel.svg']
@@ -0,0 +1,38 @@
+''' the bounding boxes from the gear parameters against those of the points '''
+
+import pytest
+
+from gears_dev_core import (gear_calculations, generate_spur_points, generate_rack_points, spur_bbox, rack_bbox,
+                            points_to_bbox, GearGeometry)
+
+
+@pytest.mark.parametrize('ring', [False, True])
+@pytest.mark.parametrize('shift', [0., -0.3, 0.3])
+def test_spur_bbox(ring, shift):
+    for teeth in range(3, 130):
+        (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth) = \
+            gear_calculations(teeth, 10.0, 20.0, 0.5, ring, shift)
+        bbox = spur_bbox(teeth, base_radius, pitch_radius, outer_radius, root_radius)
+        if bbox is None:
+            assert teeth < 5
+            continue
+        # the points lie inside, on the tip arcs up to their chords
+        p = points_to_bbox(generate_spur_points(teeth, base_radius, pitch_radius, outer_radius, root_radius, 8, 40))
+        for (outside, inside) in [(p[0], bbox[0]), (p[1], bbox[1]), (bbox[2], p[2]), (bbox[3], p[3])]:
+            assert outside - inside >= -1e-9
+            assert outside - inside < 1e-4 * outer_radius, teeth
+
+def test_gear_bbox_few_teeth():
+    # spur_bbox() does not cover 3 teeth: GearGeometry.bbox() takes the points
+    gear = GearGeometry(3, 10.0, 20.0)
+    assert spur_bbox(3, gear.base_radius, gear.pitch_radius, gear.outer_radius, gear.root_radius) is None
+    gear.generate_outline(8, 40)
+    assert gear.bbox() == points_to_bbox(gear.outline)
+
+@pytest.mark.parametrize('rack', [(1, 10.0, 3.183, 20.0, 20.0, 10.0, 0),
+                                  (7, 10.0, 3.183, 20.0, 20.0, 10.0, 0),
+                                  (10, 10.0, 3.183, 14.5, 5.0, 2.0, 0.5),
+                                  (24, 3.0, 0.955, 25.0, 1.0, 0.5, 0.2)])
+def test_rack_bbox(rack):
+    (points, guide) = generate_rack_points(*rack)
+    assert max([abs(u - v) for (u, v) in zip(rack_bbox(*rack), points_to_bbox(points))]) < 1e-9
@@ -0,0 +1,32 @@
+''' the on-disk geometry cache (gears_dev_cache.py) '''
+
+import gears_dev_cache
+from gears_dev_cache import GeometryCache, cached_stage, cached_gear_outline
+from gears_dev_core import PathWriter
+
+
+def test_key_includes_geometry_format(monkeypatch, tmp_path):
+    cache = GeometryCache(str(tmp_path))
+    key = cache.key('outline', (24, 9.42, 20.0))
+    monkeypatch.setattr(gears_dev_cache, 'GEOMETRY_FORMAT', gears_dev_cache.GEOMETRY_FORMAT + 1)
+    assert cache.key('outline', (24, 9.42, 20.0)) != key
+
+def test_stage_computed_once(tmp_path):
+    cache = GeometryCache(str(tmp_path))
+    calls = []
+    compute = lambda: calls.append(1) or 'd'
+    assert cached_stage(cache, 'gear_path', (24, 1.0), compute) == 'd'
+    assert cached_stage(cache, 'gear_path', (24, 1.0), compute) == 'd'
+    assert cached_stage(cache, 'gear_path', (25, 1.0), compute) == 'd'
+    assert len(calls) == 2
+
+def test_outline_same_as_uncached(tmp_path):
+    cache = GeometryCache(str(tmp_path))
+    spec = (24, 9.42, 20.0, 0.0, False, 0.0)
+    paths = []
+    for c in (None, cache, cache):
+        writer = PathWriter()
+        cached_gear_outline(c, writer, spec, (12, 3, None))
+        paths.append(writer.getvalue())
+    assert paths[0] == paths[1] == paths[2]
+    assert cache.hits == 1
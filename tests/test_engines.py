@@ -0,0 +1,63 @@
+''' every point engine of gears_dev_core.py against the generator of the original extension '''
+
+import pytest
+
+import baseline_gears
+import gears_dev_core
+from gears_dev_core import (gear_calculations, generate_spur_points, generate_spur_flat, generate_spur_array,
+                            iter_spur_points, generate_rack_points, point_pairs)
+
+# (teeth, circular_pitch, pressure_angle, clearance, ring_gear, profile_shift, accuracy_involute, accuracy_circular)
+GEARS = [
+    (24, 10.0, 20.0, 0, False, 0., 5, 3),          # root circle inside the base circle
+    (100, 10.0, 20.0, 1.5, False, 0., 12, 6),      # root circle outside the base circle
+    (7, 10.0, 20.0, 0, False, 0., 20, 20),
+    (3, 5.0, 25.0, 0.5, False, 0., 6, 6),
+    (13, 8.466, 14.5, 0.5, False, -0.3, 8, 4),
+    (40, 10.0, 20.0, 0, True, 0., 6, 3),           # ring gear
+    (1200, 3.0, 20.0, 0, False, 0., 3, 2),
+]
+
+def engines():
+    yield ('points', lambda *args: generate_spur_points(*args))
+    yield ('flat', lambda *args: generate_spur_flat(*args))
+    yield ('iter', lambda *args: iter_spur_points(*args))
+    if gears_dev_core.load_numpy() is not None:
+        yield ('array', lambda *args: generate_spur_array(*args))
+
+def pairs(points):
+    return [(float(x), float(y)) for (x, y) in point_pairs(points)]
+
+def reference(gear):
+    (teeth, cp, angle, clearance, ring, shift, acc_inv, acc_circ) = gear
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth) = \
+        baseline_gears.gear_calculations(teeth, cp, angle, clearance, ring, shift)
+    args = (teeth, base_radius, pitch_radius, outer_radius, root_radius, acc_inv, acc_circ)
+    return (args, baseline_gears.generate_spur_points(*args))
+
+@pytest.mark.parametrize('gear', GEARS)
+def test_gear_calculations(gear):
+    assert gear_calculations(*gear[:6]) == baseline_gears.gear_calculations(*gear[:6])
+
+@pytest.mark.parametrize('gear', GEARS)
+def test_engines_exact(gear):
+    # every tooth computed: the same floats as the original
+    (args, expected) = reference(gear)
+    for (name, engine) in engines():
+        assert pairs(engine(*args)) == expected, name
+
+@pytest.mark.parametrize('gear', GEARS)
+def test_engines_template(gear):
+    # one tooth rotated: the same points up to rounding
+    (args, expected) = reference(gear)
+    tolerance = 1e-12 * args[3]
+    for (name, engine) in engines():
+        points = pairs(engine(*args + (True,)))
+        assert len(points) == len(expected), name
+        error = max([max(abs(p[0] - q[0]), abs(p[1] - q[1])) for (p, q) in zip(points, expected)])
+        assert error < tolerance, name
+
+@pytest.mark.parametrize('rack', [(7, 10.0, 3.183, 20.0, 20.0, 10.0, 0),
+                                  (10, 10.0, 3.183, 14.5, 5.0, 2.0, 0.5)])
+def test_rack_points(rack):
+    assert generate_rack_points(*rack, draw_guides=True) == baseline_gears.generate_rack_points(*rack, draw_guides=True)
@@ -0,0 +1,70 @@
+''' the gears placed by gear_set_layout() mesh: the outlines touch but do not overlap '''
+
+from math import cos, sin, radians, hypot
+
+import pytest
+
+from gears_dev_core import parse_gear_set, gear_set_layout, generate_spur_points
+
+
+def placed(gear, turn=0.0):
+    " the outline of gear, rotated by its rotation (plus turn, deg) and moved to its center "
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth) = gear['calc']
+    a = radians(gear['rotation'] + turn)
+    (c, s) = (cos(a), sin(a))
+    return [(gear['x'] + x * c - y * s, gear['y'] + x * s + y * c)
+            for (x, y) in generate_spur_points(gear['teeth'], base_radius, pitch_radius, outer_radius, root_radius,
+                                               20, 20)]
+
+def inside(p, poly):
+    (x, y) = p
+    result = False
+    for i in range(len(poly)):
+        ((x0, y0), (x1, y1)) = (poly[i - 1], poly[i])
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            result = not result
+    return result
+
+def distance(p, poly):
+    best = None
+    for i in range(len(poly)):
+        ((x0, y0), (x1, y1)) = (poly[i - 1], poly[i])
+        (dx, dy) = (x1 - x0, y1 - y0)
+        t = max(0.0, min(1.0, ((p[0] - x0) * dx + (p[1] - y0) * dy) / (dx * dx + dy * dy)))
+        d = hypot(p[0] - x0 - t * dx, p[1] - y0 - t * dy)
+        best = d if best is None else min(best, d)
+    return best
+
+def depth(points, gear, poly):
+    """ how far points reach into the material of gear (outline poly):
+        inside the outline of a spur gear, outside the one of a ring gear
+    """
+    radii = gear['calc'][4:6]
+    worst = 0.0
+    for p in points:
+        r = hypot(p[0] - gear['x'], p[1] - gear['y'])
+        if (r > min(radii) if gear['ring'] else r < max(radii)) and inside(p, poly) != gear['ring']:
+            worst = max(worst, distance(p, poly))
+    return worst
+
+@pytest.mark.parametrize('spec', ['24; 12@1:90', '17; 11@1:47.5', '60r; 24@1:30', '24; 60r@1:200', '20; 80r@1:-75'])
+def test_layout_meshes(spec):
+    (a, b) = gear_set_layout(parse_gear_set(spec), 10.0, 20.0)
+    (pa, pb) = (placed(a), placed(b))
+    # up to the chords of the outlines
+    assert depth(pb, a, pa) < 1e-3
+    assert depth(pa, b, pb) < 1e-3
+    # half a pitch off, the teeth collide
+    pb = placed(b, 180.0 / b['teeth'])
+    assert depth(pb, a, pa) > 1.0
+
+def test_layout_centers():
+    gears = gear_set_layout(parse_gear_set('24; 12@1:90; 36=2; 60r@1:180'), 10.0, 20.0)
+    radius = [g['calc'][0] for g in gears]
+    assert abs(gears[1]['x']) < 1e-9 and abs(gears[1]['y'] - (radius[0] + radius[1])) < 1e-9
+    assert (gears[2]['x'], gears[2]['y']) == (gears[1]['x'], gears[1]['y'])
+    assert abs(gears[3]['x'] + (radius[3] - radius[0])) < 1e-9     # direction 180
+
+def test_two_rings():
+    with pytest.raises(ValueError):
+        gear_set_layout(parse_gear_set('60r; 80r@1'), 10.0, 20.0)
@@ -0,0 +1,21 @@
+''' memoization of the pure calculations (memoized in gears_dev_core.py) '''
+
+from gears_dev_core import memoized, gear_calculations
+
+
+def test_called_with_original_arguments():
+    identity = memoized(lambda x: x)
+    x = 1.0 / 3.0
+    assert identity(x) == x     # not rounded to 12 digits
+    assert identity.misses == 1
+
+def test_noise_shares_entry():
+    calls = []
+    square = memoized(lambda x: calls.append(x) or x * x)
+    square(25.4 * 0.7 / 25.4)
+    square(0.7)
+    assert len(calls) == 1 and square.hits == 1
+
+def test_gear_calculations_unchanged():
+    pitch = 3.14159 * 3.5433070866
+    assert gear_calculations(24, pitch, 20.0, 0.1, False, 0.) == gear_calculations.func(24, pitch, 20.0, 0.1, False, 0.)
@@ -0,0 +1,77 @@
+''' mesh analysis (gears_dev_mesh.py) of gear pairs and of a gear with its rack '''
+
+from math import pi
+import pytest
+
+from gears_dev_core import load_numpy, gear_calculations
+import gears_dev_mesh
+from gears_dev_mesh import analyze_mesh, analyze_rack_mesh, mesh_notes
+
+needs_numpy = pytest.mark.skipif(load_numpy() is None, reason='the simulation needs numpy')
+
+PITCH = 3 * pi      # module 3 px
+
+
+def spec(teeth, ring=False):
+    return (teeth, PITCH, 20.0, 0, ring, 0.)
+
+def analyze(a, b, **kw):
+    return analyze_mesh(spec(*a), spec(*b), time_budget=10, **kw)
+
+
+def test_external_contact_ratio():
+    result = analyze((20,), (40,), steps=0)
+    assert abs(result['contact_ratio'] - 1.63) < 0.01
+    assert not result['interference']
+    assert result['center_distance'] == pytest.approx(90.0)
+
+@needs_numpy
+def test_internal_without_interference():
+    for (pinion, ring) in [(40, 120), (20, 80)]:
+        for result in (analyze((pinion,), (ring, True)), analyze((ring, True), (pinion,))):
+            assert result['complete']
+            assert not result['interference']
+            assert result['undercut_a'] == 0 and result['undercut_b'] == 0
+
+@needs_numpy
+def test_internal_outlines_do_not_cut():
+    # 20/60r is 0.03 px past the interference point in theory, the outlines
+    # (radial flanks below the base circle) do not cut into each other
+    result = analyze((20,), (60, True))
+    assert result['undercut_a'] == 0 and result['undercut_b'] == 0
+    assert 0 < result['tip_interference'] < 0.05
+
+@needs_numpy
+def test_internal_small_difference_cuts():
+    result = analyze((20,), (24, True))
+    assert result['interference']
+    assert result['undercut_a'] > 0.1 * PITCH / pi
+
+@needs_numpy
+def test_external_simulation_keeps_formula():
+    # z1 = 12 meshes without interference up to 10.8 teeth, the outlines do not cut
+    result = analyze((12,), (13,))
+    assert result['steps'] == gears_dev_mesh.STEPS
+    assert result['undercut_a'] == 0 and result['undercut_b'] == 0
+    assert result['tip_interference'] > 0
+    assert result['interference']
+
+def test_notes_without_simulation():
+    result = analyze((9,), (9,), steps=0)
+    notes = mesh_notes(result, 1.0, 'px')
+    assert result['steps'] == 0 and result['interference']
+    assert not [n for n in notes if 'deep' in n]
+    assert [n for n in notes if 'beyond the interference point' in n]
+
+def test_two_rings():
+    with pytest.raises(ValueError):
+        analyze((40, True), (60, True))
+
+def test_rack():
+    (pitch_radius, base_radius, addendum) = gear_calculations(*spec(30))[:3]
+    rack = (10, PITCH, addendum, 20.0, 5.0, 0.0, 0.0)
+    result = analyze_rack_mesh(spec(30), rack, time_budget=10)
+    assert not result['interference']
+    assert result['contact_ratio'] > 1.5
+    result = analyze_rack_mesh(spec(9), rack, steps=0)
+    assert result['interference'] and result['tip_interference'] > 0
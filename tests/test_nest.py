@@ -0,0 +1,59 @@
+''' nesting of parts on sheets (gears_dev_nest.py) '''
+
+import random
+import time
+from math import cos, sin, pi
+
+from gears_dev_nest import nest, circle_part, box_part, shapes_clear, EPSILON
+
+
+def random_parts(count, seed, low, high):
+    rnd = random.Random(seed)
+    parts = [circle_part(i, rnd.uniform(low, high)) for i in range(count)]
+    parts += [box_part('box%d' % i, (0, 0, rnd.uniform(5, 40), rnd.uniform(5, 40))) for i in range(count // 40)]
+    return parts
+
+def check_sheets(sheets, parts, gap):
+    placed = []
+    for sheet in sheets:
+        for (n, a) in enumerate(sheet.placements):
+            (llx, lly, urx, ury) = a['bbox']
+            assert llx >= -EPSILON and lly >= -EPSILON
+            assert urx <= sheet.width + EPSILON and ury <= sheet.height + EPSILON
+            for b in sheet.placements[:n]:
+                assert shapes_clear(a, b, gap)
+            placed.append(a['part'])
+    return placed
+
+def test_no_overlaps():
+    parts = random_parts(300, 1, 1, 30)
+    (sheets, unplaced) = nest(parts, 300, 200, 0.5)
+    placed = check_sheets(sheets, parts, 0.5)
+    assert sorted(placed + unplaced) == list(range(len(parts)))
+    assert not unplaced and len(sheets) > 1
+
+def test_frontier():
+    # the enclosed circles have no room for the smallest part left
+    parts = random_parts(600, 2, 2, 6)
+    (sheets, unplaced) = nest(parts, 300, 200, 0.5)
+    check_sheets(sheets, parts, 0.5)
+    sheet = sheets[0]
+    enclosed = [p for p in sheet.placements if p['enclosed']]
+    assert len(enclosed) > len(sheet.placements) // 2
+    assert len(sheet.frontier) == len(sheet.placements) - len(enclosed)
+    small = circle_part('small', min([p['radius'] for p in parts if p['radius'] is not None]))
+    for p in enclosed:
+        ring = p['radius'] + small['radius'] + 0.5
+        for n in range(360):
+            (x, y) = (p['x'] + ring * cos(n * pi / 180), p['y'] + ring * sin(n * pi / 180))
+            assert not sheet.fits(sheet.shape(small, x, y))
+        for (y, x, anchors, slot) in sheet.candidates(small):
+            assert p not in anchors
+
+def test_many_parts():
+    # the candidates come from the frontier, not from all placed parts
+    parts = random_parts(800, 3, 2, 6)
+    start = time.time()
+    (sheets, unplaced) = nest(parts, 300, 200, 0.5)
+    assert time.time() - start < 10.0
+    assert len(check_sheets(sheets, parts, 0.5)) == len(parts)
@@ -0,0 +1,85 @@
+''' the side OffsetWriter (gears_dev_export.py) moves the cuts to: outside of
+    spur gears and racks, inside of holes and ring gears
+'''
+
+from math import hypot
+
+import pytest
+
+from gears_dev_core import (gear_calculations, write_gear_outline, generate_spokes_path, generate_rack_points,
+                            points_to_bbox)
+from gears_dev_export import OffsetWriter
+
+TOOL = 0.5
+
+
+class Recorder(object):
+    " the end points of the segments and the circles written to it "
+    def __init__(self):
+        (self.points, self.circles) = ([], [])
+
+    def move_to(self, x, y):
+        self.points.append((x, y))
+        return self
+    line_to = move_to
+
+    def arc_to(self, rx, ry, rotation, large_arc, sweep, x, y):
+        return self.move_to(x, y)
+
+    def close(self):
+        return self
+
+    def circle(self, r, cx=0, cy=0):
+        self.circles.append(r)
+        return self
+
+    def flush(self):
+        pass
+
+def radii(points):
+    r = [hypot(x, y) for (x, y) in points]
+    return (min(r), max(r))
+
+def outline(writer, ring, arcs):
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth) = \
+        gear_calculations(24, 10.0, 20.0, 0, ring)
+    write_gear_outline(writer, 24, base_radius, pitch_radius, outer_radius, root_radius, 12, 6, arcs=arcs)
+    writer.flush()
+    return (min(outer_radius, root_radius), max(outer_radius, root_radius))
+
+def tolerance(arcs):
+    " the polygon cuts the corners of the tip and root circles "
+    return 1e-6 if arcs else 1e-2
+
+@pytest.mark.parametrize('arcs', [False, True])
+def test_spur_outward(arcs):
+    rec = Recorder()
+    (r_min, r_max) = outline(OffsetWriter(rec, TOOL), False, arcs)
+    (lo, hi) = radii(rec.points)
+    assert abs(lo - (r_min + TOOL)) < tolerance(arcs) and abs(hi - (r_max + TOOL)) < tolerance(arcs)
+
+@pytest.mark.parametrize('arcs', [False, True])
+def test_ring_inward(arcs):
+    rec = Recorder()
+    (r_min, r_max) = outline(OffsetWriter(rec, -TOOL), True, arcs)
+    (lo, hi) = radii(rec.points)
+    assert abs(lo - (r_min - TOOL)) < tolerance(arcs) and abs(hi - (r_max - TOOL)) < tolerance(arcs)
+
+def test_holes_inward():
+    # mount hole and spoke holes (between mount radius 15 and root radius 60 - spoke width 5) shrink
+    rec = Recorder()
+    writer = OffsetWriter(rec, TOOL)
+    writer.circle(5.0)
+    generate_spokes_path(60.0, 5.0, 4, 15.0, 10.0, 1.0, 'px', writer)
+    writer.flush()
+    assert rec.circles == [5.0 - TOOL]
+    (lo, hi) = radii(rec.points)
+    assert abs(lo - (15.0 + TOOL)) < 1e-6 and abs(hi - (55.0 - TOOL)) < 1e-6
+
+def test_rack_outward():
+    (points, guide) = generate_rack_points(7, 10.0, 3.183, 20.0, 20.0, 10.0)
+    rec = Recorder()
+    OffsetWriter(rec, TOOL).polygon(points).flush()
+    expected = points_to_bbox(points)
+    grown = (expected[0] - TOOL, expected[1] - TOOL, expected[2] + TOOL, expected[3] + TOOL)
+    assert max([abs(u - v) for (u, v) in zip(points_to_bbox(rec.points), grown)]) < 1e-6
@@ -0,0 +1,79 @@
+''' the path data of PathWriter and ClassicPathWriter (gears_dev_core.py) '''
+
+import re
+
+from gears_dev_core import PathWriter, ClassicPathWriter, generate_spokes_path, format_number
+
+
+def test_classic_polygon():
+    d = PathWriter().polygon([(0, 1), (2.5, -0.00001), (-1, 0)]).getvalue()
+    assert d == 'M0.0000,1.0000L2.5000,-0.0000L-1.0000,0.0000z'
+
+def test_compact_polygon():
+    d = PathWriter(3, relative=True, compact=True).polygon([(0, 1), (2.5, 0.5), (-1, 0)]).getvalue()
+    assert d == 'M0,1l2.5-.5-3.5-.5z'
+
+def test_classic_circle():
+    # the mount hole as the original extension wrote it
+    r = 8.858268
+    d = "M %f,%f" % (0, r) + "A  %f,%f %s %s %s %f,%f" % (r, r, 0, 0, 0, 0, -r) + "A  %f,%f %s %s %s %f,%f" % (r, r, 0, 0, 0, 0, r)
+    assert ClassicPathWriter().circle(r).getvalue() == d
+
+def test_spokes_format():
+    (d, messages) = generate_spokes_path(40.0, 5.0, 4, 10.0, 5.0, 1.0, 'px')
+    assert re.match(r'M -?\d+\.\d{6},-?\d+\.\d{6}A  ', d)
+    assert d.count('A  ') == 8 and d.count('Z') == 4
+
+def test_format_number():
+    assert format_number(-1e-12) == '0.0000'
+    assert format_number(-0.0) == '0.0000'
+    assert format_number(-0.5) == '-0.5000'
+    assert format_number(12.34567, 2) == '12.35'
+
+def test_polygon_inputs():
+    # a list of pairs, a flat array('d') and an (N,2) array give the same path
+    from array import array
+    import gears_dev_core
+    points = [(0.25, 1), (2.5, -3.125), (-1, 0)]
+    d = PathWriter().polygon(points).getvalue()
+    assert PathWriter().polygon(array('d', [v for p in points for v in p])).getvalue() == d
+    numpy = gears_dev_core.load_numpy()
+    if numpy is not None:
+        assert PathWriter().polygon(numpy.array(points, dtype=float)).getvalue() == d
+        assert PathWriter().polygon(numpy.array(points, dtype=float)[::-1][::-1]).getvalue() == d
+
+def test_arc_outline_has_no_points():
+    from gears_dev_core import gear_calculations, write_gear_outline, spur_outline_bbox, points_to_bbox
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth) = \
+        gear_calculations(5, 10.0, 20.0)
+    args = (5, base_radius, pitch_radius, outer_radius, root_radius, 12, 3)
+    assert write_gear_outline(PathWriter(3, True, True), *args, arcs=True) is None
+    points = write_gear_outline(PathWriter(), *args)
+    bbox = spur_outline_bbox(*args)
+    assert max([abs(u - v) for (u, v) in zip(bbox, points_to_bbox(points))]) < 1e-9
+
+def test_stream_outline_as_written():
+    # streamed (batch without cache) and written (effect, cache) outlines are the same
+    from math import pi
+    from gears_dev_core import gear_calculations, write_gear_outline, stream_gear_outline
+    for teeth in range(8, 24):
+        # module 1 mm, where rotated copies of a tooth print as -0.0000
+        (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth) = \
+            gear_calculations(teeth, pi * 3.5433070866, 20.0, 0, teeth % 2 == 1)
+        args = (teeth, base_radius, pitch_radius, outer_radius, root_radius, 12, 5)
+        for writer in (PathWriter, lambda: PathWriter(3, True, True)):
+            (written, streamed) = (writer(), writer())
+            write_gear_outline(written, *args)
+            stream_gear_outline(streamed, *args)
+            assert streamed.getvalue() == written.getvalue()
+
+def test_generated_outline_as_written():
+    # GearGeometry.generate_outline() gives the points write_gear_outline() writes
+    from math import pi
+    from gears_dev_core import GearGeometry, write_gear_outline
+    for teeth in range(8, 24):
+        gear = GearGeometry(teeth, pi * 3.5433070866, 20.0, ring_gear=teeth % 2 == 1)
+        written = PathWriter()
+        write_gear_outline(written, teeth, gear.base_radius, gear.pitch_radius, gear.outer_radius,
+                           gear.root_radius, 12, 5)
+        assert PathWriter().polygon(gear.generate_outline(12, 5)).getvalue() == written.getvalue()
@@ -0,0 +1,38 @@
+''' the stage profiler of the effect (gears_dev_profile.py) '''
+
+import json
+import os
+import sys
+
+import pytest
+
+from gears_dev_profile import Profiler
+
+
+def test_report_file(tmp_path):
+    target = str(tmp_path / 'profile.json')
+    profiler = Profiler(target, 'none')
+    profiler.start()
+    with profiler.stage('outline', points=10):
+        with profiler.stage('spokes'):
+            pass
+    profiler.finish()
+    with open(target) as f:
+        report = json.load(f)
+    assert [s['stage'] for s in report['stages']] == ['spokes', 'outline']
+    assert report['stages'][1]['points'] == 10
+
+def test_unwritable_target(tmp_path):
+    # the effect reports the IOError with inkex.errormsg()
+    profiler = Profiler(os.path.join(str(tmp_path), 'missing', 'profile.json'), 'none')
+    profiler.start()
+    with pytest.raises(IOError):
+        profiler.finish()
+
+def test_hooks():
+    with pytest.raises(ValueError):
+        Profiler('stderr', 'gprof')
+    assert Profiler('', 'cprofile').hook == 'none'     # off: no hook started
+    if sys.version_info < (3, 4):
+        with pytest.raises(ImportError):
+            Profiler('stderr', 'tracemalloc')
@@ -0,0 +1,42 @@
+''' the adaptive point spacing (max_deviation) keeps its bound '''
+
+from math import cos, sin, sqrt, hypot
+
+import pytest
+
+from gears_dev_core import gear_calculations, spur_sampling, involute_deviation
+
+
+def involute(t):
+    return (cos(t) + t * sin(t), sin(t) - t * cos(t))
+
+def sampled_deviation(ta, tb, samples=200):
+    " distance of the unit involute from its chord ta..tb, at samples points "
+    ((x0, y0), (x1, y1)) = (involute(ta), involute(tb))
+    (dx, dy) = (x1 - x0, y1 - y0)
+    length = hypot(dx, dy)
+    worst = 0.0
+    for i in range(1, samples + 1):
+        (x, y) = involute(ta + (tb - ta) * i / (samples + 1.0))
+        worst = max(worst, abs((x - x0) * dy - (y - y0) * dx) / length)
+    return worst
+
+def test_involute_deviation():
+    for (ta, tb) in [(0.0, 0.3), (0.1, 0.5), (0.5, 1.2), (1.0, 3.5)]:
+        assert sampled_deviation(ta, tb, 2000) <= involute_deviation(ta, tb) * (1 + 1e-9)
+        assert sampled_deviation(ta, tb, 2000) > involute_deviation(ta, tb) * (1 - 1e-5)
+
+@pytest.mark.parametrize('teeth', [8, 24, 60])
+@pytest.mark.parametrize('max_deviation', [0.1, 0.01, 0.001, 0.0001])
+def test_chords_within_bound(teeth, max_deviation):
+    (pitch_radius, base_radius, addendum, dedendum, outer_radius, root_radius, tooth) = \
+        gear_calculations(teeth, 10.0, 20.0)
+    (radii, tip_points, root_points) = spur_sampling(teeth, base_radius, pitch_radius, outer_radius, root_radius,
+                                                     0, 0, max_deviation)
+    worst = 0.0
+    for (r0, r1) in zip(radii, radii[1:]):
+        (ta, tb) = [sqrt(max(0.0, (r / base_radius)**2 - 1)) for r in (r0, r1)]
+        worst = max(worst, sampled_deviation(ta, tb) * base_radius)
+    assert worst <= max_deviation * (1 + 1e-9)
+    # and the fewest points: the longest chords come close to the bound
+    assert worst > 0.9 * max_deviation or len(radii) == 2
@@ -0,0 +1,29 @@
+''' the gear train search (gears_dev_train.py) '''
+
+import time
+
+from gears_dev_train import TrainSearch
+
+
+def test_exact_one_stage():
+    search = TrainSearch()
+    start = time.time()
+    solutions = search.search(2.0)
+    assert time.time() - start < 0.5
+    assert [len(s['stages']) for s in solutions] == [1] * 10
+    assert [s['error'] for s in solutions] == [0.0] * 10
+    assert solutions[0]['stages'] == [(18, 36)]
+
+def test_two_stages():
+    # no exact single stage between 17 and 100 teeth (no undercut)
+    solutions = TrainSearch().search(7.5)
+    assert len(solutions) == 10
+    assert all([s['error'] == 0 and len(s['stages']) == 2 for s in solutions])
+    assert [s['teeth'] for s in solutions] == sorted([s['teeth'] for s in solutions])
+    assert solutions[0]['teeth'] == 135
+
+def test_inexact():
+    solutions = TrainSearch().search(355 / 113.0, tolerance=1e-7)
+    assert solutions and all([abs(s['error']) <= 1e-7 for s in solutions])
+    errors = [abs(s['error']) for s in solutions]
+    assert errors == sorted(errors)